@@ -0,0 +1,44 @@
+# animation.py
+# Animações declarativas: cada tipo de entidade tem uma tabela de clipes (frames, fps e o
+# que fazer no fim) e o mesmo animate() avança o jogador, os vampiros e o Drácula. A horda
+# NumPy usa as mesmas tabelas convertidas em arrays por id de estado (clip_arrays).
+
+# Estados e direções como inteiros: mesma ordem das linhas das folhas de sprite, dos
+# arrays da horda (horde.py) e dos registros do snapshot (snapshot.py)
+STATES = ["idle", "walk", "run", "attack", "hurt", "death", "gone"]
+STATE_ID = {name: i for i, name in enumerate(STATES)}
+DIRECTIONS = ["down", "up", "left", "right"]
+DIRECTION_ID = {name: i for i, name in enumerate(DIRECTIONS)}
+
+# No fim do clipe: recomeça, para no último frame ou volta para "idle"
+LOOP, HOLD, TO_IDLE = 0, 1, 2
+
+class Clip:
+    __slots__ = ("frames", "fps", "end")
+
+    def __init__(self, frames, fps=10, end=LOOP):
+        self.frames, self.fps, self.end = frames, fps, end
+
+def clip_table(frame_counts, ends, fps=10):
+    """{estado: Clip} a partir de {estado: nº de frames} e {estado: fim} (LOOP se faltar)"""
+    return {state: Clip(count, fps, ends.get(state, LOOP)) for state, count in frame_counts.items()}
+
+def animate(entity, clips, dt):
+    """Avança entity.frame no clipe do estado atual. Devolve True quando um clipe TO_IDLE
+    acabou (o estado já voltou para "idle"; quem chama limpa o resto)."""
+    clip = clips.get(entity.state)
+    if clip is None: return False
+    entity.frame += clip.fps * dt
+    if entity.frame < clip.frames: return False
+    if clip.end == TO_IDLE: entity.state = "idle"; entity.frame = 0.0; return True
+    if clip.end == HOLD: entity.frame = clip.frames - 1
+    else: entity.frame = 0.0
+    return False
+
+def clip_arrays(clips):
+    """(frames, fps, fim) por id de estado, para animar em lote (estados sem clipe não andam)"""
+    import numpy as np # Só a horda NumPy usa
+    frames = np.array([clips[s].frames if s in clips else 1 for s in STATES], dtype=np.float64)
+    fps = np.array([clips[s].fps if s in clips else 0 for s in STATES], dtype=np.float64)
+    ends = np.array([clips[s].end if s in clips else HOLD for s in STATES], dtype=np.int8)
+    return frames, fps, ends
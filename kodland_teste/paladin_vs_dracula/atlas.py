@@ -0,0 +1,103 @@
+# atlas.py
+# Atlas de sprites: todas as folhas numa imagem só + índice com o retângulo de cada
+# frame, gravados num arquivo binário que o jogo lê de uma vez com mmap.
+#
+#   python atlas.py     (re)gera images/sprites.atlas a partir dos PNGs
+#
+# Formato: cabeçalho (HEADER), índice JSON e os pixels RGBA crus (alinhados em 16 bytes).
+import json
+import mmap
+import os
+import struct
+import sys
+import pygame
+from world import HERO_FRAME_COUNTS, VAMPIRE_ANIMS, DRACULA_ANIMS
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ATLAS_PATH = os.path.join(ROOT, "images", "sprites.atlas")
+MAGIC = b"PVDATLS1"
+HEADER = struct.Struct("<8sIII") # magic, largura, altura, bytes do índice
+
+def sheet_specs():
+    """(pasta, arquivo, colunas, linhas) de todas as folhas do jogo (mesmas chaves do sprites.py)"""
+    from sprites import DIRECTIONS
+    specs = [("hero", f"{state}_{direction}_40x40", count, 1)
+             for state, count in HERO_FRAME_COUNTS.items() for direction in DIRECTIONS]
+    return specs + list(VAMPIRE_ANIMS.values()) + list(DRACULA_ANIMS.values())
+
+def sheet_key(spec):
+    return "/".join(map(str, spec))
+
+def source_path(spec):
+    return os.path.join(ROOT, "images", spec[0], spec[1] + ".png")
+
+def pack(sizes, width):
+    """Prateleiras: posição (x, y) de cada (w, h), das mais altas para as mais baixas"""
+    x = y = shelf = 0
+    positions = [None] * len(sizes)
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i][1]):
+        w, h = sizes[i]
+        if x + w > width: x, y, shelf = 0, y + shelf, 0
+        positions[i] = (x, y)
+        x += w; shelf = max(shelf, h)
+    return positions, y + shelf
+
+def best_width(sizes, step=64):
+    """Largura (múltipla de step) que deixa o atlas com a menor área"""
+    widest, total = max(w for w, _ in sizes), sum(w for w, _ in sizes)
+    widths = range(-(-widest // step) * step, total + step, step)
+    return min(widths, key=lambda w: w * pack(sizes, w)[1])
+
+def build(path=ATLAS_PATH, width=None):
+    """Empacota as folhas que existirem em disco e grava o atlas; devolve (largura, altura, folhas)"""
+    sheets = [(spec, pygame.image.load(source_path(spec))) for spec in sheet_specs() if os.path.exists(source_path(spec))]
+    sizes = [surf.get_size() for _, surf in sheets]
+    width = width or best_width(sizes)
+    positions, height = pack(sizes, width)
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+    index = {}
+    for (spec, surf), (x, y) in zip(sheets, positions):
+        atlas.blit(surf, (x, y), special_flags=pygame.BLEND_RGBA_MAX) # Cópia exata (o destino é zerado)
+        cols, rows = spec[2], spec[3]
+        fw, fh = surf.get_width() // cols, surf.get_height() // rows
+        index[sheet_key(spec)] = [[[x + c * fw, y + r * fh, fw, fh] for c in range(cols)] for r in range(rows)]
+    blob = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, width, height, len(blob)))
+        f.write(blob)
+        f.write(b"\0" * (-(HEADER.size + len(blob)) % 16))
+        f.write(pygame.image.tobytes(atlas, "RGBA"))
+    return width, height, len(sheets)
+
+def is_stale(path=ATLAS_PATH):
+    """Algum PNG mais novo que o atlas? (no executável do PyInstaller as datas não valem)"""
+    if getattr(sys, "frozen", False): return False
+    stamp = os.path.getmtime(path)
+    for spec in sheet_specs():
+        source = source_path(spec)
+        if os.path.exists(source) and os.path.getmtime(source) > stamp: return True
+    return False
+
+def load_atlas(path=ATLAS_PATH, convert=True):
+    """(superfície do atlas, índice) lidos com mmap, ou None se não há atlas válido e atualizado.
+    convert=True precisa de uma tela aberta (convert_alpha); com False a superfície fica em RGBA,
+    para quem lê fora da thread principal converter depois."""
+    if not os.path.exists(path) or is_stale(path): return None
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, width, height, index_len = HEADER.unpack_from(mm)
+        if magic != MAGIC: return None
+        index = json.loads(mm[HEADER.size:HEADER.size + index_len])
+        offset = HEADER.size + index_len
+        offset += -offset % 16
+        pixels = memoryview(mm)[offset:offset + width * height * 4]
+        try:
+            raw = pygame.image.frombuffer(pixels, (width, height), "RGBA") # Sem cópia: aponta para o mmap
+            surface = raw.convert_alpha() if convert else raw.copy() # Única cópia (a do mmap some no fim)
+            del raw
+        finally:
+            pixels.release()
+    return surface, index
+
+if __name__ == "__main__":
+    width, height, count = build()
+    print(f"{count} folhas em {width}x{height} -> {ATLAS_PATH} ({os.path.getsize(ATLAS_PATH) // 1024} KB)")
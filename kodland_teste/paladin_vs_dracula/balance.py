@@ -0,0 +1,199 @@
+# balance.py
+# Monte Carlo de balanceamento: partidas headless (sem janela e sem áudio) com um bot
+# no lugar do jogador, varrendo grades de constantes do world.py em todos os núcleos.
+#
+#   python balance.py --set vampire_speed=60,90,120 --set dracula_hp=15:25:5 --matches 500 --out grade.csv
+#   python balance.py --matches 2000 --workers 4            (só os valores atuais)
+#
+# Cada combinação joga as mesmas seeds (seed, seed + 1, ...), que sorteiam o mapa (--map) e
+# as reações do bot: as diferenças entre linhas vêm das constantes, não do sorteio.
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import csv
+import itertools
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import world
+from world import World, TILE_SIZE, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_ATTACK
+
+# nome na linha de comando -> constante do world.py
+PARAMS = {name.lower(): name for name in [
+    "PLAYER_HP", "PLAYER_SPEED", "PLAYER_ATTACK_COOLDOWN",
+    "VAMPIRE_HP", "VAMPIRE_SPEED", "VAMPIRE_THINK", "VAMPIRE_DAMAGE", "VAMPIRE_AGGRO_RANGE", "VAMPIRE_HIT_RANGE", "VAMPIRE_ATTACK_REST",
+    "DRACULA_HP", "DRACULA_SPEED", "DRACULA_THINK", "DRACULA_DAMAGE", "DRACULA_AGGRO_RANGE", "DRACULA_HIT_RANGE", "DRACULA_ATTACK_REST",
+]}
+DEFAULTS = {name: getattr(world, const) for name, const in PARAMS.items()}
+# Alcances ao quadrado derivados de cada alcance em tiles
+SQUARED = {"VAMPIRE_AGGRO_RANGE": "VAMPIRE_AGGRO_SQ", "VAMPIRE_HIT_RANGE": "VAMPIRE_HIT_SQ",
+           "DRACULA_AGGRO_RANGE": "DRACULA_AGGRO_SQ", "DRACULA_HIT_RANGE": "DRACULA_HIT_SQ"}
+DT = 1 / 60
+
+def apply(params):
+    """Troca as constantes do world.py (e as cópias do horde.py) neste processo"""
+    modules = [world] + ([sys.modules["horde"]] if "horde" in sys.modules else [])
+    for name, value in dict(DEFAULTS, **params).items():
+        const = PARAMS[name]
+        for module in modules:
+            if hasattr(module, const): setattr(module, const, value)
+            if const in SQUARED and hasattr(module, SQUARED[const]): setattr(module, SQUARED[const], world.range_sq(value))
+
+# ------------------------
+# BOT
+# ------------------------
+# (dx, dy) -> (bit de direção, direção do jogador)
+STEPS = {(-1, 0): (INPUT_LEFT, "left"), (1, 0): (INPUT_RIGHT, "right"), (0, -1): (INPUT_UP, "up"), (0, 1): (INPUT_DOWN, "down")}
+
+def bot_command(w):
+    """Jogador roteirizado: vira para o inimigo colado e ataca, senão anda em direção ao
+    mais próximo (tenta o outro eixo se o primeiro estiver bloqueado)."""
+    player = w.player
+    if player.is_moving: return 0
+    col, row = int(player.target_x // TILE_SIZE), int(player.target_y // TILE_SIZE)
+    targets = [e for e in w.enemies if e.state not in ["death", "gone"]]
+    if w.boss_phase_active and w.dracula.state not in ["death", "gone"]: targets.append(w.dracula)
+    if not targets: return 0
+    best, best_d = None, None
+    for e in targets:
+        dc, dr = int(e.x // TILE_SIZE) - col, int(e.y // TILE_SIZE) - row
+        d = abs(dc) + abs(dr)
+        if best_d is None or d < best_d: best, best_d = (dc, dr), d
+    dc, dr = best
+    if best_d == 1:
+        # Durante a animação do ataque o jogador não vira: primeiro a direção, depois o golpe
+        bit, direction = STEPS[(dc, dr)]
+        return INPUT_ATTACK if player.direction == direction else bit
+    sx, sy = (dc > 0) - (dc < 0), (dr > 0) - (dr < 0)
+    options = [(sx, 0), (0, sy)] if abs(dc) >= abs(dr) else [(0, sy), (sx, 0)]
+    for dx, dy in options:
+        if (dx or dy) and w.grid.is_free(player.x + dx * TILE_SIZE, player.y + dy * TILE_SIZE, player):
+            return STEPS[(dx, dy)][0]
+    return INPUT_ATTACK # Encurralado: ataca para frente esperando abrir caminho
+
+class Bot:
+    """bot_command com tempo de reação: cada decisão nova só sai depois de um atraso
+    sorteado (exponencial, média reaction segundos). É o que varia entre as seeds."""
+    def __init__(self, seed, reaction=0.2):
+        self.rng = random.Random(seed)
+        self.reaction_ticks = reaction / DT
+        self.command = self.pending = 0
+        self.wait = 0
+
+    def __call__(self, w):
+        wanted = bot_command(w)
+        if wanted != self.pending:
+            self.pending = wanted
+            self.wait = int(self.rng.expovariate(1 / self.reaction_ticks)) if self.reaction_ticks else 0
+        if self.wait > 0: self.wait -= 1
+        else: self.command = self.pending
+        return self.command
+
+def play(seed, dungeon=None, max_ticks=7200, reaction=0.2):
+    """Uma partida do bot; (status, ticks, dano sofrido). status "timeout" se passar de max_ticks"""
+    w = World(seed, dungeon=dungeon)
+    bot, step = Bot(seed, reaction), w.step
+    while w.status == "game" and w.tick < max_ticks: step(DT, bot(w))
+    status = w.status if w.status != "game" else "timeout"
+    return status, w.tick, world.PLAYER_HP - w.player.hp
+
+# ------------------------
+# POOL
+# ------------------------
+def run_batch(params, seeds, dungeon, max_ticks, reaction):
+    """Roda no processo filho: aplica as constantes e joga as seeds; devolve os totais"""
+    apply(params)
+    totals = {"matches": 0, "win": 0, "game_over": 0, "timeout": 0, "ticks": 0, "damage": 0, "win_ticks": []}
+    start = time.perf_counter()
+    for seed in seeds:
+        status, ticks, damage = play(seed, dungeon, max_ticks, reaction)
+        totals["matches"] += 1; totals[status] += 1
+        totals["ticks"] += ticks; totals["damage"] += damage
+        if status == "win": totals["win_ticks"].append(ticks)
+    totals["seconds"] = time.perf_counter() - start
+    return totals
+
+def parse_values(text):
+    """"1,1.5,2" ou "início:fim:passo" (fim incluído)"""
+    if ":" in text:
+        start, stop, step = (float(v) for v in text.split(":"))
+        values, i = [], 0
+        while start + i * step <= stop + 1e-9: values.append(round(start + i * step, 6)); i += 1
+    else: values = [float(v) for v in text.split(",")]
+    return [int(v) if v.is_integer() else v for v in values]
+
+def grid_from(sets):
+    axes = {}
+    for item in sets:
+        name, _, values = item.partition("=")
+        name = name.strip().lower()
+        if name not in PARAMS: raise SystemExit(f"parâmetro desconhecido: {name} (use um de: {', '.join(PARAMS)})")
+        axes[name] = parse_values(values)
+    names = list(axes)
+    return names, [dict(zip(names, combo)) for combo in itertools.product(*axes.values())]
+
+def summarize(params, totals):
+    wins, matches = totals["win_ticks"], totals["matches"]
+    wins.sort()
+    row = dict(params)
+    row.update({
+        "matches": matches,
+        "win_rate": round(totals["win"] / matches, 4),
+        "loss_rate": round(totals["game_over"] / matches, 4),
+        "timeout_rate": round(totals["timeout"] / matches, 4),
+        "ttk_mean_s": round(sum(wins) / len(wins) * DT, 2) if wins else "",
+        "ttk_p50_s": round(wins[len(wins) // 2] * DT, 2) if wins else "",
+        "damage_mean": round(totals["damage"] / matches, 3),
+        "ticks_per_sec": round(totals["ticks"] / max(totals["seconds"], 1e-9)),
+    })
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo de balanceamento do Paladin vs Dracula")
+    parser.add_argument("--set", action="append", default=[], metavar="NOME=VALORES",
+                        help="eixo da grade, ex.: vampire_speed=60,90,120 ou dracula_hp=15:25:5 (pode repetir)")
+    parser.add_argument("--matches", type=int, default=200, help="partidas por combinação")
+    parser.add_argument("--seed", type=int, default=1, help="primeira seed")
+    parser.add_argument("--map", type=int, default=0, help="lado da masmorra procedural (0 = sala original)")
+    parser.add_argument("--reaction", type=float, default=0.2, help="tempo médio de reação do bot em segundos")
+    parser.add_argument("--max-ticks", type=int, default=7200, help="ticks antes de contar a partida como timeout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processos (padrão: todos os núcleos)")
+    parser.add_argument("--batch", type=int, default=50, help="partidas por tarefa enviada ao pool")
+    parser.add_argument("--out", default="balance.csv", help="CSV de saída")
+    args = parser.parse_args()
+
+    names, combos = grid_from(args.set)
+    dungeon = (args.map, args.map) if args.map else None
+    seeds = list(range(args.seed, args.seed + args.matches))
+    batches = [seeds[i:i + args.batch] for i in range(0, len(seeds), args.batch)]
+    results = [None] * len(combos)
+    print(f"{len(combos)} combinação(ões) x {args.matches} partidas em {args.workers} processo(s)")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        jobs = {pool.submit(run_batch, params, batch, dungeon, args.max_ticks, args.reaction): i
+                for i, params in enumerate(combos) for batch in batches}
+        for done, job in enumerate(as_completed(jobs), 1):
+            i, totals = jobs[job], job.result()
+            if results[i] is None: results[i] = totals
+            else:
+                for key, value in totals.items(): results[i][key] += value
+            print(f"\r{done}/{len(jobs)} tarefas", end="", flush=True)
+    elapsed = time.perf_counter() - start
+
+    rows = [summarize(params, totals) for params, totals in zip(combos, results)]
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader(); writer.writerows(rows)
+    matches = len(combos) * args.matches
+    ticks = sum(t["ticks"] for t in results)
+    print(f"\r{matches} partidas em {elapsed:.1f}s ({matches / elapsed:.0f} partidas/s, "
+          f"{ticks / elapsed:.0f} ticks/s no total) -> {args.out}")
+    for row in sorted(rows, key=lambda r: -r["win_rate"])[:10]:
+        print("  " + "  ".join(f"{k}={row[k]}" for k in names + ["win_rate", "ttk_mean_s", "damage_mean"]))
+
+if __name__ == "__main__":
+    main()
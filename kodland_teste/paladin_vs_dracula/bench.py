@@ -0,0 +1,281 @@
+# bench.py
+# Benchmarks headless da simulação (World.step) e do desenho, com os drivers
+# "dummy" do SDL (sem janela e sem áudio).
+#
+#   python bench.py run --out resultados.json
+#   python bench.py run --scenarios horde_1000 --backend numpy --ticks 300
+#   python bench.py run --replay replays/partida.pvr   (partida gravada como cenário extra)
+#   python bench.py compare antes.json depois.json --threshold 0.10
+#   python bench.py equiv --budget 8                  (backends python e numpy tick a tick)
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+import pygame
+from pgzero import loaders
+from pgzero.screen import Screen
+from world import World, WIDTH, HEIGHT, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_ATTACK
+from replay import Replay, BACKENDS, state_hash
+
+SEED = 1234
+INVULNERABLE_HP = 10**6 # O jogador não morre: todo cenário roteirizado roda o número de ticks pedido
+
+# Entrada roteirizada (repete): anda em quadrado atacando entre os passos
+SCRIPT = ([INPUT_ATTACK] * 30 + [INPUT_RIGHT] * 15 + [INPUT_ATTACK] * 30 + [INPUT_DOWN] * 15 +
+          [INPUT_ATTACK] * 30 + [INPUT_LEFT] * 15 + [INPUT_ATTACK] * 30 + [INPUT_UP] * 15)
+
+# ------------------------
+# CENÁRIOS
+# ------------------------
+def arena_for(count):
+    """Sala aberta com espaço para count vampiros (~40% dos tiles ocupados)"""
+    side = max(16, int(math.sqrt(count * 2.5)) + 4)
+    return (side, side)
+
+def setup_default(backend):
+    return World(SEED, horde_backend=backend)
+
+def setup_horde(count, fog=False, arena=None):
+    def setup(backend):
+        world = World(SEED, horde_backend=backend, arena=arena or arena_for(count), fog=fog)
+        world.spawn_horde(count)
+        return world
+    return setup
+
+def setup_boss(backend):
+    world = World(SEED, horde_backend=backend)
+    world.clear_enemies() # O próximo step já ativa a fase do chefe
+    return world
+
+def setup_mass_death(backend):
+    world = World(SEED, horde_backend=backend, arena=arena_for(1000))
+    world.spawn_horde(1000)
+    for e in list(world.enemies): e.take_damage(e.hp)
+    return world
+
+def setup_dungeon(size):
+    def setup(backend):
+        return World(SEED, horde_backend=backend, dungeon=(size, size))
+    return setup
+
+def invulnerable(setup):
+    def wrapped(backend):
+        world = setup(backend)
+        world.player.hp = INVULNERABLE_HP
+        return world
+    return wrapped
+
+def scripted(ticks, dt=1/60):
+    """(dt, comando) de cada tick da entrada roteirizada"""
+    return [(dt, SCRIPT[i % len(SCRIPT)]) for i in range(ticks)]
+
+# nome -> (setup, ticks padrão, entradas(ticks))
+SCENARIOS = {
+    "default": (invulnerable(setup_default), 1200, scripted),
+    "horde_100": (invulnerable(setup_horde(100)), 600, scripted),
+    "horde_1000": (invulnerable(setup_horde(1000)), 300, scripted),
+    "horde_10000": (invulnerable(setup_horde(10000)), 60, scripted),
+    "horde_1000_fog": (invulnerable(setup_horde(1000, fog=True)), 300, scripted), # Fora da vista: update barato e sem desenho
+    "crowd_300": (invulnerable(setup_horde(300, arena=(30, 30))), 600, scripted), # Sala cheia sem LOD: a fila da IA não esvazia
+    "boss": (invulnerable(setup_boss), 1200, scripted),
+    "mass_death": (invulnerable(setup_mass_death), 300, scripted),
+    "dungeon_200": (invulnerable(setup_dungeon(200)), 1200, scripted),
+}
+
+def add_replay(path):
+    """Partida gravada (replay.py) como cenário: mesmo mundo e mesmas entradas, jogador mortal"""
+    replay = Replay.load(path)
+    name = "replay:" + os.path.splitext(os.path.basename(path))[0]
+    SCENARIOS[name] = (replay.make_world, len(replay), lambda ticks: replay.inputs()[:ticks])
+    return name
+
+def run_inputs(world, inputs):
+    for dt, command in inputs: world.step(dt, command)
+
+# ------------------------
+# MEDIÇÕES
+# ------------------------
+def measure_sim(setup, backend, inputs):
+    world = setup(backend)
+    ticks = len(inputs)
+    gc.collect()
+    collections = sum(s["collections"] for s in gc.get_stats())
+    # Cada tick cronometrado: o p99 mostra os picos (ex.: a IA inteira pensando no mesmo tick)
+    times = []
+    clock, step = time.perf_counter, world.step
+    for dt, command in inputs:
+        start = clock(); step(dt, command); times.append(clock() - start)
+    elapsed = sum(times)
+    times.sort()
+    result = {
+        "ticks": ticks,
+        "ticks_per_sec": ticks / elapsed,
+        "tick_ms": elapsed * 1000 / ticks,
+        "tick_p99_ms": times[min(ticks - 1, int(0.99 * ticks))] * 1000,
+        "gc_collections": sum(s["collections"] for s in gc.get_stats()) - collections,
+        "enemies_end": len(world.enemies),
+    }
+    result.update(world.ai.stats())
+    return result
+
+def measure_memory(setup, backend, inputs):
+    """Pico de memória (tracemalloc) e blocos alocados que sobraram ao fim dos ticks"""
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    world = setup(backend)
+    setup_kb = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.reset_peak()
+    run_inputs(world, inputs)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "setup_kb": setup_kb,
+        "peak_kb": peak / 1024,
+        "step_growth_kb": current / 1024 - setup_kb,
+        "net_blocks": sys.getallocatedblocks() - blocks,
+    }
+
+def measure_draw(setup, backend, inputs):
+    """ms por frame dos dois modos de desenho (sim avança um tick entre frames).
+    Masmorras usam a câmera (culling); as arenas de stress desenham todo mundo."""
+    from render import DirtyRenderer, text_sprite
+    from scene import scene_sprites, hud_texts, hud_key, make_static_layer, draw_scene_full, draw_dungeon, Camera
+    world = setup(backend)
+    camera = Camera(WIDTH, HEIGHT) if world.dungeon else None
+    view = None
+    full = Screen(pygame.Surface((WIDTH, HEIGHT)).convert())
+    dirty = DirtyRenderer(pygame.Surface((WIDTH, HEIGHT)).convert(), make_static_layer(WIDTH, HEIGHT))
+    overlay = lambda: [text_sprite(text, **kwargs) for text, kwargs in hud_texts(world)]
+    no_lap = lambda name: None
+    full_s = dirty_s = 0.0
+    frames = len(inputs)
+    for dt, command in inputs:
+        world.step(dt, command)
+        start = time.perf_counter()
+        if camera: camera.follow(world)
+        full.clear(); draw_scene_full(full, world, no_lap, camera)
+        middle = time.perf_counter()
+        if camera and view != camera.rect.topleft:
+            draw_dungeon(dirty.static, world, camera.rect); dirty.invalidate(); view = camera.rect.topleft
+        dirty.draw_scene(scene_sprites(world, camera), hud_key(world), overlay)
+        end = time.perf_counter()
+        full_s += middle - start; dirty_s += end - middle
+    return {"draw_full_ms": full_s * 1000 / frames, "draw_dirty_ms": dirty_s * 1000 / frames}
+
+def init_display():
+    pygame.display.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    loaders.set_root(os.path.abspath(__file__))
+    from scene import load_art
+    load_art()
+
+def run(args):
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    names += [add_replay(path) for path in args.replay]
+    if not args.no_draw: init_display()
+    results = {}
+    for name in names:
+        setup, default_ticks, inputs = SCENARIOS[name]
+        ticks = args.ticks or default_ticks
+        result = measure_sim(setup, args.backend, inputs(ticks))
+        result.update(measure_memory(setup, args.backend, inputs(min(ticks, args.memory_ticks))))
+        if not args.no_draw: result.update(measure_draw(setup, args.backend, inputs(min(ticks, args.frames))))
+        results[name] = result
+        line = (f"{name:<12} {result['ticks_per_sec']:10.0f} ticks/s  {result['tick_ms']:8.3f} ms/tick  p99 {result['tick_p99_ms']:7.3f} ms  "
+                f"IA {result['decisions_per_tick']:5.1f}/tick (pico {result['decisions_peak']})  pico {result['peak_kb']:9.0f} KB")
+        if not args.no_draw: line += f"  draw full {result['draw_full_ms']:7.3f} ms  dirty {result['draw_dirty_ms']:7.3f} ms"
+        print(line, flush=True)
+    report = {
+        "meta": {
+            "backend": args.backend, "seed": SEED, "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(), "pygame": pygame.version.ver, "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+        print(f"resultados salvos em {args.out}")
+
+# ------------------------
+# EQUIVALÊNCIA DOS BACKENDS
+# ------------------------
+def equiv(args):
+    """Roda cada cenário nos dois backends da horda, tick a tick, e para no primeiro state_hash
+    diferente. Mapas com LOD ou névoa ficam de fora (a horda NumPy não usa o ritmo dos longe)."""
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    failures = 0
+    for name in names:
+        setup, default_ticks, inputs = SCENARIOS[name]
+        worlds = [setup(backend) for backend in BACKENDS]
+        if worlds[0].lod or worlds[0].fov: print(f"{name:<12} pulado (LOD)"); continue
+        for world in worlds: world.ai.budget = args.budget
+        status = "ok"
+        for tick, (dt, command) in enumerate(inputs(args.ticks or default_ticks)):
+            for world in worlds: world.step(dt, command)
+            if state_hash(worlds[0]) != state_hash(worlds[1]):
+                status = f"DIFERENTE no tick {tick}"; failures += 1; break
+        print(f"{name:<12} {status}", flush=True)
+    print(f"{failures} cenário(s) com os backends diferentes")
+    return 1 if failures else 0
+
+# ------------------------
+# COMPARAÇÃO
+# ------------------------
+# métrica -> True se maior é melhor
+METRICS = {"ticks_per_sec": True, "tick_p99_ms": False, "draw_full_ms": False, "draw_dirty_ms": False, "peak_kb": False}
+
+def compare(args):
+    with open(args.base, encoding="utf-8") as f: base = json.load(f)["results"]
+    with open(args.new, encoding="utf-8") as f: new = json.load(f)["results"]
+    regressions = 0
+    for name in base:
+        if name not in new: continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in base[name] or metric not in new[name]: continue
+            old_v, new_v = base[name][metric], new[name][metric]
+            if old_v == 0: continue
+            change = (new_v - old_v) / old_v
+            worse = -change if higher_is_better else change
+            flag = "REGRESSÃO" if worse > args.threshold else ("melhor" if worse < -args.threshold else "")
+            if worse > args.threshold: regressions += 1
+            print(f"{name:<12} {metric:<14} {old_v:12.3f} -> {new_v:12.3f} ({change:+7.1%}) {flag}")
+    print(f"{regressions} regressão(ões) acima de {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks headless do Paladin vs Dracula")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="roda os cenários e mede")
+    p_run.add_argument("--scenarios", help="lista separada por vírgula (padrão: todos): " + ", ".join(SCENARIOS))
+    p_run.add_argument("--backend", default="python", choices=["python", "numpy"])
+    p_run.add_argument("--ticks", type=int, help="ticks por cenário (padrão: o de cada cenário)")
+    p_run.add_argument("--frames", type=int, default=120, help="máximo de frames desenhados por cenário")
+    p_run.add_argument("--memory-ticks", type=int, default=120, help="ticks medidos com tracemalloc")
+    p_run.add_argument("--replay", action="append", default=[], help="replay (.pvr) para rodar como cenário (pode repetir)")
+    p_run.add_argument("--no-draw", action="store_true", help="só simulação")
+    p_run.add_argument("--out", help="arquivo JSON de saída")
+    p_cmp = sub.add_parser("compare", help="compara dois JSON e aponta regressões")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="piora relativa tolerada (0.10 = 10%%)")
+    p_eq = sub.add_parser("equiv", help="confere se os backends python e numpy andam iguais tick a tick")
+    p_eq.add_argument("--scenarios", help="lista separada por vírgula (padrão: todos os sem LOD)")
+    p_eq.add_argument("--ticks", type=int, help="ticks por cenário (padrão: o de cada cenário)")
+    p_eq.add_argument("--budget", type=int, default=8, help="decisões da IA por tick (baixo para a fila encher)")
+    args = parser.parse_args()
+    if args.command == "run": run(args)
+    elif args.command == "equiv": sys.exit(equiv(args))
+    else: sys.exit(compare(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# dungeon.py
+# Masmorras procedurais (salas ligadas por corredores) geradas a partir de uma seed.
+# O mapa fica guardado em chunks de CHUNK_TILES x CHUNK_TILES tiles; chunks que são
+# só parede nem chegam a existir.
+import random
+from pygame import Rect
+
+CHUNK_TILES = 8 # Lado do chunk em tiles (também é a unidade de cache do desenho)
+MIN_SIZE = 6 # Menor lado do mapa: borda de parede e a menor sala (2x2) com folga em volta
+WALL, FLOOR = 0, 1
+
+class Dungeon:
+    """Mapa de cols x rows tiles com salas (Rects em coordenadas de tile) e corredores."""
+    def __init__(self, cols, rows, seed=0, room_min=5, room_max=11):
+        if cols < MIN_SIZE or rows < MIN_SIZE:
+            raise ValueError(f"masmorra de {cols}x{rows} tiles: o mínimo é {MIN_SIZE}x{MIN_SIZE}")
+        self.cols, self.rows = cols, rows
+        self.chunk_cols = (cols + CHUNK_TILES - 1) // CHUNK_TILES
+        self.chunk_rows = (rows + CHUNK_TILES - 1) // CHUNK_TILES
+        self.chunks = {} # (cx, cy) -> bytearray com 1 = chão
+        self.rooms = []
+        self._generate(random.Random(seed), room_min, min(room_max, cols - 4, rows - 4))
+
+    def tile(self, col, row):
+        if not (0 <= col < self.cols and 0 <= row < self.rows): return WALL
+        chunk = self.chunks.get((col // CHUNK_TILES, row // CHUNK_TILES))
+        if chunk is None: return WALL
+        return chunk[(row % CHUNK_TILES) * CHUNK_TILES + col % CHUNK_TILES]
+
+    def carve(self, col, row):
+        # A borda do mapa é sempre parede
+        if not (1 <= col < self.cols - 1 and 1 <= row < self.rows - 1): return
+        key = (col // CHUNK_TILES, row // CHUNK_TILES)
+        chunk = self.chunks.get(key)
+        if chunk is None: chunk = self.chunks[key] = bytearray(CHUNK_TILES * CHUNK_TILES)
+        chunk[(row % CHUNK_TILES) * CHUNK_TILES + col % CHUNK_TILES] = FLOOR
+
+    def carve_rect(self, rect):
+        for row in range(rect.top, rect.bottom):
+            for col in range(rect.left, rect.right): self.carve(col, row)
+
+    def _generate(self, rng, room_min, room_max):
+        # Salas em posições sorteadas (descarta as que encostam em outra); cada sala nova
+        # liga na anterior, então o mapa inteiro é conexo. Algumas ligações extras criam ciclos.
+        room_min = max(2, min(room_min, room_max))
+        for _ in range(max(8, self.cols * self.rows // 300)):
+            w, h = rng.randint(room_min, room_max), rng.randint(room_min, room_max)
+            room = Rect(rng.randint(1, self.cols - w - 1), rng.randint(1, self.rows - h - 1), w, h)
+            if room.inflate(4, 4).collidelist(self.rooms) != -1: continue
+            self.carve_rect(room)
+            if self.rooms:
+                self._corridor(rng, self.rooms[-1].center, room.center)
+                if len(self.rooms) > 2 and rng.random() < 0.15:
+                    self._corridor(rng, rng.choice(self.rooms[:-1]).center, room.center)
+            self.rooms.append(room)
+
+    def _corridor(self, rng, a, b):
+        """Corredor em L com 2 tiles de largura entre os pontos a e b"""
+        (ax, ay), (bx, by) = a, b
+        if rng.random() < 0.5: # Primeiro na horizontal
+            self.carve_rect(Rect(min(ax, bx), ay, abs(ax - bx) + 2, 2))
+            self.carve_rect(Rect(bx, min(ay, by), 2, abs(ay - by) + 2))
+        else: # Primeiro na vertical
+            self.carve_rect(Rect(ax, min(ay, by), 2, abs(ay - by) + 2))
+            self.carve_rect(Rect(min(ax, bx), by, abs(ax - bx) + 2, 2))
+
+    def walkable(self):
+        """Mapa inteiro como bytearray linear (linha a linha), no formato do TileGrid"""
+        cols = self.cols
+        flat = bytearray(cols * self.rows)
+        for (cx, cy), chunk in self.chunks.items():
+            col0 = cx * CHUNK_TILES
+            n = min(CHUNK_TILES, cols - col0)
+            for r in range(min(CHUNK_TILES, self.rows - cy * CHUNK_TILES)):
+                start = (cy * CHUNK_TILES + r) * cols + col0
+                flat[start:start + n] = chunk[r * CHUNK_TILES:r * CHUNK_TILES + n]
+        return flat
+
+    def chunks_in(self, rect, tile_size):
+        """Chunks (cx, cy) que encostam no retângulo rect (em pixels)"""
+        size = CHUNK_TILES * tile_size
+        left, top = max(0, rect.left // size), max(0, rect.top // size)
+        right = min(self.chunk_cols - 1, (rect.right - 1) // size)
+        bottom = min(self.chunk_rows - 1, (rect.bottom - 1) // size)
+        return [(cx, cy) for cy in range(top, bottom + 1) for cx in range(left, right + 1)]
@@ -1,40 +1,106 @@
 # game.py
 import pgzrun
-import math
+import atexit
+import gc
+import os
 import random
-from pygame import Rect 
+import sys
+import time
+from pygame import Rect, Surface, SRCALPHA, NOEVENT
+from pygame import event as sdl_event, display, image
 from pgzero.keyboard import keys
+from pgzero import ptext, loaders
+from world import World, WIDTH, HEIGHT, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_ATTACK, INPUT_PAUSE, ALLY_SHIFT
+from render import DirtyRenderer, text_sprite
+from sprites import read_frames, cache_size
+from scene import finish_art, scene_sprites, hud_texts, hud_key, make_static_layer, draw_scene_full, draw_dungeon, fog_blits, fog_changes, Camera, Blend, Quality
+from profiler import FrameProfiler, NULL_PROFILER
+from governor import QualityGovernor
+from preload import Preloader, MusicPlayer
+from replay import Recorder, Replay
+from snapshot import SnapshotRing, snapshot, restore, save_file, load_file
+from net import CoopHost, CoopClient
 
 # ------------------------
 # CONFIGURAÇÕES
 # ------------------------
-WIDTH = 800
-HEIGHT = 750 
 TITLE = "Paladin vs Dracula - Roguelike Edition"
 
-# Configuração da GRADE (Grid)
-TILE_SIZE = 50 # Tamanho de cada quadrado
-GRID_W = WIDTH // TILE_SIZE
-GRID_H = HEIGHT // TILE_SIZE
-
 game_state = "menu"
 sound_on = True
 current_music = None
-enemies = []
-boss_phase_active = False
 
-# ------------------------
-# LIMITES DO CENÁRIO
-# ------------------------
-OBSTACLES = [
-    Rect(0, 0, WIDTH, 175),      
-    Rect(0, 0, 50, HEIGHT),      
-    Rect(WIDTH-50, 0, 50, HEIGHT), 
-    Rect(0, HEIGHT-50, WIDTH, 50), 
-    Rect(100, 650, 80, 50),      
-    Rect(620, 650, 80, 50),      
-    Rect(350, 650, 100, 50)      
-]
+# "dirty": só repinta o que mudou (render.py); "full": limpa e redesenha a tela inteira todo frame
+RENDER_MODE = "dirty"
+
+# Profiler de frames (F3 liga/desliga o painel). Com um caminho .csv/.jsonl aqui ele já
+# começa ligado e grava uma amostra por frame nesse arquivo.
+PROFILER_LOG = None
+
+# (colunas, linhas) liga a masmorra procedural (dungeon.py), ex.: (200, 200); o mínimo é 6x6.
+# None = a sala única original.
+MAP_SIZE = None
+
+# Modo infinito: ondas de vampiros cada vez maiores, sem chefe, até o jogador morrer
+# (também com "python game.py --endless").
+ENDLESS = "--endless" in sys.argv
+
+# Névoa de guerra: o herói só enxerga world.FOV_RADIUS tiles em volta, sem atravessar paredes;
+# o que já foi visto fica escurecido e o resto preto (também com "python game.py --fog").
+FOG_OF_WAR = "--fog" in sys.argv
+
+# Modo por turnos ("python game.py --turns", sem co-op): o mundo só anda quando o herói age
+# e cada inimigo age na sua vez (world.py). Parado, nada é simulado nem redesenhado.
+TURN_BASED = "--turns" in sys.argv
+
+# Sem nada para simular nem animar (menu e telas paradas, ou o modo por turnos parado e sem
+# tecla apertada), o loop dorme até o próximo evento da janela, por no máximo IDLE_WAIT_MS,
+# em vez de rodar 60 vezes por segundo. 0 desliga a espera.
+IDLE_WAIT_MS = 250
+
+# A simulação anda em passos fixos de 1/SIM_HZ s, independente do FPS: frames lentos rodam
+# vários ticks (até MAX_CATCHUP_TICKS, depois o jogo desacelera) e o desenho interpola as
+# posições entre os dois últimos ticks. RENDER_FPS limita o desenho (o pgzero roda o loop a 60);
+# quando a simulação está atrasada, até MAX_SKIPPED_FRAMES frames seguidos deixam de ser desenhados.
+SIM_HZ = 60
+RENDER_FPS = 60
+MAX_CATCHUP_TICKS = 5
+MAX_SKIPPED_FRAMES = 4
+
+# Cada partida é gravada em replays/ (replay.py). Com "python game.py --replay arquivo.pvr"
+# o START reproduz a partida gravada em vez de ler o teclado (TAB segurado acelera).
+RECORD_REPLAYS = True
+REPLAY_FAST_FORWARD = 8 # Ticks por frame com TAB segurado
+replay = Replay.load(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[1] == "--replay" else None
+
+# Co-op em rede (net.py): "python game.py --host" roda a partida com um segundo herói e espera
+# um cliente na porta NET_PORT; "python game.py --join 127.0.0.1" (ou host:porta) joga com ele.
+# O host manda o estado NET_SEND_HZ vezes por segundo; o cliente desenha interpolando.
+NET_PORT = 50505
+NET_SEND_HZ = 20
+net_host = CoopHost(NET_PORT, NET_SEND_HZ, SIM_HZ) if "--host" in sys.argv else None
+net_client = CoopClient(sys.argv[sys.argv.index("--join") + 1], NET_PORT) if "--join" in sys.argv[:-1] else None
+net = net_host or net_client
+
+# Snapshots do mundo (snapshot.py): F5 salva, F9 carrega e BACKSPACE segurado volta no tempo
+# (um tick por frame, até REWIND_TICKS atrás). Desligados durante um replay e em rede.
+REWIND_TICKS = 600
+QUICKSAVE_PATH = os.path.join(loaders.root, "saves", "quicksave.pvs")
+SNAPSHOTS = replay is None and net is None
+
+# Toda a lógica do jogo vive no World (world.py); aqui só desenhamos e lemos o teclado
+if replay: world = replay.make_world()
+elif net_client: world = net_client.connect() # Espelho do mundo do host, preenchido pela rede
+else: world = World(seed=random.randrange(1 << 30), dungeon=MAP_SIZE, endless=ENDLESS, coop=net_host is not None, fog=FOG_OF_WAR,
+                   turns=TURN_BASED)
+if net_host: net_host.attach(world)
+camera = Camera(WIDTH, HEIGHT) # Segue o jogador em mapas maiores que a tela
+blend = Blend() # Interpolação do desenho entre os dois últimos ticks
+# Com o frame acima do orçamento (1/RENDER_FPS), o governador baixa a qualidade do desenho
+# em degraus (governor.py); o nível e as últimas decisões aparecem no painel do F3
+quality = Quality()
+governor = QualityGovernor(quality, 1000 / RENDER_FPS, bake=RENDER_MODE == "dirty")
+sim_dt = 1 / (replay.sim_hz if replay else SIM_HZ) # Um replay roda no passo em que foi gravado
 
 CX, CY = WIDTH // 2, HEIGHT // 2
 
@@ -53,533 +119,422 @@ btn_win_quit = Rect(CX - 150, CY + 150, 300, 60)
 # ------------------------
 # SISTEMA DE ÁUDIO
 # ------------------------
+# As trocas de música rodam numa thread (preload.py): o frame nunca espera o disco.
+# loaders.root é a pasta do jogo (o pgzero troca o __file__ deste módulo pelo dele)
+music_player = MusicPlayer(loaders.root)
+
 def play_music_track(track_name):
     global current_music
     if not sound_on:
-        if current_music: music.stop(); current_music = None
+        if current_music: music_player.stop(); current_music = None
         return
     if current_music != track_name:
-        try: music.play(track_name); current_music = track_name
-        except: pass 
+        music_player.play(track_name); current_music = track_name
 
 def stop_music_track():
     global current_music
-    music.stop(); current_music = None
+    music_player.stop(); current_music = None
+
+def prefetch_music():
+    """Lê antes a próxima música provável: chefe com poucos vampiros, fim perto do fim"""
+    if not world.boss_phase_active and len(world.enemies) <= 3: music_player.prefetch("boss")
+    if world.boss_phase_active and world.dracula.hp <= 5: music_player.prefetch("win")
+    if world.player.hp <= 3: music_player.prefetch("game_over")
+
+def play_world_events():
+    """Toca os sons/músicas pedidos pelo World no último step"""
+    for kind, name in world.events:
+        if kind == "music": play_music_track(name)
+        elif kind == "sound" and sound_on:
+            try: getattr(sounds, name).play()
+            except: pass
 
 # ------------------------
-# UTILITÁRIO
+# PRÉ-CARGA
 # ------------------------
-def get_frames(folder, filename, cols, rows):
-    try:
-        folder_obj = getattr(images, folder)
-        surf = getattr(folder_obj, filename)
-        sw, sh = surf.get_width(), surf.get_height()
-        frame_w, frame_h = sw // cols, sh // rows
-        frames_matrix = []
-        for r in range(rows):
-            row_frames = []
-            for c in range(cols):
-                rect = Rect(c * frame_w, r * frame_h, frame_w, frame_h)
-                row_frames.append(surf.subsurface(rect))
-            frames_matrix.append(row_frames)
-        return frames_matrix
-    except: return None
-
-def is_tile_free(x, y):
-    test_rect = Rect(x - 20, y - 20, 40, 40)
-    for wall in OBSTACLES:
-        if test_rect.colliderect(wall):
-            return False
-    return True
+# Roda numa thread enquanto o menu mostra o progresso; START só libera no fim.
+# Frames fatiados uma vez e compartilhados por todas as instâncias (sprites.py / scene.py)
+preloader = Preloader()
+# Na thread só a leitura; o convert_alpha (e guardar o fundo onde o pgzero procura) fica para o pump()
+preloader.add("art", read_frames, finish_art)
+preloader.add("background", lambda: image.load(os.path.join(loaders.root, "images", "backgrounds", "background.png")),
+              lambda surf: setattr(images.backgrounds, "background", surf.convert_alpha()))
+for name in ["click", "slash"]: preloader.add(name, lambda name=name: getattr(sounds, name))
+for track in ["menu", "game"]: preloader.add(track, lambda track=track: music_player.fetch(track))
 
 # ------------------------
-# CLASSE PLAYER (ROGUELIKE)
+# ENTRADA
 # ------------------------
-class Player:
-    def __init__(self, col, row):
-        # Define posição baseada na grade
-        self.x = col * TILE_SIZE + TILE_SIZE // 2
-        self.y = row * TILE_SIZE + TILE_SIZE // 2
-        
-        self.target_x = self.x
-        self.target_y = self.y
-        self.is_moving = False
-        
-        self.speed = 4 # Velocidade do deslize
-        self.state = "idle"
-        self.direction = "right" 
-        self.frame = 0.0
-        self.hp = 10 
-        self.frame_counts = {"idle": 4, "run": 6, "attack": 7, "death": 9}
-        self.attack_cooldown = 0.0
-    
-    def get_rect(self): return Rect(self.x - 16, self.y - 20, 32, 40)
-    # Ataque pega o quadrado da frente
-    def get_attack_rect(self): 
-        atk_x, atk_y = self.x, self.y
-        if self.direction == "left": atk_x -= TILE_SIZE
-        elif self.direction == "right": atk_x += TILE_SIZE
-        elif self.direction == "up": atk_y -= TILE_SIZE
-        elif self.direction == "down": atk_y += TILE_SIZE
-        return Rect(atk_x - 25, atk_y - 25, 50, 50)
-
-    def move_grid(self, dx, dy):
-        """Tenta mover para o próximo quadrado"""
-        if self.is_moving: return # Só aceita comando se parou de deslizar
-        
-        next_x = self.x + (dx * TILE_SIZE)
-        next_y = self.y + (dy * TILE_SIZE)
-        
-        # Atualiza direção
-        if dx > 0: self.direction = "right"
-        elif dx < 0: self.direction = "left"
-        elif dy > 0: self.direction = "down"
-        elif dy < 0: self.direction = "up"
-
-        if is_tile_free(next_x, next_y):
-            self.target_x = next_x
-            self.target_y = next_y
-            self.is_moving = True
-            self.state = "run"
-
-    def update(self, dt):
-        if game_state != "game": return
-        if self.attack_cooldown > 0: self.attack_cooldown -= dt
-
-        if self.hp > 0:
-            # 1. Lógica de Movimento Suave (Lerp)
-            if self.is_moving:
-                dx = self.target_x - self.x
-                dy = self.target_y - self.y
-                dist = math.sqrt(dx**2 + dy**2)
-                
-                if dist <= self.speed:
-                    # Chegou no quadrado
-                    self.x = self.target_x
-                    self.y = self.target_y
-                    self.is_moving = False
-                    self.state = "idle"
-                else:
-                    # Desliza em direção ao quadrado
-                    self.x += (dx / dist) * self.speed
-                    self.y += (dy / dist) * self.speed
-
-            # 2. Inputs (Só aceita se não estiver movendo)
-            elif self.state != "attack":
-                if keyboard.left: self.move_grid(-1, 0)
-                elif keyboard.right: self.move_grid(1, 0)
-                elif keyboard.up: self.move_grid(0, -1)
-                elif keyboard.down: self.move_grid(0, 1)
-
-            # 3. Ataque
-            if keyboard.space and self.attack_cooldown <= 0 and not self.is_moving:
-                self.state = "attack"
-                self.frame = 0.0
-                self.attack_cooldown = 0.5
-                
-                hitbox = self.get_attack_rect()
-                if boss_phase_active and hitbox.colliderect(dracula.get_rect()) and dracula.state != "death":
-                    dracula.take_damage(1)
-                
-                for enemy in enemies:
-                    if hitbox.colliderect(enemy.get_rect()) and enemy.state not in ["death", "gone"]:
-                        enemy.take_damage(1)
-                
-                if sound_on: 
-                    try: sounds.slash.play()
-                    except: pass
-        else:
-            self.state = "death"
-
-        # Animação
-        total = self.frame_counts.get(self.state, 4)
-        self.frame += 10 * dt 
-        if self.frame >= total:
-            if self.state == "attack": self.state = "idle"; self.frame = 0.0
-            elif self.state == "death": self.frame = total - 1
-            else: self.frame = 0.0
-
-    def draw(self):
-        img_name = f"{self.state}_{self.direction}_40x40"
-        try:
-            folder = getattr(images, "hero")
-            img_full = getattr(folder, img_name)
-            frames = self.frame_counts.get(self.state, 4)
-            fw = img_full.get_width() // frames
-            rect = Rect(int(self.frame) * fw, 0, fw, img_full.get_height())
-            screen.blit(img_full.subsurface(rect), (self.x - fw//2, self.y - img_full.get_height()//2))
-            
-        except: 
-            screen.draw.filled_circle((self.x, self.y), 15, "white")
-
-# ------------------------
-# CLASSE VAMPIRE (ROGUELIKE AI)
-# ------------------------
-class Vampire:
-    def __init__(self, col, row):
-        self.x = col * TILE_SIZE + TILE_SIZE // 2
-        self.y = row * TILE_SIZE + TILE_SIZE // 2
-        self.target_x = self.x
-        self.target_y = self.y
-        self.is_moving = False
-        
-        self.speed = 1.5 # Velocidade de deslize
-        self.state, self.direction = "idle", "down"
-        self.frame, self.hp = 0.0, 3
-        self.damage_dealt = False
-        self.death_timer = 0.0
-        self.move_timer = 0.0 # Delay para pensar
-        
-        self.sheets = {}
-        anim_files = {
-            "idle": ("vampire", "idle", 4, 4), "walk": ("vampire", "walk", 6, 4),
-            "run": ("vampire", "run", 8, 4), "attack": ("vampire", "attack", 12, 4),
-            "hurt": ("vampire", "hurt", 4, 4), "death": ("vampire", "death", 11, 4)
-        }
-        for k, v in anim_files.items(): self.sheets[k] = get_frames(*v)
-
-    def get_rect(self): return Rect(self.x - 20, self.y - 30, 40, 60)
-
-    def take_damage(self, amount):
-        if self.state in ["death", "gone"]: return
-        self.hp -= amount
-        self.state = "hurt"; self.frame = 0.0
-        if self.hp <= 0: self.hp = 0; self.state = "death"; self.frame = 0.0
-
-    def decide_move(self):
-        # IA simples de grade: Tenta alinhar X, se não der, alinha Y
-        if self.is_moving: return
-        
-        dx_grid = 0
-        dy_grid = 0
-        
-        # Calcula distância em TILES
-        diff_x = player.target_x - self.x
-        diff_y = player.target_y - self.y
-        
-        if abs(diff_x) > abs(diff_y):
-            if diff_x > TILE_SIZE: dx_grid = 1
-            elif diff_x < -TILE_SIZE: dx_grid = -1
-        else:
-            if diff_y > TILE_SIZE: dy_grid = 1
-            elif diff_y < -TILE_SIZE: dy_grid = -1
-            
-        if dx_grid == 0 and dy_grid == 0: return # Já está no mesmo tile
-
-        next_x = self.x + (dx_grid * TILE_SIZE)
-        next_y = self.y + (dy_grid * TILE_SIZE)
-        
-        # Atualiza direção visual
-        if dx_grid > 0: self.direction = "right"
-        elif dx_grid < 0: self.direction = "left"
-        elif dy_grid > 0: self.direction = "down"
-        elif dy_grid < 0: self.direction = "up"
-
-        # Só move se estiver livre
-        if is_tile_free(next_x, next_y):
-            self.target_x = next_x
-            self.target_y = next_y
-            self.is_moving = True
-            self.state = "run"
-
-    def update(self, dt):
-        if game_state != "game" or self.state == "gone": return
-
-        if self.state == "death":
-            self._animate(dt)
-            if self.frame >= 10:
-                self.death_timer += dt
-                if self.death_timer > 2.0: self.state = "gone"
-            return
-        
-        if player.hp <= 0: self.state = "idle"; self._animate(dt); return
-        if self.state == "hurt": self._animate(dt); return
-
-        # --- MOVIMENTO EM GRADE ---
-        if self.is_moving:
-            dx = self.target_x - self.x
-            dy = self.target_y - self.y
-            dist = math.sqrt(dx**2 + dy**2)
-            
-            if dist <= self.speed:
-                self.x = self.target_x
-                self.y = self.target_y
-                self.is_moving = False
-                self.state = "idle"
-                self.move_timer = 0.0 # Reseta timer de pensamento
-            else:
-                self.x += (dx / dist) * self.speed
-                self.y += (dy / dist) * self.speed
-        else:
-            # Delay para não andar todo frame (vampiros pensam)
-            self.move_timer += dt
-            if self.move_timer > 0.5: # Move a cada 0.5s
-                # Checa distância para atacar ou andar
-                dist_player = math.sqrt((player.x - self.x)**2 + (player.y - self.y)**2)
-                if dist_player <= TILE_SIZE * 1.5: # Ataque se estiver no quadrado vizinho
-                     self.state = "attack"; self.frame = 0.0; self.damage_dealt = False; self.move_timer = -1.0
-                else:
-                    self.decide_move()
-
-        # Ataque
-        if self.state == "attack":
-            if self.frame >= 6.0 and not self.damage_dealt:
-                if math.sqrt((player.x - self.x)**2 + (player.y - self.y)**2) <= TILE_SIZE * 1.8:
-                    player.hp -= 1; 
-                    if player.hp < 0: player.hp = 0
-                self.damage_dealt = True
-            self._animate(dt); return
-
-        self._animate(dt)
-
-    def _animate(self, dt):
-        sheet = self.sheets.get(self.state)
-        if not sheet: return
-        self.frame += 10 * dt
-        if self.frame >= len(sheet[0]):
-            if self.state in ["attack", "hurt"]: self.state = "idle"; self.frame = 0.0; self.damage_dealt = False
-            elif self.state == "death": self.frame = len(sheet[0]) - 1
-            else: self.frame = 0.0
-
-    def draw(self):
-        if self.state == "gone": return
-        sheet = self.sheets.get(self.state)
-        if not sheet: 
-            screen.draw.filled_circle((self.x, self.y), 20, "red"); return
-        dir_idx = {"down": 0, "up": 1, "left": 2, "right": 3}.get(self.direction, 0)
-        img = sheet[dir_idx][min(int(self.frame), len(sheet[dir_idx])-1)]
-        screen.blit(img, (self.x - img.get_width()//2, self.y - img.get_height()//2))
-
-# ------------------------
-# CLASSE DRACULA (BOSS - GRID)
-# ------------------------
-class Dracula:
-    def __init__(self, col, row):
-        self.x = col * TILE_SIZE + TILE_SIZE // 2
-        self.y = row * TILE_SIZE + TILE_SIZE // 2
-        self.target_x = self.x
-        self.target_y = self.y
-        self.is_moving = False
-        
-        self.speed = 2.0 # Mais rápido
-        self.state, self.direction = "idle", "down"
-        self.frame, self.hp = 0.0, 20
-        self.damage_dealt = False
-        self.death_timer = 0.0
-        self.move_timer = 0.0
-        self.sheets = {}
-        
-        anim_files = {
-            "idle": ("dracula", "idle", 4, 4), "walk": ("dracula", "walk", 6, 4),
-            "run": ("dracula", "run", 8, 4), "attack": ("dracula", "attack", 12, 4),
-            "hurt": ("dracula", "hurt", 4, 4), "death": ("dracula", "death", 11, 4)
-        }
-        for k, v in anim_files.items(): self.sheets[k] = get_frames(*v)
-        if self.sheets.get("hurt") is None: self.sheets["hurt"] = self.sheets.get("idle")
-
-    def get_rect(self): return Rect(self.x - 24, self.y - 36, 48, 72)
-
-    def take_damage(self, amount):
-        if not boss_phase_active: return 
-        if self.state in ["death", "gone"]: return
-        self.hp -= amount
-        if self.sheets.get("hurt"): self.state = "hurt"; self.frame = 0.0
-        if self.hp <= 0: self.hp = 0; self.state = "death"; self.frame = 0.0
-
-    def decide_move(self):
-        if self.is_moving: return
-        dx_grid, dy_grid = 0, 0
-        diff_x = player.target_x - self.x
-        diff_y = player.target_y - self.y
-        
-        # Boss persegue mais agressivamente
-        if abs(diff_x) > abs(diff_y):
-            if diff_x > 0: dx_grid = 1
-            elif diff_x < 0: dx_grid = -1
-        else:
-            if diff_y > 0: dy_grid = 1
-            elif diff_y < 0: dy_grid = -1
-
-        next_x = self.x + (dx_grid * TILE_SIZE)
-        next_y = self.y + (dy_grid * TILE_SIZE)
-        
-        if dx_grid > 0: self.direction = "right"
-        elif dx_grid < 0: self.direction = "left"
-        elif dy_grid > 0: self.direction = "down"
-        elif dy_grid < 0: self.direction = "up"
-
-        if is_tile_free(next_x, next_y):
-            self.target_x = next_x
-            self.target_y = next_y
-            self.is_moving = True
-            self.state = "run"
-
-    def update(self, dt):
-        global game_state, boss_phase_active
-        if game_state != "game": return
-        if self.state == "gone": return
-
-        if not boss_phase_active:
-            self.state = "idle"; self.direction = "up"; self._animate(dt); return
-        
-        if self.state == "death":
-            play_music_track("game") 
-            self._animate(dt)
-            if self.frame >= 10:
-                self.death_timer += dt
-                if self.death_timer > 3.0: self.state = "gone" 
-            return
-
-        if player.hp <= 0: self.state = "idle"; self._animate(dt); return
-        if self.state == "hurt": self._animate(dt); return
-
-        # Movimento Grade
-        if self.is_moving:
-            dx = self.target_x - self.x
-            dy = self.target_y - self.y
-            dist = math.sqrt(dx**2 + dy**2)
-            if dist <= self.speed:
-                self.x, self.y = self.target_x, self.target_y
-                self.is_moving = False
-                self.state = "idle"
-                self.move_timer = 0.0
-            else:
-                self.x += (dx / dist) * self.speed
-                self.y += (dy / dist) * self.speed
-        else:
-            self.move_timer += dt
-            if self.move_timer > 0.3: # Boss pensa rápido (0.3s)
-                dist_player = math.sqrt((player.x - self.x)**2 + (player.y - self.y)**2)
-                if dist_player <= TILE_SIZE * 1.8:
-                     self.state = "attack"; self.frame = 0.0; self.damage_dealt = False; self.move_timer = -1.5
-                else:
-                    self.decide_move()
-        
-        if self.state == "attack":
-            if self.frame >= 6.0 and not self.damage_dealt:
-                if math.sqrt((player.x - self.x)**2 + (player.y - self.y)**2) <= TILE_SIZE * 2.5:
-                    player.hp -= 2; 
-                    if player.hp < 0: player.hp = 0
-                self.damage_dealt = True
-            self._animate(dt); return
-
-        self._animate(dt)
-
-    def _animate(self, dt):
-        sheet = self.sheets.get(self.state)
-        if not sheet: return
-        self.frame += 10 * dt
-        total_frames = len(sheet[0])
-        if self.frame >= total_frames:
-            if self.state in ["attack", "hurt"]: self.state = "idle"; self.frame = 0.0; self.damage_dealt = False
-            elif self.state == "death": self.frame = total_frames - 1
-            else: self.frame = 0.0
-
-    def draw(self):
-        if self.state == "gone": return
-        sheet = self.sheets.get(self.state)
-        if not sheet: sheet = self.sheets.get("idle")
-        if not sheet: 
-            screen.draw.filled_circle((self.x, self.y), 25, "red"); return
-
-        dir_idx = {"down": 0, "up": 1, "left": 2, "right": 3}.get(self.direction, 0)
-        try:
-            current_frame = min(int(self.frame), len(sheet[dir_idx])-1)
-            img = sheet[dir_idx][current_frame]
-            screen.blit(img, (self.x - img.get_width()//2, self.y - img.get_height()//2))
-        except: 
-            screen.draw.filled_circle((self.x, self.y), 25, "red")
+def read_input():
+    """Converte o teclado do pgzero no comando (bits INPUT_*) do tick"""
+    command = 0
+    if keyboard.left: command |= INPUT_LEFT
+    if keyboard.right: command |= INPUT_RIGHT
+    if keyboard.up: command |= INPUT_UP
+    if keyboard.down: command |= INPUT_DOWN
+    if keyboard.space: command |= INPUT_ATTACK
+    return command
 
 # ------------------------
 # SETUP
 # ------------------------
+recorder = None
+replay_inputs = []
+accumulator = 0.0 # Tempo real ainda não simulado (< sim_dt depois de cada update)
+render_wait = 0.0 # Tempo desde o último frame desenhado
+behind = False # O último update precisou de mais de um tick
+skipped_frames = 0
+rewind = SnapshotRing(REWIND_TICKS)
+drawn_state = None # game_state do último frame desenhado
+scene_changed = True # Algum tick mudou o mundo desde o último frame desenhado
+
 def reset_game():
-    global player, dracula, enemies, boss_phase_active
-    boss_phase_active = False
-    
-    # Coordenadas em GRID (Coluna, Linha)
-    # (3, 5) -> Aprox 150, 250
-    player = Player(3, 5) 
-    
-    # Boss no centro-baixo (Coluna 8, Linha 12)
-    dracula = Dracula(8, 12)
-    dracula.direction = "up"
-    
-    enemies = []
-    # Posições do Grid para inimigos
-    grid_positions = [
-        (5, 7), (8, 7), (11, 7),
-        (5, 9), (8, 9), (11, 9)
-    ]
-    for pos in grid_positions:
-        enemies.append(Vampire(pos[0], pos[1]))
-        
-    play_music_track("game")
-
-player = Player(0,0)
-dracula = Dracula(0,0)
+    global recorder, replay_inputs, accumulator, scene_changed
+    finish_recording()
+    blend.clear()
+    scene_changed = True
+    if net_client: reset_background(); return # Quem recomeça a partida é o host
+    world.reset()
+    play_world_events()
+    if replay: replay_inputs = list(replay.commands)[::-1] # Consumido do fim com pop()
+    elif RECORD_REPLAYS: recorder = Recorder(world, SIM_HZ)
+    accumulator = 0.0
+    governor.reset(); reset_background()
+    rewind.clear()
+    if SNAPSHOTS: rewind.push(snapshot(world))
+    refreeze() # As entidades da partida anterior viraram lixo
+
+def refreeze():
+    """Artes, caches e o mundo atual não viram lixo: tira tudo das varreduras do GC (gc.freeze).
+    Descongela antes, senão o mundo e os pools trocados ficam na geração permanente para sempre.
+    O resto da partida recicla entidades e Rects, então as coletas ficam raras e curtas."""
+    global heap_frozen
+    gc.unfreeze(); gc.collect(); gc.freeze()
+    heap_frozen = True
+
+heap_frozen = False # Primeiro refreeze() quando a pré-carga termina
+
+def finish_recording():
+    """Grava a partida em andamento (se houver) em replays/"""
+    global recorder
+    if recorder and recorder.commands:
+        name = time.strftime("%Y%m%d-%H%M%S") + f"-{world.seed}.pvr"
+        try: recorder.save(os.path.join(loaders.root, "replays", name))
+        except OSError: pass
+    recorder = None
+
+atexit.register(finish_recording) # Janela fechada no meio da partida
+
+def restored():
+    """Depois de um restore: a tela e a música podem ter mudado"""
+    global scene_changed
+    scene_changed = True
+    reset_background()
+    blend.clear()
+    if world.status != "game": play_music_track(world.status)
+    else: play_music_track("boss" if world.boss_phase_active else "game")
+
+def rewind_tick():
+    """Volta um tick (BACKSPACE segurado); o primeiro snapshot da partida fica sempre no anel"""
+    if len(rewind) > 1:
+        finish_recording() # Antes do restore: o hash gravado é o do fim dos comandos gravados
+        rewind.pop(); restore(world, rewind.get()); restored()
+
+def quick_save():
+    if game_state in ["game", "paused"] and SNAPSHOTS:
+        try: save_file(QUICKSAVE_PATH, world)
+        except OSError: pass
+
+def quick_load():
+    global world, game_state
+    if not SNAPSHOTS or not preloader.ready() or not os.path.exists(QUICKSAVE_PATH): return
+    finish_recording() # Como no rewind_tick: grava antes de o mundo mudar
+    try: loaded = load_file(QUICKSAVE_PATH, world)
+    except (OSError, ValueError): return
+    if loaded is not world: world = loaded; world.profiler = profiler; refreeze() # Outra seed/mapa: mundo novo
+    rewind.clear(); rewind.push(snapshot(world))
+    game_state = world.status
+    restored()
+
+def next_command():
+    """Comando do próximo tick: do replay ou do teclado"""
+    if replay: return replay_inputs.pop() if replay_inputs else None
+    command = read_input()
+    if net_host: command |= net_host.command << ALLY_SHIFT # Teclado do cliente move o aliado
+    return command
+
+def hero():
+    """Herói desta máquina (a câmera segue ele)"""
+    return world.ally if net_client else world.player
+
+def update_client():
+    """Co-op (cliente): manda o teclado, aplica o estado mais novo do host e segue o status dele"""
+    global game_state
+    net_client.send_input(read_input() if game_state == "game" else 0)
+    net_client.poll(world, blend, camera)
+    blend.alpha = net_client.alpha()
+    if game_state != "paused" and world.status != game_state:
+        game_state = world.status # Fim de partida ou retry no host
+        play_music_track(world.status)
+    elif game_state == "game": play_music_track("boss" if world.boss_phase_active else "game")
 
 # ------------------------
 # CORE LOOPS
 # ------------------------
+def settled():
+    """Modo por turnos sem nada acontecendo desde o último frame desenhado: a tela já está certa"""
+    return world.turns and game_state == "game" == drawn_state and not scene_changed and \
+        not world.animating and not show_profiler
+
+def idle():
+    """Frame sem nada para simular nem redesenhar (o loop pode dormir até o próximo evento)"""
+    if not IDLE_WAIT_MS or show_profiler or net or replay or not preloader.ready(): return False
+    if game_state == "game": return settled() and not read_input() and not keyboard.backspace
+    return game_state == drawn_state and (game_state in STATIC_SCREENS or game_state == "paused")
+
+def wait_for_event():
+    """Bloqueia no SDL até chegar um evento (tecla, mouse, janela) ou passar IDLE_WAIT_MS;
+    o evento volta para a fila e o pgzero trata ele no próximo frame"""
+    event = sdl_event.wait(IDLE_WAIT_MS)
+    if event.type != NOEVENT: sdl_event.post(event)
+
 def update(dt):
-    global game_state, enemies, boss_phase_active
+    global game_state, accumulator, render_wait, behind, scene_changed
+    if idle(): wait_for_event() # Antes do governor.begin_frame: a espera não conta como trabalho
+    if profiler.enabled: profiler.begin_frame()
+    governor.begin_frame()
+    preloader.start() # Primeiro frame: a janela final já existe
+    preloader.pump()
+    if not heap_frozen and preloader.ready(): refreeze()
+    render_wait += dt
+    behind = False
     if game_state == "menu": play_music_track("menu")
-    if game_state == "game":
-        player.update(dt)
-        dracula.update(dt)
-        for e in enemies: e.update(dt)
-        enemies[:] = [e for e in enemies if e.state != "gone"]
-        if not boss_phase_active and len(enemies) == 0:
-            boss_phase_active = True; play_music_track("boss")
-        if player.hp <= 0 and player.state == "death" and player.frame >= 8:
-            game_state = "game_over"; play_music_track("game_over")
-        if dracula.state == "gone":
-            game_state = "win"; play_music_track("win")
+    if net_host: net_host.poll() # Também fora da partida: responde o HELLO de quem entra
+    if net_client:
+        if game_state != "menu": update_client()
+        return
+    if game_state == "game" and SNAPSHOTS and keyboard.backspace: rewind_tick(); return
+    if game_state != "game": accumulator = 0.0; return
+    speed = REPLAY_FAST_FORWARD if replay and keyboard.tab else 1
+    accumulator = min(accumulator + dt * speed, sim_dt * MAX_CATCHUP_TICKS * speed)
+    behind = speed == 1 and accumulator >= 2 * sim_dt # TAB no replay não conta como atraso
+    while accumulator >= sim_dt:
+        accumulator -= sim_dt
+        if accumulator < sim_dt: blend.capture(world, camera) # Último tick do frame: guarda o "antes"
+        command = next_command()
+        if command is None: game_state = "menu"; break # Replay acabou
+        world.step(sim_dt, command)
+        if net_host: net_host.send(world)
+        if world.quiet: continue # Modo por turnos parado: nada para gravar, guardar nem tocar
+        if recorder: recorder.record(command) # Depois do step: só os ticks que andaram
+        scene_changed = True
+        if SNAPSHOTS: rewind.push(snapshot(world))
+        play_world_events()
+        prefetch_music()
+        if world.status != "game": game_state = world.status; finish_recording(); break
+    blend.alpha = min(accumulator / sim_dt, 1.0)
+
+def render_due():
+    """Se este frame do jogo deve ser desenhado: no máximo RENDER_FPS por segundo, e pulado
+    enquanto a simulação recupera atraso (até MAX_SKIPPED_FRAMES seguidos)"""
+    global render_wait, skipped_frames
+    if (render_wait < 1 / RENDER_FPS - 0.002 or behind) and skipped_frames < MAX_SKIPPED_FRAMES:
+        skipped_frames += 1
+        return False
+    render_wait = skipped_frames = 0
+    return True
 
-def draw():
+def paint_menu(target):
+    target.fill((20, 20, 30))
+    target.draw.text(TITLE, center=(CX, 100), fontsize=60, color="red")
+    if preloader.ready():
+        target.draw.filled_rect(btn_start, (50, 200, 50)); target.draw.text("START", center=btn_start.center, fontsize=30)
+    else:
+        # Barra de progresso da pré-carga no lugar do START
+        target.draw.filled_rect(btn_start, (60, 60, 60))
+        fill = Rect(btn_start.x, btn_start.y, int(btn_start.w * preloader.progress()), btn_start.h)
+        if fill.w: target.draw.filled_rect(fill, (50, 120, 50))
+        target.draw.text(f"LOADING {int(preloader.progress() * 100)}%", center=btn_start.center, fontsize=30)
+    target.draw.filled_rect(btn_sound, (100,100,100)); target.draw.text("MUSIC ON/OFF", center=btn_sound.center, fontsize=30)
+    target.draw.filled_rect(btn_quit, (200, 50, 50)); target.draw.text("QUIT", center=btn_quit.center, fontsize=30)
+
+def paint_pause(target):
+    target.draw.filled_rect(Rect(0,0,WIDTH,HEIGHT), (0,0,0, 0.7))
+    target.draw.text("PAUSED", center=(CX, CY - 150), fontsize=80, color="yellow")
+    target.draw.filled_rect(btn_resume, (50, 200, 200)); target.draw.text("RESUME", center=btn_resume.center, fontsize=30)
+    target.draw.filled_rect(btn_to_menu, (150, 100, 200)); target.draw.text("MENU", center=btn_to_menu.center, fontsize=30)
+    target.draw.filled_rect(btn_p_quit, (200, 50, 50)); target.draw.text("QUIT", center=btn_p_quit.center, fontsize=30)
+
+def paint_game_over(target):
+    target.fill((50, 0, 0))
+    target.draw.text("GAME OVER", center=(CX, 200), fontsize=80, color="red")
+    target.draw.filled_rect(btn_retry, (50, 50, 200)); target.draw.text("RETRY", center=btn_retry.center, fontsize=30)
+    target.draw.filled_rect(btn_go_quit, (200, 50, 50)); target.draw.text("QUIT", center=btn_go_quit.center, fontsize=30)
+
+def paint_win(target):
+    target.fill((20, 50, 20))
+    target.draw.text("YOU WIN!", center=(CX, 150), fontsize=80, color="gold", owidth=2, ocolor="black")
+    target.draw.filled_rect(btn_win_menu, (150, 100, 200)); target.draw.text("MENU", center=btn_win_menu.center, fontsize=30, color="white")
+    target.draw.filled_rect(btn_win_quit, (200, 50, 50)); target.draw.text("QUIT", center=btn_win_quit.center, fontsize=30, color="white")
+
+STATIC_SCREENS = {"menu": paint_menu, "game_over": paint_game_over, "win": paint_win}
+
+renderer = None
+background = None # Cenário limpo da sala original (a camada estática recebe corpos pintados)
+static_view = None # Posição da câmera que a camada estática do renderer mostra
+fog_painted = None # Nível de névoa pintado na camada estática, por tile (None = nenhum)
+fog_version = None # world.fov.version que a camada estática mostra
+hud_state = None # hud_key da última vez que o HUD foi conferido (quality.hud_every)
+
+def reset_background():
+    """Tira do cenário os corpos pintados pelo governador e a névoa (partida nova, rewind, quick-load)"""
+    global static_view, fog_painted
+    if renderer and (quality.baked or fog_painted is not None): renderer.static.blit(background, (0, 0)); renderer.invalidate()
+    quality.reset()
+    static_view = fog_painted = None
+
+def restore_background(rect):
+    """Cenário de volta em rect (em coordenadas de tela): chão, corpos pintados e névoa"""
+    static = renderer.static
+    static.set_clip(rect)
+    if world.dungeon: draw_dungeon(static, world, camera.rect)
+    else: static.blit(background, (0, 0))
+    for near, img in quality.baked.values():
+        if near.colliderect(rect): static.blit(img, near)
+    if fog_painted is not None: static.blits(fog_blits(world, camera.rect, fog_painted, rect), False)
+    static.set_clip(None)
+
+def update_fog():
+    """Névoa na camada estática: inteira se o cenário foi refeito, senão só os tiles que mudaram"""
+    global fog_painted, fog_version
+    if fog_painted is None:
+        fog_painted = bytearray(world.fov.fog)
+        renderer.static.blits(fog_blits(world, camera.rect), False); renderer.invalidate()
+    else:
+        for rect in fog_changes(world, camera.rect, fog_painted): restore_background(rect); renderer.touch(rect)
+    fog_version = world.fov.version
+
+def update_baked():
+    """Corpos no cenário: apaga os que sumiram (ou todos, se o degrau foi desligado) e pinta
+    os que scene_sprites mandou pintar neste frame"""
+    baked, static = quality.baked, renderer.static
+    if baked:
+        for char in [c for c in baked if c.state != "death" or not quality.bake]:
+            rect = baked.pop(char)[0]
+            restore_background(rect); renderer.touch(rect) # Refaz também os corpos vizinhos
+    for char, img, pos in quality.to_bake:
+        rect = Rect(pos, img.get_size())
+        static.blit(img, rect); baked[char] = (rect, img); renderer.touch(rect)
+    quality.to_bake.clear()
+
+def draw_full():
     screen.clear()
-    if game_state == "menu":
-        screen.fill((20, 20, 30))
-        screen.draw.text(TITLE, center=(CX, 100), fontsize=60, color="red")
-        screen.draw.filled_rect(btn_start, (50, 200, 50)); screen.draw.text("START", center=btn_start.center, fontsize=30)
-        screen.draw.filled_rect(btn_sound, (100,100,100)); screen.draw.text("MUSIC ON/OFF", center=btn_sound.center, fontsize=30)
-        screen.draw.filled_rect(btn_quit, (200, 50, 50)); screen.draw.text("QUIT", center=btn_quit.center, fontsize=30)
+    if game_state in STATIC_SCREENS: STATIC_SCREENS[game_state](screen)
 
     elif game_state == "game" or game_state == "paused":
-        try: screen.blit(images.backgrounds.background, (0,0))
-        except: screen.fill((50,50,50)) 
-        
-        all_chars = [p for p in enemies if p.state != "death"] + [player, dracula]
-        dead_enemies = [p for p in enemies if p.state == "death"]
-        for char in dead_enemies: char.draw()
-        all_chars.sort(key=lambda c: c.y)
-        for char in all_chars: char.draw()
-            
-        screen.draw.text(f"HP: {player.hp}", (20, 20), color="red" if player.hp < 4 else "white", fontsize=40, owidth=1.5, ocolor="black")
-        if boss_phase_active:
-            screen.draw.text(f"BOSS: {dracula.hp}", (WIDTH-180, 20), color="red", fontsize=40, owidth=1.5, ocolor="black")
-        else:
-            screen.draw.text(f"MINIONS: {len(enemies)}", (WIDTH-200, 20), color="yellow", fontsize=30, owidth=1.5, ocolor="black")
-
-        if game_state == "paused":
-            screen.draw.filled_rect(Rect(0,0,WIDTH,HEIGHT), (0,0,0, 0.7))
-            screen.draw.text("PAUSED", center=(CX, CY - 150), fontsize=80, color="yellow")
-            screen.draw.filled_rect(btn_resume, (50, 200, 200)); screen.draw.text("RESUME", center=btn_resume.center, fontsize=30)
-            screen.draw.filled_rect(btn_to_menu, (150, 100, 200)); screen.draw.text("MENU", center=btn_to_menu.center, fontsize=30)
-            screen.draw.filled_rect(btn_p_quit, (200, 50, 50)); screen.draw.text("QUIT", center=btn_p_quit.center, fontsize=30)
-            
-    elif game_state == "game_over":
-        screen.fill((50, 0, 0))
-        screen.draw.text("GAME OVER", center=(CX, 200), fontsize=80, color="red")
-        screen.draw.filled_rect(btn_retry, (50, 50, 200)); screen.draw.text("RETRY", center=btn_retry.center, fontsize=30)
-        screen.draw.filled_rect(btn_go_quit, (200, 50, 50)); screen.draw.text("QUIT", center=btn_go_quit.center, fontsize=30)
+        camera.follow(world, blend, hero())
+        draw_scene_full(screen, world, profiler.lap, camera, blend, quality)
+
+        if game_state == "paused": paint_pause(screen)
+
+    if show_profiler: screen.blit(*profiler_panel())
+
+def draw_dirty():
+    global renderer, background, static_view, hud_state, fog_painted, display_rects
+    display_rects = None # Desenho direto na tela (menu carregando, painel em tela parada): janela inteira
+    if renderer is None or renderer.surface is not screen.surface:
+        background = make_static_layer(WIDTH, HEIGHT)
+        renderer = DirtyRenderer(screen.surface, background.copy())
+        static_view = fog_painted = None; quality.baked.clear()
+    if game_state == "menu" and not preloader.ready():
+        # Menu muda a cada frame enquanto carrega: desenha direto, sem cache
+        paint_menu(screen); renderer.invalidate()
+    elif game_state in STATIC_SCREENS:
+        renderer.show_screen(game_state, STATIC_SCREENS[game_state]); display_rects = renderer.dirty
+    elif game_state == "paused":
+        # O overlay da pausa é opaco: a tela inteira fica parada
+        renderer.show_screen("paused", paint_pause); display_rects = renderer.dirty
+    elif game_state == "game":
+        camera.follow(world, blend, hero())
+        if world.dungeon and static_view != camera.rect.topleft:
+            # Câmera andou: recompõe o cenário com os chunks visíveis e redesenha a tela toda
+            draw_dungeon(renderer.static, world, camera.rect); renderer.invalidate()
+            static_view = camera.rect.topleft; quality.baked.clear() # Corpos pintados são refeitos
+            fog_painted = None
+        if world.fov and (fog_painted is None or fog_version != world.fov.version): update_fog()
+        profiler.lap("draw.background")
+        sprites = scene_sprites(world, camera, blend, quality); profiler.lap("draw.scene")
+        if quality.baked or quality.to_bake: update_baked()
+        if show_profiler: sprites.append(("profiler",) + profiler_panel())
+        if hud_state is None or quality.frame % quality.hud_every == 0: hud_state = hud_key(world)
+        renderer.draw_scene(sprites, hud_state, lambda: [text_sprite(text, **kwargs) for text, kwargs in hud_texts(world)])
+        display_rects = renderer.dirty
+        profiler.lap("draw.dirty")
+        return
+    if show_profiler:
+        # Telas paradas: desenha o painel por cima e força recompor no próximo frame
+        screen.blit(*profiler_panel()); renderer.invalidate(); display_rects = None
+
+# O pgzero chama display.flip() depois de todo draw(). No modo "dirty" só os retângulos que o
+# último draw() mudou vão para a janela: None = a tela inteira, [] = nada mudou
+display_rects = None
+window_active = False
+flip = getattr(display.flip, "__wrapped__", display.flip) # O original, mesmo se o game.py rodar de novo
+
+def present():
+    """Substitui o display.flip do pgzero: manda para a janela só o que mudou. Quando a janela
+    volta a ficar ativa (minimizada, escondida) vai a tela inteira."""
+    global display_rects, window_active
+    active = display.get_active()
+    if display_rects is None or (active and not window_active): flip()
+    elif display_rects: display.update(display_rects)
+    window_active, display_rects = active, None
+
+present.__wrapped__ = flip
+display.flip = present
 
-    elif game_state == "win":
-        screen.fill((20, 50, 20))
-        screen.draw.text("YOU WIN!", center=(CX, 150), fontsize=80, color="gold", owidth=2, ocolor="black")
-        screen.draw.filled_rect(btn_win_menu, (150, 100, 200)); screen.draw.text("MENU", center=btn_win_menu.center, fontsize=30, color="white")
-        screen.draw.filled_rect(btn_win_quit, (200, 50, 50)); screen.draw.text("QUIT", center=btn_win_quit.center, fontsize=30, color="white")
+def draw():
+    global drawn_state, scene_changed, display_rects
+    if game_state == "game" and (settled() or not render_due()):
+        governor.end_frame(); display_rects = []; return # A tela (e a janela) mantém o último frame
+    drawn_state, scene_changed = game_state, False
+    if profiler.enabled: profiler.skip()
+    if RENDER_MODE == "dirty": draw_dirty()
+    else: draw_full(); display_rects = None
+    governor.end_frame(adapt=game_state == "game")
+    if profiler.enabled:
+        profiler.lap("draw.overlay")
+        profiler.end_frame(enemies=len(world.enemies), dirty=len(renderer.dirty) if renderer and RENDER_MODE == "dirty" else 0,
+                           ai=world.ai.decisions, ai_wait=world.ai.deferred, quality=governor.level)
+
+# ------------------------
+# PROFILER
+# ------------------------
+profiler = FrameProfiler(log_path=PROFILER_LOG) if PROFILER_LOG else NULL_PROFILER
+show_profiler = PROFILER_LOG is not None
+world.profiler = profiler
+_panel = {"surf": None, "at": 0.0}
+
+def profiler_panel():
+    """Painel com FPS, percentis, contagens e ms por fase; re-renderizado 4x por segundo"""
+    now = time.perf_counter()
+    if _panel["surf"] is None or now - _panel["at"] > 0.25:
+        lines = profiler.report_lines() + governor.report_lines() + (net.report_lines() if net else [])
+        lines.append(f"frames em cache {cache_size()}")
+        if SNAPSHOTS: lines.append(f"rewind {len(rewind)} ticks  {rewind.memory() / 1024:.0f} KB")
+        surf = Surface((330, 16 * len(lines) + 8), SRCALPHA)
+        surf.fill((0, 0, 0, 170))
+        for i, line in enumerate(lines):
+            ptext.draw(line, (6, 4 + 16 * i), fontsize=18, color="white", surf=surf)
+        _panel["surf"], _panel["at"] = surf, now
+    return _panel["surf"], (10, HEIGHT - _panel["surf"].get_height() - 10)
+
+def toggle_profiler():
+    global profiler, show_profiler
+    if profiler is NULL_PROFILER:
+        profiler = FrameProfiler(log_path=PROFILER_LOG)
+        world.profiler = profiler
+    show_profiler = not show_profiler
 
 def on_mouse_down(pos):
     global game_state, sound_on
@@ -588,13 +543,13 @@ def on_mouse_down(pos):
         except: pass
 
     if game_state == "menu":
-        if btn_start.collidepoint(pos): reset_game(); game_state = "game"
+        if btn_start.collidepoint(pos) and preloader.ready(): reset_game(); game_state = "game"
         if btn_sound.collidepoint(pos): sound_on = not sound_on; (stop_music_track() if not sound_on else play_music_track("menu"))
         if btn_quit.collidepoint(pos): quit()
     elif game_state == "paused":
         if btn_resume.collidepoint(pos): game_state = "game"
-        if btn_to_menu.collidepoint(pos): game_state = "menu"; play_music_track("menu")
-        if btn_p_quit.collidepoint(pos): quit()
+        if btn_to_menu.collidepoint(pos): game_state = "menu"; play_music_track("menu"); finish_recording()
+        if btn_p_quit.collidepoint(pos): finish_recording(); quit()
     elif game_state == "game_over":
         if btn_retry.collidepoint(pos): reset_game(); game_state = "game"
         if btn_go_quit.collidepoint(pos): quit()
@@ -604,8 +559,12 @@ def on_mouse_down(pos):
 
 def on_key_down(key):
     global game_state
+    if key == keys.F3: toggle_profiler()
+    if key == keys.F5: quick_save()
+    if key == keys.F9: quick_load()
     if key == keys.ESCAPE:
+        if recorder and game_state in ["game", "paused"]: recorder.mark(INPUT_PAUSE)
         if game_state == "game": game_state = "paused"
         elif game_state == "paused": game_state = "game"
 
-pgzrun.go()
\ No newline at end of file
+pgzrun.go()
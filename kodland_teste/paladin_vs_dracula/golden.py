@@ -0,0 +1,237 @@
+# golden.py
+# Regressão visual do desenho: roda o game.py de verdade (drivers "dummy" do SDL), leva o jogo
+# por cenários roteirizados, captura o screen no fim de cada um e compara com os PNGs de
+# goldens/ pixel a pixel, com tolerância. Cada cenário roda nos dois RENDER_MODE e o tempo
+# de cada draw() é medido. O JSON de saída tem o formato do bench.py, então o compare de lá serve.
+#
+#   python golden.py record                      (grava/atualiza os PNGs de referência)
+#   python golden.py check --out depois.json     (compara; falhas vão para goldens/failed/)
+#   python golden.py check --scenarios pause,boss --tolerance 4
+#   python bench.py compare antes.json depois.json
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import types
+
+import pygame
+from world import World, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_ATTACK, ALLY_SHIFT
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_DIR = os.path.join(ROOT, "goldens")
+FAILED_DIR = os.path.join(GOLDEN_DIR, "failed")
+SEED = 1234
+MODES = ["dirty", "full"]
+
+# Entrada roteirizada (repete): ataca, anda um tile e ataca de novo, em quadrado
+SCRIPT = ([INPUT_ATTACK] * 20 + [INPUT_RIGHT] * 12 + [INPUT_ATTACK] * 20 + [INPUT_DOWN] * 12 +
+          [INPUT_ATTACK] * 20 + [INPUT_LEFT] * 12 + [INPUT_ATTACK] * 20 + [INPUT_UP] * 12)
+
+# ------------------------
+# JOGO HEADLESS
+# ------------------------
+def load_game():
+    """Executa o game.py como o pgzero faria, sem abrir o loop; devolve o módulo já com as artes"""
+    from pgzero import runner
+    from pgzero.screen import Screen
+    path = os.path.join(ROOT, "game.py")
+    sys.argv = [path] # Sem --replay/--host/--join
+    game = types.ModuleType("game")
+    game.__file__ = path
+    sys.modules["game"] = game
+    sys._pgzrun = True # pgzrun.go() no fim do game.py não roda o loop
+    runner.prepare_mod(game)
+    with open(path, encoding="utf-8") as f: exec(compile(f.read(), path, "exec"), game.__dict__)
+    game.screen = Screen(pygame.display.set_mode((game.WIDTH, game.HEIGHT)))
+    game.sound_on = False
+    game.RECORD_REPLAYS = False
+    game.governor.budget = math.inf # O nível de qualidade não pode depender da máquina
+    game.IDLE_WAIT_MS = 0 # Telas paradas não esperam eventos
+    game.preloader.start()
+    while not game.preloader.ready(): game.preloader.pump(); time.sleep(0.005)
+    return game
+
+class Driver:
+    """Leva o jogo de um estado ao outro: um update de um tick e um draw() medido por frame"""
+    def __init__(self, game, mode):
+        self.game, self.times = game, []
+        game.RENDER_MODE = mode
+        game.renderer = None # Cache do renderer por retângulos sujos começa vazio em todo cenário
+        game.game_state = "menu"
+        self.command = 0
+        game.read_input = lambda: self.command
+
+    def start(self, world):
+        """Partida nova neste mundo (como o START do menu)"""
+        g = self.game
+        g.world = world
+        world.profiler = g.profiler
+        g.reset_game()
+        g.game_state = "game"
+
+    def play(self, ticks, script=None, ally=None):
+        """ticks frames de jogo, um tick cada, com a entrada de script (e do aliado, no co-op)"""
+        for i in range(ticks):
+            command = script[i % len(script)] if script else 0
+            if ally: command |= ally[i % len(ally)] << ALLY_SHIFT
+            self.command = command
+            self.game.update(self.game.sim_dt)
+            self.draw()
+
+    def draw(self):
+        start = time.perf_counter()
+        self.game.draw()
+        self.times.append(time.perf_counter() - start)
+
+# ------------------------
+# CENÁRIOS
+# ------------------------
+def scene_menu(d):
+    d.draw()
+
+def scene_arena(d):
+    d.start(World(SEED)); d.play(240, SCRIPT)
+
+def scene_dead_enemies(d):
+    """Mortos embaixo dos vivos: três vampiros no meio da animação de morte"""
+    world = World(SEED)
+    d.start(world); d.play(30, SCRIPT)
+    for e in world.enemies[:3]: e.take_damage(e.hp)
+    d.play(12)
+
+def scene_pause(d):
+    d.start(World(SEED)); d.play(90, SCRIPT)
+    d.game.on_key_down(d.game.keys.ESCAPE); d.draw()
+
+def scene_boss(d):
+    world = World(SEED)
+    d.start(world); world.clear_enemies(); d.play(120, SCRIPT)
+
+def scene_endless(d):
+    d.start(World(SEED, endless=True)); d.play(300, SCRIPT)
+
+def scene_dungeon(d):
+    d.start(World(SEED, dungeon=(60, 60))); d.play(240, SCRIPT)
+
+def scene_coop(d):
+    d.start(World(SEED, coop=True)); d.play(180, SCRIPT, SCRIPT[::-1])
+
+def scene_fog(d):
+    d.start(World(SEED, fog=True)); d.play(240, SCRIPT)
+
+def scene_fog_dungeon(d):
+    """Névoa com câmera andando: tiles já vistos escurecidos e o resto preto"""
+    d.start(World(SEED, dungeon=(60, 60), fog=True)); d.play(240, SCRIPT)
+
+def scene_turns(d):
+    """Modo por turnos: inimigos no meio do passo deles enquanto o herói ataca"""
+    d.start(World(SEED, turns=True)); d.play(200, SCRIPT)
+
+def scene_game_over(d):
+    world = World(SEED)
+    d.start(world); world.player.hp = 0; d.play(90)
+
+# nome -> função que leva o jogo até o quadro capturado
+SCENARIOS = {
+    "menu": scene_menu,
+    "arena": scene_arena,
+    "dead_enemies": scene_dead_enemies,
+    "pause": scene_pause,
+    "boss": scene_boss,
+    "endless": scene_endless,
+    "dungeon": scene_dungeon,
+    "coop": scene_coop,
+    "fog": scene_fog,
+    "fog_dungeon": scene_fog_dungeon,
+    "turns": scene_turns,
+    "game_over": scene_game_over,
+}
+
+# ------------------------
+# COMPARAÇÃO DE IMAGENS
+# ------------------------
+def compare_images(actual, golden, tolerance):
+    """(pixels com algum canal diferindo mais que tolerance, maior diferença, máscara RGB ou None)"""
+    a, b = pygame.image.tobytes(actual, "RGB"), pygame.image.tobytes(golden, "RGB")
+    if a == b: return 0, 0, None
+    if actual.get_size() != golden.get_size(): return actual.get_width() * actual.get_height(), 255, None
+    bad = worst = 0
+    mask = bytearray(len(a))
+    for i in range(0, len(a), 3):
+        diff = max(abs(a[i] - b[i]), abs(a[i + 1] - b[i + 1]), abs(a[i + 2] - b[i + 2]))
+        if diff > worst: worst = diff
+        if diff > tolerance: bad += 1; mask[i] = 255
+    return bad, worst, mask
+
+def timing(times):
+    times = sorted(times)
+    return sum(times) * 1000 / len(times), times[min(len(times) - 1, int(0.99 * len(times)))] * 1000
+
+def run(args):
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    game = load_game()
+    results, failures = {}, 0
+    for name in names:
+        result, frames = {}, {}
+        for mode in MODES:
+            d = Driver(game, mode)
+            SCENARIOS[name](d)
+            frames[mode] = game.screen.surface.copy()
+            result[f"draw_{mode}_ms"], result[f"draw_{mode}_p99_ms"] = timing(d.times)
+            result["frames"] = len(d.times)
+        path = os.path.join(GOLDEN_DIR, name + ".png")
+        if args.command == "record":
+            os.makedirs(GOLDEN_DIR, exist_ok=True)
+            pygame.image.save(frames["dirty"], path)
+            # Os dois modos têm que desenhar a mesma coisa; senão a referência não vale
+            bad = compare_images(frames["full"], frames["dirty"], 0)[0]
+            status = "gravado" + (f" (AVISO: modo full difere em {bad} pixels)" if bad else "")
+        elif not os.path.exists(path):
+            status = "SEM REFERÊNCIA (rode record)"; failures += 1
+        else:
+            golden = pygame.image.load(path)
+            status = "ok"
+            for mode in MODES:
+                bad, worst, mask = compare_images(frames[mode], golden, args.tolerance)
+                result[f"diff_{mode}_pixels"] = bad
+                if bad <= args.max_pixels: continue
+                failures += 1
+                status = f"DIFERENTE ({mode}: {bad} pixels, até {worst} por canal)"
+                os.makedirs(FAILED_DIR, exist_ok=True)
+                pygame.image.save(frames[mode], os.path.join(FAILED_DIR, f"{name}-{mode}.png"))
+                if mask: pygame.image.save(pygame.image.frombytes(bytes(mask), golden.get_size(), "RGB"),
+                                           os.path.join(FAILED_DIR, f"{name}-{mode}-diff.png"))
+                break
+        results[name] = result
+        print(f"{name:<13} {result['frames']:4d} frames  dirty {result['draw_dirty_ms']:7.3f} ms (p99 {result['draw_dirty_p99_ms']:7.3f})  "
+              f"full {result['draw_full_ms']:7.3f} ms (p99 {result['draw_full_p99_ms']:7.3f})  {status}", flush=True)
+    if args.out:
+        report = {"meta": {"seed": SEED, "time": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                           "pygame": pygame.version.ver, "platform": platform.platform()},
+                  "results": results}
+        with open(args.out, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+        print(f"tempos salvos em {args.out}")
+    if args.command == "check": print(f"{failures} cenário(s) diferente(s) da referência")
+    return 1 if failures else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Regressão visual (golden frames) e tempo de desenho do Paladin vs Dracula")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command, help in [("record", "grava os PNGs de referência em goldens/"), ("check", "compara com goldens/")]:
+        p = sub.add_parser(command, help=help)
+        p.add_argument("--scenarios", help="lista separada por vírgula (padrão: todos): " + ", ".join(SCENARIOS))
+        p.add_argument("--out", help="JSON com os ms de desenho (formato do bench.py compare)")
+        if command == "check":
+            p.add_argument("--tolerance", type=int, default=2, help="diferença por canal que ainda conta como igual")
+            p.add_argument("--max-pixels", type=int, default=0, help="pixels diferentes tolerados por cenário")
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+if __name__ == "__main__":
+    main()
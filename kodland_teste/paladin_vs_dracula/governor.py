@@ -0,0 +1,81 @@
+# governor.py
+# Governador de qualidade: mede o trabalho de cada frame (update + draw, sem a espera do
+# relógio) e, quando a média passa do orçamento, desliga efeitos do desenho em degraus;
+# com folga de novo, religa do último para o primeiro. Só mexe em scene.Quality: a
+# simulação, os replays e os snapshots não mudam com o nível.
+import time
+from collections import deque
+
+# Degraus em ordem: cada nível vale junto com os anteriores
+LEVELS = [
+    ("cheia", {}),
+    ("animação longe 1/2", {"far_anim": 2}),
+    ("animação longe 1/4", {"far_anim": 4}),
+    ("sem animação de morte", {"dying": False}),
+    ("corpos no cenário", {"bake": True}),
+    ("HUD 2x por segundo", {"hud_every": 30}),
+]
+DEFAULTS = {"far_anim": 1, "dying": True, "bake": False, "hud_every": 1}
+
+SMOOTHING = 0.1 # Peso do frame novo na média móvel
+DOWN_AT, DOWN_FRAMES = 0.9, 15 # Acima de 90% do orçamento por 15 frames: desce um nível
+UP_AT, UP_FRAMES = 0.5, 180 # Abaixo de 50% por 3s (a 60 FPS): sobe um nível
+MAX_UP_WAIT = UP_FRAMES * 8 # Subidas que não se sustentam dobram a espera até este limite
+
+class QualityGovernor:
+    """begin_frame() no começo do update, end_frame() no fim do draw; adapt=False (menus,
+    pausa) só mede. bake=False tira o degrau dos corpos (modo "full" não tem cenário em cache)."""
+    def __init__(self, quality, budget_ms, bake=True):
+        self.quality = quality
+        self.budget = budget_ms
+        self.levels = [level for level in LEVELS if bake or "bake" not in level[1]]
+        self.level = 0
+        self.avg = 0.0 # ms por frame (média móvel)
+        self.hot = self.calm = 0 # Frames seguidos acima / abaixo dos limites
+        self.up_wait = UP_FRAMES
+        self.frames = 0
+        self.last_up = None # Frame da última subida (para saber se ela se sustentou)
+        self.log = deque(maxlen=4) # Últimas decisões, para o painel do F3
+        self._start = None
+
+    def begin_frame(self):
+        self._start = time.perf_counter()
+
+    def end_frame(self, adapt=True):
+        if self._start is None: return
+        ms = (time.perf_counter() - self._start) * 1000
+        self._start = None
+        self.frames += 1
+        self.avg += (ms - self.avg) * SMOOTHING
+        if not adapt: self.hot = self.calm = 0; return
+        if self.avg > self.budget * DOWN_AT: self.hot += 1; self.calm = 0
+        elif self.avg < self.budget * UP_AT: self.calm += 1; self.hot = 0
+        else: self.hot = self.calm = 0
+        if self.hot >= DOWN_FRAMES and self.level < len(self.levels) - 1:
+            # Caiu logo depois de subir: espera mais antes de tentar de novo
+            if self.last_up is not None and self.frames - self.last_up < self.up_wait:
+                self.up_wait = min(self.up_wait * 2, MAX_UP_WAIT)
+            self.set_level(self.level + 1)
+        elif self.calm >= self.up_wait and self.level > 0:
+            self.last_up = self.frames
+            self.set_level(self.level - 1)
+
+    def set_level(self, level):
+        """Aplica o nível (0 = qualidade cheia) em self.quality"""
+        down = level > self.level
+        settings = dict(DEFAULTS)
+        for _, changes in self.levels[:level + 1]: settings.update(changes)
+        for name, value in settings.items(): setattr(self.quality, name, value)
+        self.level, self.hot, self.calm = level, 0, 0
+        self.log.append(f"{'desce' if down else 'sobe'} para {level}: {self.levels[level][0]} ({self.avg:.1f} ms)")
+
+    def reset(self):
+        """Partida nova: volta à qualidade cheia e esquece o histórico"""
+        if self.level: self.set_level(0)
+        self.avg, self.up_wait, self.last_up = 0.0, UP_FRAMES, None
+        self.log.clear()
+
+    def report_lines(self):
+        lines = [f"qualidade {self.level}/{len(self.levels) - 1}: {self.levels[self.level][0]}  "
+                 f"{self.avg:.1f}/{self.budget:.1f} ms"]
+        return lines + list(self.log)
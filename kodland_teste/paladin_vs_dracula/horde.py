@@ -0,0 +1,281 @@
+# horde.py
+# Backend opcional da horda de vampiros em NumPy (struct-of-arrays).
+# Mesmo comportamento da classe Vampire, mas movimento, timers, animação e
+# checagem de alcance rodam em lote sobre arrays em vez de objeto por objeto.
+import numpy as np
+from pygame import Rect
+from world import Vampire, VAMPIRE_CLIPS, VAMPIRE_AGGRO_SQ, VAMPIRE_HIT_SQ, TILE_SIZE, UNREACHABLE
+from world import VAMPIRE_HP, VAMPIRE_SPEED, VAMPIRE_THINK, VAMPIRE_DAMAGE, VAMPIRE_ATTACK_REST, AI_NEAR, AI_FAR_THINK
+
+from animation import STATES, STATE_ID, DIRECTIONS, DIRECTION_ID, HOLD, TO_IDLE, clip_arrays
+
+# Estados e direções guardados como inteiros (ids do animation.py)
+IDLE, RUN, ATTACK, HURT, DEATH, GONE = (STATE_ID[s] for s in ["idle", "run", "attack", "hurt", "death", "gone"])
+
+# Clipes do Vampire por id de estado: frames, fps e o que fazer no fim ("gone" nunca anima)
+CLIP_FRAMES, CLIP_FPS, CLIP_END = clip_arrays(VAMPIRE_CLIPS)
+
+def _column(name, cast=float):
+    """Propriedade do proxy que lê/escreve a posição i de um array da horda"""
+    def get(self): return cast(getattr(self.horde, name)[self.i])
+    def set(self, value): getattr(self.horde, name)[self.i] = value
+    return property(get, set)
+
+class HordeVampire:
+    """Proxy leve de um vampiro da horda: mesma interface da classe Vampire.
+
+    É o que fica em world.enemies, na grade de ocupação e no índice espacial;
+    os dados de verdade moram nos arrays do VampireHorde.
+    """
+    __slots__ = ("horde", "world", "i", "rect")
+
+    def __init__(self, horde, i):
+        self.horde, self.world, self.i = horde, horde.world, i
+        self.rect = Rect(0, 0, 0, 0)
+
+    x = _column("x")
+    y = _column("y")
+    target_x = _column("target_x")
+    target_y = _column("target_y")
+    speed = _column("speed")
+    frame = _column("frame")
+    hp = _column("hp", int)
+    move_timer = _column("move_timer")
+    death_timer = _column("death_timer")
+    is_moving = _column("moving", bool)
+    damage_dealt = _column("damage_dealt", bool)
+
+    @property
+    def state(self): return STATES[self.horde.state[self.i]]
+    @state.setter
+    def state(self, value): self.horde.state[self.i] = STATE_ID[value]
+
+    @property
+    def direction(self): return DIRECTIONS[self.horde.direction[self.i]]
+    @direction.setter
+    def direction(self, value): self.horde.direction[self.i] = DIRECTION_ID[value]
+
+    # As decisões continuam por entidade (são raras): reaproveita o código do Vampire
+    get_rect = Vampire.get_rect
+    take_damage = Vampire.take_damage
+    decide_move = Vampire.decide_move
+
+class VampireHorde:
+    """Todos os vampiros em arrays paralelos; update(dt) avança a horda inteira em lote."""
+    def __init__(self, world, capacity=64):
+        self.world = world
+        self.capacity = 0
+        self.count = 0 # Slots já usados (vivos ou livres)
+        self.free = [] # Slots de vampiros "gone" para reaproveitar
+        self.members = []
+        self.proxies = [] # Um proxy por slot, criado no primeiro uso e reaproveitado depois
+        self._flow_version, self._flow_dist = None, None
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        def grow(arr, dtype):
+            new = np.zeros(capacity, dtype=dtype)
+            if arr is not None: new[:len(arr)] = arr
+            return new
+        g = lambda name, dtype: grow(getattr(self, name, None), dtype)
+        for name in ["x", "y", "target_x", "target_y", "speed", "frame", "move_timer", "death_timer"]:
+            setattr(self, name, g(name, np.float64))
+        self.hp = g("hp", np.int32)
+        self.state = g("state", np.int8)
+        self.direction = g("direction", np.int8)
+        self.moving = g("moving", np.bool_)
+        self.damage_dealt = g("damage_dealt", np.bool_)
+        self.cell_x = g("cell_x", np.int32)
+        self.cell_y = g("cell_y", np.int32)
+        if self.capacity == 0: self.state[:] = GONE
+        else: self.state[self.capacity:] = GONE
+        self.members.extend([None] * (capacity - self.capacity))
+        self.proxies.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    def clear(self):
+        self.state[:] = GONE
+        self.count = 0
+        self.free = []
+        self.members = [None] * self.capacity
+
+    def spawn(self, col, row):
+        """Cria um vampiro no tile (col, row) e devolve o proxy dele"""
+        if self.free: i = self.free.pop()
+        else:
+            if self.count == self.capacity: self._grow(self.capacity * 2)
+            i = self.count; self.count += 1
+        x = col * TILE_SIZE + TILE_SIZE // 2
+        y = row * TILE_SIZE + TILE_SIZE // 2
+        self.x[i] = self.target_x[i] = x
+        self.y[i] = self.target_y[i] = y
+        self.cell_x[i], self.cell_y[i] = x // TILE_SIZE, y // TILE_SIZE
+        self.speed[i] = VAMPIRE_SPEED # Velocidade de deslize
+        self.state[i], self.direction[i] = IDLE, DIRECTION_ID["down"]
+        self.frame[i], self.hp[i] = 0.0, VAMPIRE_HP
+        self.moving[i] = self.damage_dealt[i] = False
+        self.death_timer[i] = self.move_timer[i] = 0.0
+        member = self.members[i] = self.proxy(i)
+        self.world.grid.claim(member, x, y)
+        self.world.spatial.update(member)
+        return member
+
+    def proxy(self, i):
+        p = self.proxies[i]
+        if p is None: p = self.proxies[i] = HordeVampire(self, i)
+        return p
+
+    def _animate(self, mask, dt):
+        """animation.animate em lote para os vampiros de mask"""
+        frame, state = self.frame[:self.count], self.state[:self.count]
+        frame[mask] += CLIP_FPS[state[mask]] * dt
+        totals, ends = CLIP_FRAMES[state], CLIP_END[state]
+        over = mask & (frame >= totals)
+        back = over & (ends == TO_IDLE)
+        state[back] = IDLE; frame[back] = 0.0; self.damage_dealt[:self.count][back] = False
+        held = over & (ends == HOLD)
+        frame[held] = totals[held] - 1
+        frame[over & ~back & ~held] = 0.0
+
+    def _skip_blocked(self, deciding, arrived):
+        """Tira de deciding quem não tem nenhum vizinho melhor livre (decide_move não faria nada).
+
+        Em hordas grandes a maioria dos vampiros está travada atrás de outros e tentaria
+        de novo todo tick; o filtro em lote evita a chamada Python para esses.
+        """
+        candidates = np.flatnonzero(deciding)
+        if not len(candidates): return
+        grid, flow = self.world.grid, self.world.flow
+        if self._flow_version != flow.rebuilds:
+            self._flow_dist = np.asarray(flow.dist, dtype=np.int32); self._flow_version = flow.rebuilds
+        dist, cols, rows = self._flow_dist, grid.cols, grid.rows
+        col = (self.x[candidates] // TILE_SIZE).astype(np.intp)
+        row = (self.y[candidates] // TILE_SIZE).astype(np.intp)
+        here = dist[row * cols + col]
+
+        # Tiles que as chegadas deste tick vão liberar (origem = alvo - um passo na direção)
+        freed = np.zeros(cols * rows, dtype=np.bool_)
+        back_x, back_y = np.array([0, 0, 1, -1]), np.array([-1, 1, 0, 0]) # down, up, left, right
+        a = np.flatnonzero(arrived)
+        if len(a):
+            d = self.direction[a]
+            fx = (self.target_x[a] // TILE_SIZE).astype(np.intp) + back_x[d]
+            fy = (self.target_y[a] // TILE_SIZE).astype(np.intp) + back_y[d]
+            ok = (fx >= 0) & (fx < cols) & (fy >= 0) & (fy < rows)
+            freed[fy[ok] * cols + fx[ok]] = True
+
+        occupied = np.frombuffer(grid.occupied, dtype=np.uint8)
+        open_step = np.zeros(len(candidates), dtype=np.bool_)
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            nc, nr = col + dx, row + dy
+            inside = (nc >= 0) & (nc < cols) & (nr >= 0) & (nr < rows)
+            n = np.where(inside, nr * cols + nc, 0)
+            nd = dist[n]
+            open_step |= inside & (here != UNREACHABLE) & (nd != UNREACHABLE) & (nd < here) & ((occupied[n] == 0) | freed[n])
+        deciding[candidates[~open_step]] = False
+
+    def _request(self, far, dist_sq, x, y):
+        """Pedidos para o escalonador (longe ou sem orçamento). Só os budget melhores (mesma
+        ordem do AIScheduler.run) viram pedidos; os outros já contam como adiados."""
+        if not len(far): return
+        ai = self.world.ai
+        priority = dist_sq[far] / self.move_timer[far]
+        if len(far) > ai.budget:
+            ai.overflow += len(far) - ai.budget
+            if ai.budget <= 0: return
+            # Ordenação completa só para quem não passa da budget-ésima prioridade (com os empates)
+            cut = priority <= np.partition(priority, ai.budget - 1)[ai.budget - 1]
+            far, priority = far[cut], priority[cut]
+            best = np.lexsort((x[far], y[far], priority))[:ai.budget]
+            far, priority = far[best], priority[best]
+        members = self.members
+        for i, p in zip(far.tolist(), priority.tolist()): ai.queue.append((p, float(y[i]), float(x[i]), members[i]))
+
+    def update(self, dt):
+        n = self.count
+        if n == 0: return
+        world, player = self.world, self.world.player
+        state, frame = self.state[:n], self.frame[:n]
+        x, y, tx, ty = self.x[:n], self.y[:n], self.target_x[:n], self.target_y[:n]
+        moving, move_timer = self.moving[:n], self.move_timer[:n]
+
+        # Cada vampiro segue exatamente um dos caminhos do Vampire.update
+        dying = state == DEATH
+        alive = (state != GONE) & ~dying
+        hurt = alive & (state == HURT)
+
+        # Ataque: dano no frame 6, uma vez por golpe. Quem ataca está parado, então dá
+        # para resolver os golpes antes do movimento.
+        dist_sq = (player.x - x) ** 2 + (player.y - y) ** 2
+        landing = alive & ~hurt & (state == ATTACK) & (frame >= 6.0) & ~self.damage_dealt[:n]
+        hitting = np.flatnonzero(landing & (dist_sq <= VAMPIRE_HIT_SQ))
+        if player.hp <= 0: late = alive
+        elif len(hitting) >= -(-player.hp // VAMPIRE_DAMAGE):
+            # No loop sequencial, quem vem depois do golpe fatal já vê o jogador morto
+            late = alive & (np.arange(n) > hitting[-(-player.hp // VAMPIRE_DAMAGE) - 1])
+            landing &= ~late
+        else: late = np.zeros(n, dtype=np.bool_)
+        if len(hitting): player.hp = max(0, player.hp - VAMPIRE_DAMAGE * int(np.count_nonzero(landing[hitting])))
+        self.damage_dealt[:n][landing] = True
+
+        state[late] = IDLE; self._animate(late, dt)
+        main = alive & ~hurt & ~late
+        self._animate(hurt & ~late, dt)
+
+        # Morte: anima, espera 2s no último frame e some
+        self._animate(dying, dt)
+        waiting = dying & (frame >= 10)
+        self.death_timer[:n][waiting] += dt
+        for i in np.flatnonzero(waiting & (self.death_timer[:n] > 2.0)):
+            state[i] = GONE
+            world.spatial.remove(self.members[i])
+            self.members[i] = None; self.free.append(int(i))
+            world.departed += 1
+        if not main.any(): return
+
+        # --- MOVIMENTO EM GRADE (lerp em lote) ---
+        walking = main & moving
+        still = main & ~moving
+        dx, dy = tx - x, ty - y
+        dist = np.sqrt(dx * dx + dy * dy)
+        reach = self.speed[:n] * dt # Pixels por segundo, como no Vampire
+        arrived = walking & (dist <= reach)
+        sliding = walking & ~arrived
+        step = np.divide(reach, dist, out=np.zeros(n), where=sliding)
+        x[sliding] += dx[sliding] * step[sliding]
+        y[sliding] += dy[sliding] * step[sliding]
+        x[arrived], y[arrived] = tx[arrived], ty[arrived]
+        moving[arrived] = False; state[arrived] = IDLE; move_timer[arrived] = 0.0
+
+        # Índice espacial só para quem trocou de célula
+        cx, cy = (x // TILE_SIZE).astype(np.int32), (y // TILE_SIZE).astype(np.int32)
+        for i in np.flatnonzero(walking & ((cx != self.cell_x[:n]) | (cy != self.cell_y[:n]))):
+            world.spatial.update(self.members[i])
+        self.cell_x[:n], self.cell_y[:n] = cx, cy
+
+        # Vampiros parados "pensam" a cada 0.5s: atacam se estiverem no quadrado vizinho, senão andam.
+        # Longe do jogador pensam mais devagar e pedem a vez ao escalonador (world.ai)
+        move_timer[still] += dt
+        near = (np.abs(player.x - x) <= AI_NEAR) & (np.abs(player.y - y) <= AI_NEAR)
+        thinking = still & (move_timer > np.where(near, VAMPIRE_THINK, VAMPIRE_THINK * AI_FAR_THINK))
+        start_attack = thinking & (dist_sq <= VAMPIRE_AGGRO_SQ)
+        state[start_attack] = ATTACK; frame[start_attack] = 0.0
+        self.damage_dealt[:n][start_attack] = False; move_timer[start_attack] = -VAMPIRE_ATTACK_REST
+        # Chegadas liberam tiles e decisões reservam tiles: processa na ordem dos índices,
+        # igual ao loop de Vampire.update, para ver a mesma ocupação
+        wants = thinking & ~start_attack
+        # Perto: decide agora enquanto houver orçamento (na ordem dos índices, contando os
+        # travados, como no Vampire.update); o resto pede a vez ao escalonador, travado ou não
+        ai, now = world.ai, np.flatnonzero(wants & near)
+        room = max(0, ai.budget - ai.used)
+        in_budget = wants & near
+        if len(now) > room: in_budget[now[room:]] = False
+        ai.used += min(len(now), room)
+        deciding = in_budget.copy()
+        self._skip_blocked(deciding, arrived)
+        self._request(np.flatnonzero(wants & ~in_budget), dist_sq, x, y)
+        for i in np.flatnonzero(arrived | deciding):
+            if arrived[i]: world.grid.settle(self.members[i], x[i], y[i])
+            else: self.members[i].decide_move()
+
+        self._animate(main, dt)
@@ -0,0 +1,367 @@
+# net.py
+# Co-op em rede (UDP): o host roda o World (coop=True) e é a autoridade; o cliente manda o
+# comando do segundo herói todo frame e recebe o estado para desenhar.
+#
+# O estado vai quantizado (posições em 1/QUANT px, frame em 1/16) num buffer de registros
+# fixos por entidade e é enviado SEND_HZ vezes por segundo como delta XOR comprimido (o
+# mesmo delta do snapshot.py) contra o último estado que o cliente confirmou. Cada vampiro
+# do host tem um slot fixo no buffer, então quem está parado vira zeros no delta.
+#
+#   python net.py host [--port 50505] [--send-hz 20] [--horde 200] [--size 0]
+#   python net.py client [127.0.0.1[:50505]] [--seconds 30]
+#   python game.py --host            /   python game.py --join 127.0.0.1
+import socket
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from world import World, INPUT_ATTACK, ALLY_SHIFT
+from snapshot import delta, apply_delta, world_mode, _new_vampire, STATUSES, ENDLESS, FOG
+from animation import STATES, STATE_ID, DIRECTIONS, DIRECTION_ID
+
+NET_PORT = 50505
+SEND_HZ = 20 # Estados por segundo para o cliente (o host simula a SIM_HZ)
+PROTOCOL = 1
+QUANT = 4 # Posição em quartos de pixel: até 16383 px (327 tiles) num uint16
+TIMEOUT = 2.0 # Segundos sem notícias do cliente: o aliado fica parado
+BASELINES = 64 # Estados guardados dos dois lados para servir de base dos deltas (~3s a 20 Hz)
+MAX_DATAGRAM = 65000 # Estado maior que isso não é enviado (conta em oversize)
+
+HELLO, WELCOME, INPUT, STATE = 1, 2, 3, 4
+PACKET_HELLO = struct.Struct("<BB") # tipo, versão do protocolo
+PACKET_WELCOME = struct.Struct("<BQHHBHH") # tipo, seed, colunas e linhas da masmorra, modo, sim_hz, send_hz
+PACKET_INPUT = struct.Struct("<BIB") # tipo, último estado decodificado (ack), comando do aliado
+PACKET_STATE = struct.Struct("<BIII") # tipo, id do estado, id da base (0 = nenhuma), crc32 do estado
+
+# Estado: tick, status, fase do chefe, onda, mortos; depois jogador, aliado, Drácula e um
+# registro por slot de vampiro
+HEADER = struct.Struct("<IBBII")
+# x, y, hp, estado | direção << 3 | CORPSE, frame * 16
+RECORD = struct.Struct("<HHBBB")
+CORPSE = 0x40 # Morto parado no último frame (death_timer > 0): o governador pode pintar no cenário
+ABSENT = 0xFF # Slot sem vampiro
+ABSENT_RECORD = RECORD.pack(0, 0, 0, ABSENT, 0)
+GONE = STATE_ID["gone"]
+
+# ------------------------
+# ESTADO QUANTIZADO
+# ------------------------
+def _pack(buf, offset, e):
+    """Registro de um herói ou do Drácula"""
+    RECORD.pack_into(buf, offset, int(e.x * QUANT), int(e.y * QUANT), min(max(e.hp, 0), 255),
+                     STATE_ID[e.state] | DIRECTION_ID[e.direction] << 3, int(e.frame * 16))
+
+def _unpack(e, data, offset):
+    x, y, hp, bits, frame = RECORD.unpack_from(data, offset)
+    e.x, e.y, e.hp, e.frame = x / QUANT, y / QUANT, hp, frame / 16
+    e.state, e.direction = STATES[bits & 7], DIRECTIONS[bits >> 3 & 3]
+    return bits
+
+def encode_state(world, slots):
+    """Buffer quantizado do mundo; slots (vampiro -> índice) ganha quem ainda não tinha"""
+    enemies, size = world.enemies, RECORD.size
+    for e in enemies:
+        if e not in slots: slots[e] = len(slots)
+    buf = bytearray(HEADER.pack(world.tick, STATUSES.index(world.status), world.boss_phase_active, world.wave, world.kills))
+    buf += bytes(3 * size) + ABSENT_RECORD * len(slots)
+    for i, e in enumerate((world.player, world.ally, world.dracula)): _pack(buf, HEADER.size + i * size, e)
+    # Laço da horda sem chamadas extras (é o custo de rede do host): o mapa já foi conferido
+    # em CoopHost.attach, o hp dos vampiros cabe num byte e o frame * 16 também
+    base, pack, state_id, direction_id = HEADER.size + 3 * size, RECORD.pack_into, STATE_ID, DIRECTION_ID
+    for e in enemies:
+        pack(buf, base + slots[e] * size, int(e.x * QUANT), int(e.y * QUANT), e.hp,
+             state_id[e.state] | direction_id[e.direction] << 3 | (CORPSE if e.death_timer > 0 else 0), int(e.frame * 16))
+    return bytes(buf)
+
+def apply_state(world, data, slots):
+    """Aplica o estado no mundo espelho do cliente; slots é a lista de Vampire por slot"""
+    tick, status, boss, wave, kills = HEADER.unpack_from(data)
+    world.tick, world.status, world.boss_phase_active = tick, STATUSES[status], bool(boss)
+    world.wave, world.kills = wave, kills
+    spatial = world.spatial
+    offset = HEADER.size
+    for e in (world.player, world.ally, world.dracula):
+        _unpack(e, data, offset); offset += RECORD.size
+        if e.state == "gone": spatial.remove(e)
+        else: spatial.update(e)
+    count = (len(data) - offset) // RECORD.size
+    while len(slots) < count:
+        e = _new_vampire(world); e.death_timer = 0.0
+        slots.append(e)
+    enemies, unpack = [], RECORD.unpack_from
+    for e in slots[:count]:
+        x, y, hp, bits, frame = unpack(data, offset); offset += RECORD.size
+        if bits == ABSENT: spatial.remove(e); continue
+        e.x, e.y, e.hp, e.frame = x / QUANT, y / QUANT, hp, frame / 16
+        e.state, e.direction = STATES[bits & 7], DIRECTIONS[bits >> 3 & 3]
+        e.death_timer = 1.0 if bits & CORPSE else 0.0
+        if bits & 7 == GONE: spatial.remove(e)
+        else: spatial.update(e)
+        enemies.append(e)
+    if enemies != world.enemies: world.enemies[:] = enemies; world.roster += 1
+    world._update_fov() # A névoa do cliente sai das posições recebidas dos heróis
+
+class _Rate:
+    """Contadores por segundo (janela de 1s)"""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.counts, self.rates = {}, {}
+
+    def add(self, name, amount=1):
+        self._roll()
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def get(self, name):
+        self._roll()
+        return self.rates.get(name, 0.0)
+
+    def _roll(self):
+        now = time.perf_counter()
+        if now - self.start >= 1.0:
+            self.rates = {k: v / (now - self.start) for k, v in self.counts.items()}
+            self.counts, self.start = {}, now
+
+# ------------------------
+# HOST
+# ------------------------
+class CoopHost:
+    """Lado autoritativo: poll() no começo de cada frame (lê HELLO e comandos), command é o
+    comando atual do aliado e send(world) depois de cada step manda o estado no ritmo de send_hz."""
+    def __init__(self, port=NET_PORT, send_hz=SEND_HZ, sim_hz=60):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("", port))
+        self.sock.setblocking(False)
+        self.port, self.send_hz, self.sim_hz = port, send_hz, sim_hz
+        self.every = max(1, round(sim_hz / send_hz)) # Ticks entre dois estados
+        self.client = None
+        self.command = 0
+        self.heard = 0.0 # Último pacote do cliente (perf_counter)
+        self.slots = {} # Vampiro -> slot no buffer (o pool do World recicla os objetos)
+        self.sent = OrderedDict() # id -> estado cru, bases possíveis para o próximo delta
+        self.next_id = 1
+        self.acked = 0
+        self.last_status = None
+        self.rate = _Rate()
+        self.state_bytes = self.raw_bytes = 0 # Último estado enviado (comprimido / cru)
+        self.oversize = 0
+        self.net_ms = 0.0 # ms de rede por tick (poll + send), média móvel
+        self._tick_ms = 0.0
+
+    def poll(self):
+        start = time.perf_counter()
+        sock = self.sock
+        while True:
+            try: data, addr = sock.recvfrom(2048)
+            except BlockingIOError: break
+            except ConnectionResetError: continue # Windows: ICMP de um envio anterior
+            if not data: continue
+            kind = data[0]
+            if kind == HELLO and len(data) >= PACKET_HELLO.size:
+                if PACKET_HELLO.unpack_from(data)[1] != PROTOCOL: continue
+                if self.client not in (None, addr) and start - self.heard < TIMEOUT: continue # Já tem dupla
+                self.client, self.heard, self.acked = addr, start, 0 # Cliente novo não tem base
+                self.sent.clear()
+                sock.sendto(self.welcome, addr)
+            elif kind == INPUT and addr == self.client and len(data) >= PACKET_INPUT.size:
+                _, ack, command = PACKET_INPUT.unpack_from(data)
+                self.heard, self.command = start, command
+                if ack > self.acked and ack in self.sent: self.acked = ack
+        if self.client and start - self.heard > TIMEOUT: self.command = 0
+        self._tick_ms += (time.perf_counter() - start) * 1000
+
+    def attach(self, world):
+        """Mundo que o host vai transmitir (o WELCOME leva a configuração dele)"""
+        if max(world.width, world.height) * QUANT > 0xFFFF: raise ValueError("mapa grande demais para o co-op em rede")
+        cols, rows = (world.grid.cols, world.grid.rows) if world.dungeon else (0, 0)
+        self.welcome = PACKET_WELCOME.pack(WELCOME, world.seed, cols, rows, world_mode(world), self.sim_hz, self.send_hz)
+        self.slots.clear(); self.sent.clear(); self.acked = 0
+
+    def send(self, world):
+        """Depois de cada step: a cada self.every ticks (ou quando o status muda) manda o estado"""
+        start = time.perf_counter()
+        if self.client and (world.tick % self.every == 0 or world.status != self.last_status):
+            self.last_status = world.status
+            raw = encode_state(world, self.slots)
+            base_id = self.acked if self.acked in self.sent else 0
+            payload = delta(self.sent[base_id] if base_id else b"", raw)
+            packet = PACKET_STATE.pack(STATE, self.next_id, base_id, zlib.crc32(raw)) + payload
+            self.sent[self.next_id] = raw; self.next_id += 1
+            if len(self.sent) > BASELINES: self.sent.popitem(last=False)
+            if len(packet) > MAX_DATAGRAM: self.oversize += 1
+            else:
+                try: self.sock.sendto(packet, self.client)
+                except OSError: pass
+                self.rate.add("bytes", len(packet)); self.rate.add("states")
+            self.state_bytes, self.raw_bytes = len(packet), len(raw)
+        ms = self._tick_ms + (time.perf_counter() - start) * 1000
+        self.net_ms += (ms - self.net_ms) * 0.05
+        self._tick_ms = 0.0
+
+    def close(self):
+        self.sock.close()
+
+    def report_lines(self):
+        who = f"{self.client[0]}:{self.client[1]}" if self.client else "esperando cliente"
+        if self.client and time.perf_counter() - self.heard > TIMEOUT: who += " (sem resposta)"
+        lines = [f"host :{self.port}  {who}",
+                 f"envio {self.rate.get('bytes') / 1024:.1f} kB/s  {self.rate.get('states'):.0f} estados/s  "
+                 f"{self.state_bytes} B (cru {self.raw_bytes} B)",
+                 f"rede {self.net_ms:.3f} ms/tick  " +
+                 (f"base {self.next_id - 1 - self.acked} estado(s) atrás" if self.acked else "sem base (estado inteiro)")]
+        if self.oversize: lines.append(f"{self.oversize} estados maiores que um datagrama")
+        return lines
+
+# ------------------------
+# CLIENTE
+# ------------------------
+class CoopClient:
+    """connect() espera o WELCOME e devolve o mundo espelho; depois, todo frame, send_input()
+    com o teclado e poll() aplica o estado mais novo que chegou."""
+    def __init__(self, address, port=NET_PORT):
+        host, _, custom = address.partition(":")
+        self.address = (socket.gethostbyname(host or "127.0.0.1"), int(custom) if custom else port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.received = OrderedDict() # id -> estado cru decodificado (bases dos próximos deltas)
+        self.newest = 0
+        self.slots = [] # Vampire do mundo espelho por slot
+        self.arrival = 0.0
+        self.interval = 1 / SEND_HZ
+        self.rate = _Rate()
+        self.lost = self.bad = 0
+        self.world = None
+
+    def connect(self, timeout=10.0):
+        """Manda HELLO até o host responder; devolve o World espelho com a configuração dele"""
+        hello = PACKET_HELLO.pack(HELLO, PROTOCOL)
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            self.sock.sendto(hello, self.address)
+            end = time.perf_counter() + 0.25
+            while time.perf_counter() < end:
+                try: data, addr = self.sock.recvfrom(65536)
+                except (BlockingIOError, ConnectionResetError): time.sleep(0.01); continue
+                if addr == self.address and data[:1] == bytes([WELCOME]): return self._welcome(data)
+        raise ConnectionError(f"host {self.address[0]}:{self.address[1]} não respondeu")
+
+    def _welcome(self, data):
+        _, seed, cols, rows, mode, sim_hz, send_hz = PACKET_WELCOME.unpack_from(data)
+        self.sim_hz, self.interval = sim_hz, 1 / send_hz
+        self.world = World(seed, dungeon=(cols, rows) if cols else None, endless=bool(mode & ENDLESS), coop=True,
+                           fog=bool(mode & FOG))
+        return self.world
+
+    def send_input(self, command):
+        try: self.sock.sendto(PACKET_INPUT.pack(INPUT, self.newest, command), self.address)
+        except OSError: pass
+
+    def poll(self, world=None, blend=None, camera=None):
+        """Decodifica o que chegou; se há estado novo, guarda o anterior em blend e aplica o
+        novo no mundo espelho. Devolve True se o mundo mudou."""
+        world = world or self.world
+        newest = None
+        while True:
+            try: data, addr = self.sock.recvfrom(65536)
+            except BlockingIOError: break
+            except ConnectionResetError: continue
+            if addr != self.address or len(data) < PACKET_STATE.size or data[0] != STATE: continue
+            _, state_id, base_id, crc = PACKET_STATE.unpack_from(data)
+            self.rate.add("bytes", len(data)); self.rate.add("states")
+            if state_id <= self.newest: continue # Atrasado ou repetido
+            base = self.received.get(base_id) if base_id else b""
+            if base is None: self.bad += 1; continue # Base já esquecida: o host reenvia contra o último ack
+            raw = apply_delta(base, data[PACKET_STATE.size:])
+            if zlib.crc32(raw) != crc: self.bad += 1; continue
+            self.lost += state_id - self.newest - 1 if self.newest else 0
+            self.newest = state_id
+            self.received[state_id] = newest = raw
+            if len(self.received) > BASELINES: self.received.popitem(last=False)
+        if newest is None: return False
+        if blend: blend.capture(world, camera)
+        apply_state(world, newest, self.slots)
+        self.arrival = time.perf_counter()
+        return True
+
+    def alpha(self):
+        """Fração do intervalo entre estados que já passou desde o último (para o Blend)"""
+        return min((time.perf_counter() - self.arrival) / self.interval, 1.0)
+
+    def close(self):
+        self.sock.close()
+
+    def report_lines(self):
+        since = (time.perf_counter() - self.arrival) * 1000 if self.arrival else 0
+        return [f"cliente de {self.address[0]}:{self.address[1]}  tick {self.world.tick if self.world else 0}",
+                f"recebido {self.rate.get('bytes') / 1024:.1f} kB/s  {self.rate.get('states'):.0f} estados/s  "
+                f"último há {since:.0f} ms",
+                f"perdidos {self.lost}  descartados {self.bad}"]
+
+# ------------------------
+# HEADLESS (dois processos no mesmo PC)
+# ------------------------
+def run_host(args):
+    world = World(args.seed, dungeon=(args.size, args.size) if args.size else None, endless=args.endless, coop=True,
+                  fog=args.fog)
+    host = CoopHost(args.port, args.send_hz)
+    host.attach(world)
+    if args.horde: world.spawn_horde(args.horde)
+    dt = 1 / host.sim_hz
+    sim_ms, ticks, next_report = 0.0, 0, time.perf_counter() + 1
+    print(f"host na porta {args.port}: seed {world.seed}, {len(world.enemies)} vampiros, estado a {args.send_hz} Hz")
+    start = next_tick = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        host.poll()
+        t = time.perf_counter()
+        if world.status == "game": world.step(dt, INPUT_ATTACK | host.command << ALLY_SHIFT)
+        sim_ms += (time.perf_counter() - t) * 1000; ticks += 1
+        host.send(world)
+        if time.perf_counter() >= next_report:
+            print(f"tick {world.tick} {world.status}  simulação {sim_ms / ticks:.3f} ms/tick  " + "  ".join(host.report_lines()[1:]))
+            sim_ms, ticks, next_report = 0.0, 0, next_report + 1
+        next_tick += dt
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+    host.close()
+
+def run_client(args):
+    import random
+    client = CoopClient(args.address)
+    world = client.connect()
+    rng = random.Random(1)
+    print(f"conectado: seed {world.seed}, mapa {world.dungeon and (world.grid.cols, world.grid.rows) or 'sala original'}")
+    dt = 1 / client.sim_hz
+    command, next_report = 0, time.perf_counter() + 1
+    start = next_tick = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        if world.tick % 30 == 0: command = rng.choice([1, 2, 4, 8, INPUT_ATTACK])
+        client.send_input(command)
+        client.poll()
+        if time.perf_counter() >= next_report:
+            print(f"{world.status}  {len(world.enemies)} vampiros  " + "  ".join(client.report_lines()[1:]))
+            next_report += 1
+        next_tick += dt
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+    client.close()
+    return 1 if client.bad else 0
+
+def main():
+    import argparse, sys
+    parser = argparse.ArgumentParser(description="Co-op em rede do Paladin vs Dracula (headless)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_host = sub.add_parser("host", help="roda a simulação e manda o estado para o cliente")
+    p_host.add_argument("--port", type=int, default=NET_PORT)
+    p_host.add_argument("--send-hz", type=int, default=SEND_HZ)
+    p_host.add_argument("--seed", type=int, default=1)
+    p_host.add_argument("--size", type=int, default=0, help="lado da masmorra procedural (0 = sala original)")
+    p_host.add_argument("--horde", type=int, default=0, help="vampiros extras (World.spawn_horde)")
+    p_host.add_argument("--endless", action="store_true")
+    p_host.add_argument("--fog", action="store_true", help="campo de visão e névoa")
+    p_host.add_argument("--seconds", type=float, default=30)
+    p_client = sub.add_parser("client", help="conecta num host e mostra o tráfego recebido")
+    p_client.add_argument("address", nargs="?", default="127.0.0.1")
+    p_client.add_argument("--seconds", type=float, default=30)
+    args = parser.parse_args()
+    if args.command == "host": run_host(args)
+    else: sys.exit(run_client(args))
+
+if __name__ == "__main__":
+    main()
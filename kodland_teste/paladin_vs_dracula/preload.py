@@ -0,0 +1,116 @@
+# preload.py
+# Carregamento em segundo plano. Uma thread roda as tarefas de pré-carga (artes,
+# sons, músicas lidas para a memória) enquanto o menu mostra o progresso; outra
+# troca as músicas. O loop de frames só enfileira pedidos e nunca espera disco.
+import io
+import os
+import queue
+import threading
+from collections import OrderedDict
+import pygame
+
+MUSIC_EXTENSIONS = ["ogg", "mp3", "oga"] # Mesmas do pgzero
+
+class Preloader:
+    """Fila de tarefas (nome, função) executadas em ordem numa thread própria.
+
+    O SDL não converte superfícies fora da thread principal: tarefas com um finish só leem
+    na thread e pump(), chamado a cada frame, passa o resultado para finish (convert_alpha).
+    """
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.finished = queue.Queue() # (nome, finish, resultado) esperando a thread principal
+        self.total = 0
+        self.done = 0
+        self.errors = [] # (nome, exceção) das tarefas que falharam
+        self._thread = None
+
+    def add(self, name, load, finish=None):
+        self.total += 1
+        self.jobs.put((name, load, finish))
+
+    def start(self):
+        if self._thread: return
+        self._thread = threading.Thread(target=self._run, name="preload", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            name, load, finish = self.jobs.get()
+            try:
+                result = load()
+                if finish: self.finished.put((name, finish, result)); continue
+            except Exception as e: self.errors.append((name, e))
+            self.done += 1
+
+    def pump(self):
+        """Termina na thread principal as tarefas que a thread já leu"""
+        while not self.finished.empty():
+            name, finish, result = self.finished.get()
+            try: finish(result)
+            except Exception as e: self.errors.append((name, e))
+            self.done += 1
+
+    def progress(self):
+        return 1.0 if self.total == 0 else self.done / self.total
+
+    def ready(self):
+        return self.done >= self.total
+
+class MusicPlayer:
+    """Toca as músicas de music/ a partir de cópias em memória, numa thread própria.
+
+    play(), stop() e prefetch() só enfileiram comandos. prefetch() lê o arquivo antes
+    de a música ser pedida; fetch() faz o mesmo de forma síncrona (para o Preloader).
+    """
+    def __init__(self, root, max_tracks=3):
+        self.root = root
+        self.max_tracks = max_tracks
+        self.tracks = OrderedDict() # nome -> bytes do arquivo, do menos para o mais usado
+        self.requested = set() # Prefetches enfileirados ou em memória (sai quando a música sai do LRU)
+        self._lock = threading.Lock()
+        self._commands = queue.Queue()
+        self._stream = None # Arquivo em memória que o mixer está tocando
+        threading.Thread(target=self._run, name="music", daemon=True).start()
+
+    def _path(self, name):
+        for ext in MUSIC_EXTENSIONS:
+            path = os.path.join(self.root, "music", f"{name}.{ext}")
+            if os.path.exists(path): return path, ext
+        raise FileNotFoundError(name)
+
+    def fetch(self, name):
+        """(bytes, extensão) da música, lendo do disco só na primeira vez"""
+        with self._lock:
+            if name in self.tracks:
+                self.tracks.move_to_end(name); return self.tracks[name]
+        path, ext = self._path(name)
+        with open(path, "rb") as f: track = (f.read(), ext)
+        with self._lock:
+            self.tracks[name] = track
+            while len(self.tracks) > self.max_tracks: self.requested.discard(self.tracks.popitem(last=False)[0])
+        return track
+
+    def prefetch(self, name):
+        with self._lock:
+            if name in self.requested: return
+            self.requested.add(name)
+        self._commands.put(("prefetch", name))
+
+    def play(self, name): self._commands.put(("play", name))
+
+    def stop(self): self._commands.put(("stop", None))
+
+    def _run(self):
+        while True:
+            command, name = self._commands.get()
+            try:
+                if command == "prefetch": self.fetch(name)
+                elif command == "play":
+                    data, ext = self.fetch(name)
+                    stream = io.BytesIO(data)
+                    pygame.mixer.music.load(stream, ext)
+                    pygame.mixer.music.play(-1)
+                    self._stream = stream
+                else: pygame.mixer.music.stop()
+            except Exception: pass # Sem áudio ou sem o arquivo: o jogo segue mudo
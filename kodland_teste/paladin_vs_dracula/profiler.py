@@ -0,0 +1,140 @@
+# profiler.py
+# Profiler de frames opcional: mede cada fase de update/draw, guarda o histórico
+# num ring buffer e (se pedido) grava as amostras em CSV/JSONL numa thread separada.
+import atexit
+import json
+import threading
+import time
+from collections import deque
+
+# Fases conhecidas, na ordem das colunas do CSV
+PHASES = [
+    "update.turns", "update.player", "update.flow", "update.fov", "update.boss", "update.vampires", "update.ai", "update.cleanup",
+    "draw.scene", "draw.background", "draw.sprites", "draw.text", "draw.dirty", "draw.overlay",
+]
+
+class NullProfiler:
+    """Usado quando o profiler está desligado: lap() não faz nada"""
+    enabled = False
+    def lap(self, name): pass
+
+NULL_PROFILER = NullProfiler()
+
+class FrameProfiler:
+    """Cronometra fases com lap(nome): cada lap mede o tempo desde o lap anterior.
+
+    begin_frame() abre um frame, end_frame(**contadores) fecha e guarda a amostra.
+    """
+    enabled = True
+
+    def __init__(self, history=600, log_path=None, log_buffer=4096):
+        self.frame_times = deque(maxlen=history) # ms por frame (para FPS e percentis)
+        self.samples = deque(maxlen=history)
+        self.frame = 0
+        self.current = {}
+        self.counts = {}
+        self._frame_start = None
+        self._mark = None
+        self._writer = LogWriter(log_path, log_buffer) if log_path else None
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self.frame_times.append((now - self._frame_start) * 1000)
+            self._flush_sample()
+        self._frame_start = self._mark = now
+        self.current = {}
+        self.frame += 1
+
+    def lap(self, name):
+        if self._mark is None: return
+        now = time.perf_counter()
+        self.current[name] = self.current.get(name, 0.0) + (now - self._mark) * 1000
+        self._mark = now
+
+    def skip(self):
+        """Descarta o tempo desde o último lap (trecho que não é de nenhuma fase)"""
+        self._mark = time.perf_counter()
+
+    def end_frame(self, **counts):
+        self.counts = counts
+
+    def _flush_sample(self):
+        sample = dict(self.current, frame=self.frame, frame_ms=self.frame_times[-1], **self.counts)
+        self.samples.append(sample)
+        if self._writer: self._writer.push(sample)
+
+    def stats(self):
+        """FPS, p50/p99 do tempo de frame e média de cada fase no histórico"""
+        times = sorted(self.frame_times)
+        if not times: return {"fps": 0.0, "p50": 0.0, "p99": 0.0, "phases": {}, "counts": self.counts}
+        pick = lambda q: times[min(len(times) - 1, int(q * len(times)))]
+        phases = {}
+        for sample in self.samples:
+            for name in PHASES:
+                if name in sample: phases[name] = phases.get(name, 0.0) + sample[name]
+        n = max(1, len(self.samples))
+        return {
+            "fps": 1000.0 / (sum(times) / len(times)),
+            "p50": pick(0.50), "p99": pick(0.99),
+            "phases": {name: total / n for name, total in phases.items()},
+            "counts": self.counts,
+        }
+
+    def report_lines(self):
+        st = self.stats()
+        lines = [f"FPS {st['fps']:5.1f}  p50 {st['p50']:5.2f}ms  p99 {st['p99']:5.2f}ms"]
+        lines.append("  ".join(f"{k}: {v}" for k, v in st["counts"].items()))
+        for name in PHASES:
+            if name in st["phases"]: lines.append(f"{name:<16}{st['phases'][name]:6.3f} ms")
+        return lines
+
+    def close(self):
+        if self._writer: self._writer.close()
+
+class LogWriter:
+    """Grava amostras em disco numa thread; o jogo só faz append num ring buffer.
+
+    Se o disco não acompanhar, as amostras mais antigas são descartadas (contadas em
+    self.dropped) em vez de travar o frame.
+    """
+    def __init__(self, path, size=4096, interval=0.25):
+        self.path = path
+        self.ring = deque(maxlen=size)
+        self.dropped = 0
+        self.interval = interval
+        self.csv = not path.endswith(".jsonl")
+        self._stop = threading.Event()
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        if self.csv: self._file.write(",".join(["frame", "frame_ms"] + PHASES) + ",extra\n")
+        self._thread = threading.Thread(target=self._run, name="profiler-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def push(self, sample):
+        if len(self.ring) == self.ring.maxlen: self.dropped += 1
+        self.ring.append(sample)
+
+    def _write(self):
+        out = []
+        while self.ring:
+            sample = self.ring.popleft()
+            if self.csv:
+                extra = ";".join(f"{k}={v}" for k, v in sample.items() if k not in PHASES and k not in ("frame", "frame_ms"))
+                cols = [str(sample["frame"]), f"{sample['frame_ms']:.3f}"]
+                cols += [f"{sample[name]:.4f}" if name in sample else "" for name in PHASES]
+                out.append(",".join(cols) + "," + extra + "\n")
+            else:
+                out.append(json.dumps(sample) + "\n")
+        if out:
+            self._file.write("".join(out)); self._file.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval): self._write()
+
+    def close(self):
+        if self._stop.is_set(): return
+        self._stop.set()
+        self._thread.join()
+        self._write()
+        self._file.close()
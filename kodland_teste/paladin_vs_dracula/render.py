@@ -0,0 +1,121 @@
+# render.py
+# Renderizador por retângulos sujos (dirty rects) com camada estática em cache.
+# Só redesenha as regiões onde algum sprite mudou; telas paradas (menu, pausa,
+# game over, vitória) são montadas uma vez e não custam nada nos frames seguintes.
+import pygame
+from pygame import Rect
+from pgzero import ptext
+from pgzero.screen import Screen
+
+_text_cache = {}
+
+def text_sprite(text, *args, **kwargs):
+    """(superfície, posição) do texto, renderizado uma vez por combinação de argumentos"""
+    key = (text, args, tuple(sorted(kwargs.items())))
+    if key not in _text_cache:
+        _text_cache[key] = ptext.draw(text, *args, surf=None, **kwargs)
+    return _text_cache[key]
+
+_circle_cache = {}
+
+def circle_sprite(x, y, radius, color):
+    """Círculo cheio (fallback quando falta imagem) como superfície reaproveitável"""
+    key = (radius, color)
+    if key not in _circle_cache:
+        surf = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+        pygame.draw.circle(surf, pygame.Color(color), (radius, radius), radius)
+        _circle_cache[key] = surf
+    return _circle_cache[key], (x - radius, y - radius)
+
+class DirtyRenderer:
+    """Mantém o conteúdo da tela entre frames e só repinta o que mudou.
+
+    static: superfície do cenário (fundo + decoração) já no formato da tela.
+    self.dirty guarda os retângulos alterados no último frame.
+    """
+    def __init__(self, surface, static):
+        self.surface = surface
+        self.static = static
+        self.screens = {} # chave da tela parada -> superfície pronta
+        self.shown = None # Chave do que está na tela agora (None = precisa recompor tudo)
+        self.sprites = {} # chave da entidade -> [(superfície, pos), rect, frame] (a mesma lista todo frame)
+        self.frame = 0
+        self.order = [] # (superfície, pos) do frame atual na ordem de desenho, pronto para blits()
+        self.rects = []
+        self.pending = [] # Áreas para repintar no próximo draw_scene (ver touch)
+        self.overlay_key = None
+        self.overlay = []
+        self.dirty = []
+
+    def invalidate(self):
+        self.shown = None
+
+    def touch(self, rect):
+        """Repinta rect no próximo draw_scene (quem chama mudou a camada estática ali)"""
+        self.pending.append(rect)
+
+    def show_screen(self, key, paint):
+        """Tela parada: paint(screen) desenha uma vez numa superfície guardada em cache"""
+        if self.shown == key: self.dirty = []; return
+        if key not in self.screens:
+            surf = pygame.Surface(self.surface.get_size()).convert()
+            paint(Screen(surf))
+            self.screens[key] = surf
+        self.surface.blit(self.screens[key], (0, 0))
+        self.shown = key
+        self.dirty = [self.surface.get_rect()]
+
+    def draw_scene(self, sprites, overlay_key, make_overlay):
+        """sprites: lista ordenada de (chave, superfície, pos). O overlay (HUD) só é
+        refeito por make_overlay() quando overlay_key muda. Cada chave mantém a mesma
+        entrada entre frames e o Rect dela é atualizado no lugar: sprite parado não aloca nada.
+        Os sprites de cada região vão para a tela numa chamada só de Surface.blits."""
+        surface = self.surface
+        self.frame += 1
+        frame, known, order, rects = self.frame, self.sprites, self.order, self.rects
+        order.clear(); rects.clear()
+        dirty = []
+        if self.pending: dirty += self.pending; self.pending.clear()
+        for key, surf, pos in sprites:
+            entry = known.get(key)
+            if entry is None:
+                entry = known[key] = [(surf, pos), Rect(pos, surf.get_size()), frame]
+                dirty.append(entry[1].copy())
+            else:
+                blit = entry[0]
+                if blit[0] is not surf or blit[1] != pos:
+                    rect = entry[1]
+                    old = rect.copy()
+                    rect.update(pos, surf.get_size())
+                    dirty.append(old.union(rect))
+                    entry[0] = (surf, pos)
+                entry[2] = frame
+            order.append(entry[0]); rects.append(entry[1])
+        if len(known) > len(order):
+            for key in [key for key, entry in known.items() if entry[2] != frame]: dirty.append(known.pop(key)[1])
+
+        if overlay_key != self.overlay_key or self.shown != "scene":
+            old_overlay = [rect for _, _, rect in self.overlay]
+            self.overlay = [(surf, pos, Rect(pos, surf.get_size())) for surf, pos in make_overlay()]
+            self.overlay_key = overlay_key
+            dirty += old_overlay + [rect for _, _, rect in self.overlay]
+
+        if self.shown != "scene":
+            # Primeiro frame da cena: compõe tudo
+            surface.blit(self.static, (0, 0))
+            surface.blits(order, False)
+            for surf, pos, _ in self.overlay: surface.blit(surf, pos)
+            self.shown = "scene"
+            self.dirty = [surface.get_rect()]
+            return
+
+        # Repinta cada região suja: cenário, sprites que encostam nela (na ordem) e HUD
+        overlay_rects = [rect for _, _, rect in self.overlay] if dirty else []
+        for area in dirty:
+            surface.set_clip(area)
+            surface.blit(self.static, area, area)
+            hits = area.collidelistall(rects)
+            if hits: surface.blits([order[i] for i in hits], False)
+            for i in area.collidelistall(overlay_rects): surface.blit(self.overlay[i][0], self.overlay[i][1])
+        surface.set_clip(None)
+        self.dirty = dirty
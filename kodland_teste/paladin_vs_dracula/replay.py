@@ -0,0 +1,147 @@
+# replay.py
+# Gravação e reprodução determinística de partidas: seed, configuração do mundo,
+# frequência da simulação e o comando (bits INPUT_*) de cada tick de World.step.
+#
+#   python replay.py info replays/partida.pvr
+#   python replay.py play replays/partida.pvr            (headless, velocidade máxima)
+#   python replay.py play replays/partida.pvr --profile  (+ ms por fase do step)
+#   python game.py --replay replays/partida.pvr          (tempo real, com desenho; TAB acelera)
+import hashlib
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from world import World
+
+# Versão 2: passo fixo (todo tick tem dt = 1 / sim_hz). Os .pvr da versão 1 gravavam um
+# dt por tick e o movimento em pixels por tick, e não reproduzem mais.
+MAGIC = b"PVDREPL2"
+# magic, seed, colunas e linhas da masmorra (0 = sala original), modo (bit 0: backend numpy,
+# bit 1: modo infinito, bit 2: co-op, bit 3: névoa, bit 4: por turnos), ticks por segundo da simulação, ticks, hash do estado final.
+# No co-op cada tick grava dois bytes (comando do jogador e do aliado, world.ALLY_SHIFT).
+HEADER = struct.Struct("<8sQHHBHI20s")
+BACKENDS = ["python", "numpy"]
+ENDLESS, COOP, FOG, TURNS = 2, 4, 8, 16
+
+def state_hash(world):
+    """Resumo (sha1) do estado do mundo; replay e partida original têm que bater"""
+    h = hashlib.sha1()
+    h.update(repr((world.tick, world.status)).encode())
+    # float()/int(): a horda NumPy guarda os mesmos valores com outros tipos
+    for e in world.players + [world.dracula] + list(world.enemies):
+        h.update(repr((float(e.x), float(e.y), int(e.hp), e.state)).encode())
+    return h.digest()
+
+class Recorder:
+    """Acumula o comando de cada tick da partida; save() grava o arquivo .pvr"""
+    def __init__(self, world, sim_hz=60):
+        self.world = world
+        self.seed = world.seed
+        self.dungeon = (world.grid.cols, world.grid.rows) if world.dungeon else (0, 0)
+        self.mode = (1 if world.horde else 0) | (ENDLESS if world.endless else 0) | (COOP if world.coop else 0) | \
+            (FOG if world.fov else 0) | (TURNS if world.turns else 0)
+        self.sim_hz = sim_hz
+        self.commands = array("H") if world.coop else bytearray()
+        self.pending = 0 # Bits de frontend (INPUT_PAUSE) que vão no próximo tick
+
+    def record(self, command):
+        self.commands.append(command | self.pending)
+        self.pending = 0
+
+    def mark(self, bit):
+        self.pending |= bit
+
+    def save(self, path):
+        header = HEADER.pack(MAGIC, self.seed, self.dungeon[0], self.dungeon[1], self.mode,
+                             self.sim_hz, len(self.commands), state_hash(self.world))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(header)
+            f.write(zlib.compress(self.commands.tobytes() if self.mode & COOP else bytes(self.commands), 9))
+        return path
+
+class Replay:
+    """Partida gravada: make_world() recria o mundo e inputs() devolve os (dt, comando)"""
+    def __init__(self, seed, dungeon, backend, sim_hz, commands, final_hash, endless=False, coop=False, fog=False,
+                 turns=False):
+        self.seed, self.dungeon, self.backend, self.sim_hz = seed, dungeon, backend, sim_hz
+        self.endless, self.coop, self.fog, self.turns = endless, coop, fog, turns
+        self.commands, self.final_hash = commands, final_hash
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f: data = f.read()
+        if data[:6] == MAGIC[:6] and data[:8] != MAGIC: raise ValueError(f"{path}: replay de uma versão antiga do jogo")
+        magic, seed, cols, rows, mode, sim_hz, ticks, final_hash = HEADER.unpack_from(data)
+        if magic != MAGIC: raise ValueError(f"{path}: não é um replay")
+        commands = zlib.decompress(data[HEADER.size:])
+        if mode & COOP: commands = array("H", commands)
+        return cls(seed, (cols, rows) if cols else None, BACKENDS[mode & 1], sim_hz, commands[:ticks], final_hash,
+                   bool(mode & ENDLESS), bool(mode & COOP), bool(mode & FOG), bool(mode & TURNS))
+
+    def __len__(self):
+        return len(self.commands)
+
+    def duration(self):
+        """Segundos de jogo"""
+        return len(self.commands) / self.sim_hz
+
+    def make_world(self, backend=None):
+        return World(self.seed, horde_backend=backend or self.backend, dungeon=self.dungeon, endless=self.endless,
+                     coop=self.coop, fog=self.fog, turns=self.turns)
+
+    def inputs(self):
+        dt = 1 / self.sim_hz
+        return [(dt, command) for command in self.commands]
+
+    def run(self, world=None, limit=None):
+        """Roda headless o mais rápido possível; devolve o mundo no fim"""
+        world = world or self.make_world()
+        world.reset()
+        step = world.step
+        for dt, command in self.inputs()[:limit]: step(dt, command)
+        return world
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Replays do Paladin vs Dracula")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_info = sub.add_parser("info", help="mostra o cabeçalho do replay")
+    p_info.add_argument("path")
+    p_play = sub.add_parser("play", help="reproduz headless na velocidade máxima e confere o estado final")
+    p_play.add_argument("path")
+    p_play.add_argument("--backend", choices=BACKENDS, help="troca o backend da horda (padrão: o da gravação)")
+    p_play.add_argument("--profile", action="store_true", help="mostra os ms médios de cada fase do step")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    sim_time = replay.duration()
+    mode = ("  modo infinito" if replay.endless else "") + ("  co-op" if replay.coop else "") + ("  névoa" if replay.fog else "") + \
+        ("  por turnos" if replay.turns else "")
+    print(f"seed {replay.seed}  mapa {replay.dungeon or 'sala original'}{mode}  backend {replay.backend}  "
+          f"{len(replay)} ticks a {replay.sim_hz} Hz ({sim_time:.1f}s de jogo)")
+    if args.command == "info": return
+
+    world = replay.make_world(args.backend)
+    if args.profile:
+        from profiler import FrameProfiler, NULL_PROFILER
+        world.profiler = profiler = FrameProfiler(history=len(replay) or 1)
+        world.reset()
+        for dt, command in replay.inputs():
+            profiler.begin_frame(); world.step(dt, command)
+        profiler.begin_frame()
+        for line in profiler.report_lines()[2:]: print(line)
+        world.profiler = NULL_PROFILER # A medição abaixo roda sem o custo dos laps
+    start = time.perf_counter()
+    replay.run(world)
+    elapsed = time.perf_counter() - start
+    ok = state_hash(world) == replay.final_hash
+    print(f"{world.tick} ticks em {elapsed:.3f}s ({world.tick / max(elapsed, 1e-9):.0f} ticks/s, "
+          f"{sim_time / max(elapsed, 1e-9):.0f}x tempo real) - status: {world.status} - "
+          f"{'estado final confere' if ok else 'DESSINCRONIZOU: estado final diferente da gravação'}")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+# scene.py
+# Monta a cena da arena a partir de um World: sprites na ordem de desenho, HUD e
+# cenário. Não depende do loop do pgzero, então serve para o game.py e para os
+# benchmarks headless. Em mapas maiores que a tela, a Camera escolhe o que aparece.
+from collections import OrderedDict
+from pygame import Rect, Surface, SRCALPHA
+from pgzero.loaders import images
+from world import Player, Vampire, Dracula, VAMPIRE_ANIMS, DRACULA_ANIMS, WIDTH, TILE_SIZE, SEEN, UNSEEN
+from dungeon import CHUNK_TILES, FLOOR
+from sprites import load_sheets, load_hero_frames, read_frames, convert_frames
+from render import circle_sprite
+from animation import DIRECTION_ID
+
+# Preenchidos por load_art() ou finish_art() (precisam de uma tela aberta para o convert_alpha)
+vampire_sheets = {}
+dracula_sheets = {}
+hero_frames = {}
+
+def load_art():
+    read_frames(); finish_art()
+
+def finish_art(_=None):
+    """Segunda metade do load_art, na thread principal (o Preloader roda read_frames na thread dele)"""
+    convert_frames() # Sem atlas gerado, os frames vieram dos PNGs
+    vampire_sheets.update(load_sheets(VAMPIRE_ANIMS))
+    dracula_sheets.update(load_sheets(DRACULA_ANIMS))
+    if dracula_sheets.get("hurt") is None: dracula_sheets["hurt"] = dracula_sheets.get("idle")
+    hero_frames.update(load_hero_frames())
+
+# Cada função devolve (superfície, posição) do sprite ou None; quem desenha é o draw()
+def player_sprite(p):
+    frames = hero_frames.get((p.state, p.direction))
+    if not frames: return circle_sprite(p.x, p.y, 15, "white")
+    img = frames[min(int(p.frame), len(frames)-1)]
+    return img, (p.x - img.get_width()//2, p.y - img.get_height()//2)
+
+def vampire_sprite(v):
+    if v.state == "gone": return None
+    sheet = vampire_sheets.get(v.state)
+    if not sheet: return circle_sprite(v.x, v.y, 20, "red")
+    dir_idx = DIRECTION_ID.get(v.direction, 0)
+    img = sheet[dir_idx][min(int(v.frame), len(sheet[dir_idx])-1)]
+    return img, (v.x - img.get_width()//2, v.y - img.get_height()//2)
+
+def dracula_sprite(d):
+    if d.state == "gone": return None
+    sheet = dracula_sheets.get(d.state)
+    if not sheet: sheet = dracula_sheets.get("idle")
+    if not sheet: return circle_sprite(d.x, d.y, 25, "red")
+
+    dir_idx = DIRECTION_ID.get(d.direction, 0)
+    try:
+        current_frame = min(int(d.frame), len(sheet[dir_idx])-1)
+        img = sheet[dir_idx][current_frame]
+        return img, (d.x - img.get_width()//2, d.y - img.get_height()//2)
+    except:
+        return circle_sprite(d.x, d.y, 25, "red")
+
+SPRITES = {Player: player_sprite, Vampire: vampire_sprite, Dracula: dracula_sprite}
+
+def char_sprite(char): return SPRITES.get(type(char), vampire_sprite)(char) # Proxies da horda NumPy desenham como Vampire
+
+# ------------------------
+# CÂMERA
+# ------------------------
+CULL_MARGIN = TILE_SIZE * 2 # Sprites são maiores que o tile: quem está até 2 tiles fora da tela ainda aparece
+
+class Camera:
+    """Janela do tamanho da tela sobre o mapa: segue o jogador e para nas bordas."""
+    def __init__(self, width, height):
+        self.rect = Rect(0, 0, width, height)
+
+    def follow(self, world, blend=None, hero=None):
+        """Centraliza no jogador (ou em hero; na posição interpolada, com blend); devolve True se a câmera andou"""
+        r = self.rect
+        hero = hero or world.player
+        px, py = blend.position(hero) if blend else (hero.x, hero.y)
+        x = min(max(int(px) - r.width // 2, 0), max(0, world.width - r.width))
+        y = min(max(int(py) - r.height // 2, 0), max(0, world.height - r.height))
+        if (x, y) == r.topleft: return False
+        r.topleft = (x, y)
+        return True
+
+    def covers(self, world):
+        return self.rect.left <= 0 and self.rect.top <= 0 and self.rect.right >= world.width and self.rect.bottom >= world.height
+
+def visible_enemies(world, camera):
+    """Inimigos perto da câmera, pelo índice espacial (não percorre a lista inteira). Com
+    névoa, só os que estão nos tiles à vista."""
+    fov = world.fov
+    if fov is None and (camera is None or camera.covers(world)): return world.enemies
+    player, ally, dracula = world.player, world.ally, world.dracula
+    if fov: return [e for e in world.spatial.query_rect(fov.bounds, 0)
+                    if e is not player and e is not dracula and e is not ally and fov.sees(e.x, e.y)]
+    return [e for e in world.spatial.query_rect(camera.rect, CULL_MARGIN) if e is not player and e is not dracula and e is not ally]
+
+# ------------------------
+# INTERPOLAÇÃO
+# ------------------------
+class Blend:
+    """Desenho entre os dois últimos estados da simulação (passo fixo).
+
+    capture() guarda as posições antes do último step do frame; alpha é a fração do
+    próximo tick que já passou (0 = estado anterior, 1 = atual). Saltos maiores que um
+    tile (teleporte do chefe, rewind, quick-load) não são interpolados.
+    """
+    def __init__(self):
+        self.previous = {}
+        self.alpha = 1.0
+
+    def capture(self, world, camera=None):
+        previous = self.previous
+        previous.clear()
+        for c in visible_enemies(world, camera): previous[c] = (c.x, c.y)
+        for c in world.players: previous[c] = (c.x, c.y)
+        previous[world.dracula] = (world.dracula.x, world.dracula.y)
+
+    def clear(self):
+        self.previous.clear()
+
+    def position(self, char):
+        prev = self.previous.get(char)
+        if prev is None: return char.x, char.y
+        x, y = char.x, char.y
+        if abs(x - prev[0]) > TILE_SIZE or abs(y - prev[1]) > TILE_SIZE: return x, y
+        a = self.alpha
+        return prev[0] + (x - prev[0]) * a, prev[1] + (y - prev[1]) * a
+
+# ------------------------
+# ORDEM DE DESENHO
+# ------------------------
+def _by_y(char): return char.y
+
+class DrawOrder:
+    """Todos os personagens do mundo ordenados por y, mantidos entre frames.
+
+    De um frame para o outro quase ninguém troca de lugar, então em vez de ordenar tudo
+    de novo uma passada de inserção corrige só quem passou do vizinho. A lista só é
+    refeita quando alguém entra ou sai de world.enemies (world.roster).
+    """
+    def __init__(self):
+        self.world, self.roster = None, None
+        self.chars = []
+
+    def update(self, world):
+        chars = self.chars
+        if world is not self.world or world.roster != self.roster:
+            self.world, self.roster = world, world.roster
+            chars[:] = world.enemies
+            chars.extend(world.players); chars.append(world.dracula)
+            chars.sort(key=_by_y)
+            return chars
+        top = None # Maior y até aqui
+        for i, char in enumerate(chars):
+            y = char.y
+            if top is None or y >= top: top = y; continue
+            j = i - 1
+            while j >= 0 and chars[j].y > y: chars[j + 1] = chars[j]; j -= 1
+            chars[j + 1] = char
+        return chars
+
+_draw_order = DrawOrder()
+
+# ------------------------
+# QUALIDADE (governor.py)
+# ------------------------
+FAR_ANIM_DIST = TILE_SIZE * 6 # Além disso do jogador (em x ou em y) o inimigo conta como longe
+
+class Quality:
+    """Ajustes do desenho que o governador de qualidade troca durante o jogo. Só mudam o
+    que aparece na tela: a simulação é a mesma em qualquer nível."""
+    def __init__(self):
+        self.far_anim = 1 # Inimigos longe trocam de frame da animação a cada far_anim frames desenhados
+        self.dying = True # False: a animação de morte não é desenhada (o corpo aparece no fim)
+        self.bake = False # True: corpos parados saem da lista de sprites e vão para o cenário
+        self.hud_every = 1 # HUD refeito a cada hud_every frames
+        self.frame = 0
+        self.held = {} # inimigo -> ((estado, direção), imagem) mostrada nos frames pulados
+        self.baked = {} # corpo já pintado no cenário -> (Rect em coordenadas de tela, imagem)
+        self.to_bake = [] # (corpo, imagem, pos) para quem desenha pintar no cenário neste frame
+        self.player = None # Referência para "longe", guardada por scene_sprites
+
+    def reset(self):
+        """Esquece imagens seguradas e corpos pintados (partida nova ou cenário refeito)"""
+        self.held.clear(); self.baked.clear(); self.to_bake.clear()
+
+def _held_sprite(char, quality):
+    """Sprite de um inimigo longe: a imagem só troca a cada quality.far_anim frames (escalonado
+    pela coluna, para não trocarem todos juntos), a menos que o estado ou a direção mudem"""
+    key = (char.state, char.direction)
+    held = quality.held.get(char)
+    if held and held[0] == key and (quality.frame + int(char.x) // TILE_SIZE) % quality.far_anim:
+        img = held[1]
+        return img, (char.x - img.get_width() // 2, char.y - img.get_height() // 2)
+    sprite = char_sprite(char)
+    if sprite: quality.held[char] = (key, sprite[0])
+    return sprite
+
+def _add_sprite(result, char, view, ox, oy, blend, quality=None):
+    if view and not view.collidepoint(char.x, char.y): return
+    if quality and quality.far_anim > 1 and char is not quality.player and \
+            (abs(char.x - quality.player.x) > FAR_ANIM_DIST or abs(char.y - quality.player.y) > FAR_ANIM_DIST):
+        sprite = _held_sprite(char, quality)
+    else: sprite = char_sprite(char)
+    if not sprite: return
+    if blend:
+        x, y = blend.position(char)
+        result.append((char, sprite[0], (sprite[1][0] + x - char.x - ox, sprite[1][1] + y - char.y - oy)))
+    else: result.append((char, sprite[0], (sprite[1][0] - ox, sprite[1][1] - oy)))
+
+def scene_sprites(world, camera=None, blend=None, quality=None):
+    """Sprites da arena na ordem de desenho: mortos embaixo, resto ordenado por y.
+    Com camera, só o que aparece na tela e já em coordenadas de tela; com blend, nas
+    posições interpoladas entre os dois últimos ticks; com quality, no nível de qualidade
+    pedido pelo governador. Com névoa, quem está fora da vista não é desenhado."""
+    player, dracula = world.player, world.dracula
+    keep = (player, dracula, world.ally) # Nunca vão para baixo dos outros nem para o cenário
+    if world.fov is None and (camera is None or camera.covers(world)):
+        # Todo mundo na tela: ordem persistente, sem lista nova nem sort por frame
+        chars, view = _draw_order.update(world), None
+    else:
+        chars = visible_enemies(world, camera)
+        chars.extend(world.players)
+        if world.fov is None or world.fov.sees(dracula.x, dracula.y): chars.append(dracula)
+        chars.sort(key=_by_y)
+        view = camera.rect.inflate(CULL_MARGIN * 2, CULL_MARGIN * 2) if camera else None
+    ox, oy = camera.rect.topleft if camera else (0, 0)
+    if blend and blend.alpha == 1.0: blend = None
+    result = []
+    if quality:
+        quality.frame += 1; quality.player = player
+        for char in chars: # Inimigos mortos embaixo de todo o resto
+            if char.state != "death" or char in keep: continue
+            if char.death_timer > 0 and quality.bake: # Corpo parado: vai (uma vez) para o cenário
+                if char not in quality.baked:
+                    sprite = char_sprite(char)
+                    if sprite: quality.to_bake.append((char, sprite[0], (sprite[1][0] - ox, sprite[1][1] - oy)))
+            elif char.death_timer > 0 or quality.dying: _add_sprite(result, char, view, ox, oy, blend, quality)
+    else:
+        for char in chars:
+            if char.state == "death" and char not in keep: _add_sprite(result, char, view, ox, oy, blend)
+    for char in chars:
+        if char.state != "death" or char in keep: _add_sprite(result, char, view, ox, oy, blend, quality)
+    return result
+
+def hud_texts(world):
+    """(texto, args) do HUD"""
+    player, dracula = world.player, world.dracula
+    texts = [(f"HP: {player.hp}", dict(topleft=(20, 20), color="red" if player.hp < 4 else "white", fontsize=40, owidth=1.5, ocolor="black"))]
+    if world.ally:
+        hp = world.ally.hp
+        texts.append((f"P2: {hp}", dict(topleft=(20, 60), color="red" if hp < 4 else "lightblue", fontsize=30, owidth=1.5, ocolor="black")))
+    if world.boss_phase_active:
+        texts.append((f"BOSS: {dracula.hp}", dict(topleft=(WIDTH-180, 20), color="red", fontsize=40, owidth=1.5, ocolor="black")))
+    elif world.endless:
+        texts.append((f"WAVE: {world.wave}", dict(topright=(WIDTH-20, 20), color="orange", fontsize=40, owidth=1.5, ocolor="black")))
+        texts.append((f"KILLS: {world.kills}", dict(topright=(WIDTH-20, 55), color="yellow", fontsize=30, owidth=1.5, ocolor="black")))
+    else:
+        texts.append((f"MINIONS: {len(world.enemies)}", dict(topleft=(WIDTH-200, 20), color="yellow", fontsize=30, owidth=1.5, ocolor="black")))
+    return texts
+
+def hud_key(world):
+    """Muda só quando algum valor mostrado no HUD muda"""
+    ally = world.ally.hp if world.ally else None
+    if world.endless: return (world.player.hp, ally, world.wave, world.kills)
+    return (world.player.hp, ally, world.boss_phase_active, world.dracula.hp, len(world.enemies))
+
+def make_static_layer(width, height):
+    """Cenário pré-composto (fundo + decoração) no formato da tela"""
+    layer = Surface((width, height)).convert()
+    try: layer.blit(images.backgrounds.background, (0,0))
+    except: layer.fill((50,50,50))
+    return layer
+
+# ------------------------
+# MASMORRA EM CHUNKS
+# ------------------------
+CHUNK_CACHE_SIZE = 24 # Chunks prontos guardados (a tela encosta em no máximo 9)
+_chunk_cache = OrderedDict() # (id do mapa, cx, cy) -> superfície, do menos para o mais usado
+_tile_art = {}
+
+def tile_art():
+    """Chão e parede recortados do fundo da sala original (cores lisas se faltar a imagem)"""
+    if not _tile_art:
+        floor, wall = Surface((TILE_SIZE, TILE_SIZE)).convert(), Surface((TILE_SIZE, TILE_SIZE)).convert()
+        try:
+            background = images.backgrounds.background
+            floor.blit(background, (0, 0), Rect(100, 240, TILE_SIZE, TILE_SIZE))
+            wall.blit(background, (0, 0), Rect(180, 95, TILE_SIZE, TILE_SIZE))
+        except:
+            floor.fill((80, 80, 80)); wall.fill((35, 35, 40))
+        _tile_art.update(floor=floor, wall=wall)
+    return _tile_art["floor"], _tile_art["wall"]
+
+def chunk_surface(dungeon, cx, cy):
+    """Chunk (cx, cy) desenhado uma vez e guardado num cache LRU"""
+    key = (id(dungeon), cx, cy)
+    surf = _chunk_cache.get(key)
+    if surf is not None: _chunk_cache.move_to_end(key); return surf
+    floor, wall = tile_art()
+    size = CHUNK_TILES * TILE_SIZE
+    surf = Surface((size, size)).convert()
+    for row in range(CHUNK_TILES):
+        for col in range(CHUNK_TILES):
+            tile = dungeon.tile(cx * CHUNK_TILES + col, cy * CHUNK_TILES + row)
+            surf.blit(floor if tile == FLOOR else wall, (col * TILE_SIZE, row * TILE_SIZE))
+    _chunk_cache[key] = surf
+    if len(_chunk_cache) > CHUNK_CACHE_SIZE: _chunk_cache.popitem(last=False)
+    return surf
+
+def draw_dungeon(surface, world, view):
+    """Só os chunks que encostam em view (retângulo da câmera, em pixels)"""
+    size = CHUNK_TILES * TILE_SIZE
+    surface.blits([(chunk_surface(world.dungeon, cx, cy), (cx * size - view.x, cy * size - view.y))
+                   for cx, cy in world.dungeon.chunks_in(view, TILE_SIZE)], False)
+
+# ------------------------
+# NÉVOA
+# ------------------------
+FOG_SEEN_ALPHA = 150 # Tile já visto mas fora da vista: escurecido (nunca visto fica preto)
+_fog_masks = []
+
+def fog_masks():
+    """Máscara de escuridão de um tile por nível de névoa (None = à vista), feitas uma vez"""
+    if not _fog_masks:
+        seen = Surface((TILE_SIZE, TILE_SIZE), SRCALPHA); seen.fill((0, 0, 0, FOG_SEEN_ALPHA))
+        unseen = Surface((TILE_SIZE, TILE_SIZE)).convert(); unseen.fill((0, 0, 0))
+        _fog_masks.extend((None, None, None))
+        _fog_masks[SEEN], _fog_masks[UNSEEN] = seen.convert_alpha(), unseen
+    return _fog_masks
+
+def _tile_span(world, area):
+    """Colunas e linhas (início, fim) dos tiles que encostam em area (em pixels do mapa)"""
+    return (max(0, area.left // TILE_SIZE), max(0, area.top // TILE_SIZE),
+            min(world.grid.cols, (area.right - 1) // TILE_SIZE + 1), min(world.grid.rows, (area.bottom - 1) // TILE_SIZE + 1))
+
+def fog_blits(world, view, levels=None, area=None):
+    """(máscara, posição na tela) dos tiles escurecidos de view, ou só dos que encostam em
+    area (em coordenadas de tela); levels é o nível de cada tile (padrão: world.fov.fog)"""
+    levels = world.fov.fog if levels is None else levels
+    masks, cols = fog_masks(), world.grid.cols
+    left, top, right, bottom = _tile_span(world, view if area is None else area.move(view.x, view.y))
+    return [(masks[levels[row * cols + col]], (col * TILE_SIZE - view.x, row * TILE_SIZE - view.y))
+            for row in range(top, bottom) for col in range(left, right) if levels[row * cols + col]]
+
+def fog_changes(world, view, painted):
+    """Retângulos (na tela) dos tiles de view cujo nível de névoa não é o de painted (o nível
+    pintado de cada tile, atualizado aqui)"""
+    fog, cols = world.fov.fog, world.grid.cols
+    left, top, right, bottom = _tile_span(world, view)
+    changed = []
+    for row in range(top, bottom):
+        for i in range(row * cols + left, row * cols + right):
+            if painted[i] != fog[i]:
+                painted[i] = fog[i]
+                changed.append(Rect((i - row * cols) * TILE_SIZE - view.x, row * TILE_SIZE - view.y, TILE_SIZE, TILE_SIZE))
+    return changed
+
+def draw_scene_full(target, world, lap, camera=None, blend=None, quality=None):
+    """Modo "full": fundo, névoa, sprites e HUD redesenhados inteiros em target (um pgzero Screen)"""
+    if world.dungeon: draw_dungeon(target.surface, world, camera.rect)
+    else:
+        try: target.blit(images.backgrounds.background, (0,0))
+        except: target.fill((50,50,50))
+    if world.fov:
+        target.surface.blits(fog_blits(world, camera.rect if camera else Rect(0, 0, world.width, world.height)), False)
+    lap("draw.background")
+
+    sprites = scene_sprites(world, camera, blend, quality); lap("draw.scene")
+    target.surface.blits([(surf, pos) for _, surf, pos in sprites], False) # Uma chamada para todos os sprites
+    lap("draw.sprites")
+    for text, kwargs in hud_texts(world): target.draw.text(text, **kwargs)
+    lap("draw.text")
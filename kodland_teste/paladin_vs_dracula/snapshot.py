@@ -0,0 +1,349 @@
+# snapshot.py
+# Snapshots binários do World (layout fixo, sem pickle): save/load rápido,
+# rollback e rewind. Um anel guarda os últimos frames como deltas comprimidos.
+#
+#   python snapshot.py check   (ida e volta dos snapshots, anel do rewind e gravação com rewind/F9)
+#
+# Layout: HEADER, estado do rng, ondas do modo infinito, névoa e relógio dos turnos (se ligados),
+# registros dos heróis e do Drácula, inimigos
+# (registros ENTITY no backend python, arrays crus no backend numpy), tiles
+# reservados de cada entidade e, em mapas grandes, as listas perto/longe do LOD.
+import math
+import os
+import struct
+import zlib
+from collections import deque
+from array import array
+from pygame import Rect
+from world import World, Vampire
+from animation import STATES, STATE_ID, DIRECTIONS, DIRECTION_ID
+
+VERSION = 2
+FILE_MAGIC = b"PVDSNAP1"
+FILE_HEADER = struct.Struct("<8sQHHB") # magic, seed, colunas e linhas da masmorra (0 = sala original), modo
+HEADER = struct.Struct("<BIBBBI") # versão, tick, status, fase do chefe, modo, nº de inimigos
+RNG = struct.Struct("<625Id") # Mersenne Twister (624 palavras + posição) e gauss_next (nan = None)
+WAVES = struct.Struct("<IdI") # onda atual, segundos até a próxima e vampiros mortos (modo infinito)
+CLOCK = struct.Struct("<d") # Relógio do modo por turnos (a vez de cada inimigo fica no move_timer dele)
+NUMPY, ENDLESS, COOP, FOG, TURNS = 1, 2, 4, 8, 16 # Bits do modo: backend da horda, ondas infinitas, segundo herói, névoa e turnos
+# x, y, alvo x, alvo y, velocidade, frame, timer a, timer b, hp, estado, direção, flags
+ENTITY = struct.Struct("<8diBBB")
+CLAIM = struct.Struct("<ii") # Até dois tiles reservados (origem e destino do passo); -1 = nenhum
+COUNT = struct.Struct("<I")
+SIZES = struct.Struct("<II") # Tamanhos do snapshot anterior e do atual num delta
+
+STATUSES = ["game", "game_over", "win"]
+MOVING, DAMAGE_DEALT = 1, 2
+# Arrays da horda NumPy gravados crus, na ordem
+HORDE_ARRAYS = ["x", "y", "target_x", "target_y", "speed", "frame", "move_timer", "death_timer",
+                "hp", "state", "direction", "moving", "damage_dealt", "cell_x", "cell_y"]
+
+# ------------------------
+# ENTIDADES
+# ------------------------
+def _pack_entity(e):
+    # Jogador: timer a = cooldown do ataque. Inimigos: timer de morte e de "pensar"
+    if hasattr(e, "attack_cooldown"): a, b = e.attack_cooldown, 0.0
+    else: a, b = e.death_timer, e.move_timer
+    flags = (MOVING if e.is_moving else 0) | (DAMAGE_DEALT if getattr(e, "damage_dealt", False) else 0)
+    return ENTITY.pack(e.x, e.y, e.target_x, e.target_y, e.speed, e.frame, a, b, e.hp,
+                       STATE_ID[e.state], DIRECTION_ID[e.direction], flags)
+
+def _unpack_entity(e, data, offset):
+    x, y, tx, ty, speed, frame, a, b, hp, state, direction, flags = ENTITY.unpack_from(data, offset)
+    e.x, e.y, e.target_x, e.target_y, e.speed, e.frame, e.hp = x, y, tx, ty, speed, frame, hp
+    e.state, e.direction = STATES[state], DIRECTIONS[direction]
+    e.is_moving = bool(flags & MOVING)
+    if hasattr(e, "attack_cooldown"): e.attack_cooldown = a
+    else: e.death_timer, e.move_timer, e.damage_dealt = a, b, bool(flags & DAMAGE_DEALT)
+    return offset + ENTITY.size
+
+def _new_vampire(world):
+    """Vampire vazio (sem reservar tile nem entrar no índice); o restore preenche o resto"""
+    e = Vampire.__new__(Vampire)
+    e.world, e.rect = world, Rect(0, 0, 0, 0)
+    return e
+
+# ------------------------
+# SNAPSHOT / RESTORE
+# ------------------------
+def world_mode(world):
+    return (NUMPY if world.horde else 0) | (ENDLESS if world.endless else 0) | (COOP if world.coop else 0) | \
+        (FOG if world.fov else 0) | (TURNS if world.turns else 0)
+
+def snapshot(world):
+    """Estado completo do mundo em bytes"""
+    enemies = world.enemies
+    rng = world.rng.getstate()
+    parts = [
+        HEADER.pack(VERSION, world.tick, STATUSES.index(world.status), world.boss_phase_active,
+                    world_mode(world), len(enemies)),
+        RNG.pack(*rng[1], math.nan if rng[2] is None else rng[2]),
+        WAVES.pack(world.wave, world.wave_timer, world.kills),
+        bytes(world.fov.fog) if world.fov else b"",
+        CLOCK.pack(world.clock) if world.turns else b"",
+        *[_pack_entity(p) for p in world.players], _pack_entity(world.dracula),
+    ]
+    if world.horde:
+        horde = world.horde
+        parts.append(COUNT.pack(horde.count) + COUNT.pack(len(horde.free)) + array("I", horde.free).tobytes())
+        parts += [getattr(horde, name)[:horde.count].tobytes() for name in HORDE_ARRAYS]
+        parts.append(array("I", [e.i for e in enemies]).tobytes())
+    else:
+        parts += [_pack_entity(e) for e in enemies]
+
+    claims = world.grid.claims
+    for e in world.players + [world.dracula] + enemies:
+        tiles = claims.get(e, ())
+        parts.append(CLAIM.pack(tiles[0] if tiles else -1, tiles[1] if len(tiles) > 1 else -1))
+
+    if (world.lod or world.fov) and world._near is not None:
+        position = {id(e): i for i, e in enumerate(enemies)}
+        near = [position[id(e)] for e in world._near if id(e) in position]
+        far = [position[id(e)] for e in world._far if id(e) in position]
+        parts.append(COUNT.pack(len(near)) + COUNT.pack(len(far)) + array("I", near + far).tobytes())
+    return b"".join(parts)
+
+def restore(world, data):
+    """Volta o mundo (o mesmo objeto World, mesma configuração) para o estado do snapshot"""
+    version, tick, status, boss, mode, count = HEADER.unpack_from(data)
+    if version != VERSION or mode != world_mode(world): raise ValueError("snapshot incompatível com este mundo")
+    offset = HEADER.size
+    state = RNG.unpack_from(data, offset); offset += RNG.size
+    world.wave, world.wave_timer, world.kills = WAVES.unpack_from(data, offset); offset += WAVES.size
+    if world.fov:
+        size = len(world.fov.fog)
+        world.fov.restore(data[offset:offset + size]); offset += size
+    if world.turns: world.clock = CLOCK.unpack_from(data, offset)[0]; offset += CLOCK.size
+    world.rng.setstate((3, state[:625], None if math.isnan(state[625]) else state[625]))
+    world.tick, world.status, world.boss_phase_active = tick, STATUSES[status], bool(boss)
+    world.events = []
+    grid, spatial = world.grid, world.spatial
+    grid.clear_occupancy()
+    spatial.clear()
+    for p in world.players: offset = _unpack_entity(p, data, offset)
+    offset = _unpack_entity(world.dracula, data, offset)
+
+    if world.horde: enemies, offset = _restore_horde(world.horde, data, offset, count)
+    else:
+        # Reaproveita os objetos Vampire que já existem; só cria os que faltam
+        old, pool = world.enemies, world.pool
+        enemies = [old[i] if i < len(old) and type(old[i]) is Vampire else pool.pop() if pool else _new_vampire(world)
+                   for i in range(count)]
+        pool.extend(old[count:])
+        for e in enemies: offset = _unpack_entity(e, data, offset)
+    world.enemies[:] = enemies
+    world.departed = sum(1 for e in enemies if e.state == "gone")
+    world.roster += 1
+
+    for e in world.players + [world.dracula] + enemies:
+        tiles = [i for i in CLAIM.unpack_from(data, offset) if i >= 0]; offset += CLAIM.size
+        if tiles:
+            grid.claims[e] = tiles
+            for i in tiles: grid.occupant[i] = e; grid.occupied[i] = 1
+    for e in world.players + [world.dracula] + enemies:
+        if e.state != "gone": spatial.update(e)
+    world._update_flow()
+    world._update_fov()
+    if world.turns: world.rebuild_turns()
+
+    world._near = world._far = None
+    if offset < len(data):
+        n_near, n_far = COUNT.unpack_from(data, offset)[0], COUNT.unpack_from(data, offset + 4)[0]
+        order = array("I", data[offset + 8:offset + 8 + 4 * (n_near + n_far)])
+        world._near, world._far = [enemies[i] for i in order[:n_near]], [enemies[i] for i in order[n_near:]]
+
+def _restore_horde(horde, data, offset, count):
+    import numpy as np # Só existe horda com o numpy instalado
+    from horde import GONE
+    used, n_free = COUNT.unpack_from(data, offset)[0], COUNT.unpack_from(data, offset + 4)[0]
+    offset += 8
+    horde.free = list(array("I", data[offset:offset + 4 * n_free])); offset += 4 * n_free
+    if used > horde.capacity: horde._grow(max(used, horde.capacity * 2))
+    for name in HORDE_ARRAYS:
+        arr = getattr(horde, name)
+        arr[:used] = np.frombuffer(data, arr.dtype, used, offset)
+        offset += arr.itemsize * used
+    horde.state[used:] = GONE
+    horde.count = used
+    slots = array("I", data[offset:offset + 4 * count]); offset += 4 * count
+    # Proxies reaproveitados por slot; slots fora de world.enemies ficam vazios
+    members = [None] * horde.capacity
+    for i in slots: members[i] = horde.proxy(i)
+    horde.members = members
+    return [members[i] for i in slots], offset
+
+# ------------------------
+# DELTAS E ANEL DE REWIND
+# ------------------------
+def delta(previous, current):
+    """XOR de previous com current (zeros onde nada mudou), comprimido. Serve nos
+    dois sentidos: apply_delta leva de previous para current e de current para previous."""
+    n = max(len(previous), len(current))
+    diff = int.from_bytes(previous, "little") ^ int.from_bytes(current, "little")
+    return zlib.compress(SIZES.pack(len(previous), len(current)) + diff.to_bytes(n, "little"), 1)
+
+def apply_delta(data, encoded, backward=False):
+    raw = zlib.decompress(encoded)
+    n_previous, n_current = SIZES.unpack_from(raw)
+    diff = int.from_bytes(raw[SIZES.size:], "little")
+    return (int.from_bytes(data, "little") ^ diff).to_bytes(n_current if not backward else n_previous, "little")
+
+class SnapshotRing:
+    """Últimos capacity snapshots para rewind/rollback.
+
+    Guardados em grupos: um snapshot completo (comprimido) seguido de até
+    keyframe_every - 1 deltas em relação ao anterior. O grupo mais velho sai inteiro.
+    """
+    def __init__(self, capacity=600, keyframe_every=30):
+        self.capacity = capacity
+        self.keyframe_every = keyframe_every
+        self.groups = deque() # [keyframe comprimido, delta, delta, ...]
+        self.size = 0
+        self._last = None # Último snapshot completo (base do próximo delta)
+
+    def __len__(self):
+        return self.size
+
+    def push(self, data):
+        if not self.groups or len(self.groups[-1]) >= self.keyframe_every:
+            self.groups.append([zlib.compress(data, 1)])
+        else:
+            self.groups[-1].append(delta(self._last, data))
+        self._last = data
+        self.size += 1
+        while self.size - len(self.groups[0]) >= self.capacity:
+            self.size -= len(self.groups.popleft())
+
+    def get(self, back=0):
+        """Snapshot de back frames atrás (0 = o último)"""
+        if not 0 <= back < self.size: raise IndexError(back)
+        return self._last if back == 0 else self._decode(self.size - 1 - back)
+
+    def _decode(self, index):
+        for group in self.groups:
+            if index < len(group): break
+            index -= len(group)
+        data = zlib.decompress(group[0])
+        for encoded in group[1:index + 1]: data = apply_delta(data, encoded)
+        return data
+
+    def pop(self):
+        """Tira e devolve o último snapshot (rewind de um frame)"""
+        data = self._last
+        group = self.groups[-1]
+        encoded = group.pop()
+        if not group: self.groups.pop()
+        self.size -= 1
+        if not self.size: self._last = None
+        elif group: self._last = apply_delta(data, encoded, backward=True) # Desfaz o delta, sem voltar ao keyframe
+        else: self._last = self._decode(self.size - 1)
+        return data
+
+    def clear(self):
+        self.groups.clear(); self.size = 0; self._last = None
+
+    def memory(self):
+        """Bytes guardados (sem contar o último snapshot completo)"""
+        return sum(len(item) for group in self.groups for item in group)
+
+# ------------------------
+# ARQUIVO (QUICK-SAVE)
+# ------------------------
+def save_file(path, world):
+    """Quick-save: configuração do mundo (para recriá-lo) + snapshot comprimido"""
+    cols, rows = (world.grid.cols, world.grid.rows) if world.dungeon else (0, 0)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(FILE_HEADER.pack(FILE_MAGIC, world.seed, cols, rows, world_mode(world)))
+        f.write(zlib.compress(snapshot(world), 6))
+    return path
+
+def load_file(path, world=None):
+    """Carrega o quick-save em world se ele tem a mesma configuração; senão num World novo.
+    Devolve o mundo carregado."""
+    with open(path, "rb") as f: data = f.read()
+    magic, seed, cols, rows, mode = FILE_HEADER.unpack_from(data)
+    if magic != FILE_MAGIC: raise ValueError(f"{path}: não é um quick-save")
+    dungeon = (cols, rows) if cols else None
+    same = world is not None and world.seed == seed and world_mode(world) == mode and \
+        ((world.grid.cols, world.grid.rows) if world.dungeon else None) == dungeon
+    if not same: world = World(seed, horde_backend="numpy" if mode & NUMPY else "python", dungeon=dungeon,
+                               endless=bool(mode & ENDLESS), coop=bool(mode & COOP), fog=bool(mode & FOG),
+                               turns=bool(mode & TURNS))
+    restore(world, zlib.decompress(data[FILE_HEADER.size:]))
+    return world
+
+# ------------------------
+# CONFERÊNCIA
+# ------------------------
+# Mundos conferidos na ida e volta (kwargs do World)
+CHECK_WORLDS = {
+    "sala": {}, "masmorra": {"dungeon": (40, 40)}, "infinito": {"endless": True}, "co-op": {"coop": True},
+    "névoa": {"dungeon": (40, 40), "fog": True}, "turnos": {"turns": True}, "numpy": {"horde_backend": "numpy"},
+}
+
+def check_round_trip(kwargs, script, ticks=240):
+    """Snapshot no meio da partida restaurado num World novo: mesmos bytes e o mesmo futuro, tick a tick"""
+    from replay import state_hash
+    original, copy = World(1234, **kwargs), World(1234, **kwargs)
+    for i in range(ticks): original.step(1 / 60, script[i % len(script)])
+    data = snapshot(original)
+    restore(copy, data)
+    if snapshot(copy) != data: return "bytes diferentes depois do restore"
+    for i in range(ticks, 2 * ticks):
+        for world in (original, copy): world.step(1 / 60, script[i % len(script)])
+        if state_hash(copy) != state_hash(original): return f"estado diferente no tick {copy.tick}"
+    return None
+
+def check_ring(script, ticks=200):
+    """Anel com keyframes e deltas: cada pop() devolve o snapshot daquele tick"""
+    world, ring, saved = World(1234), SnapshotRing(capacity=120, keyframe_every=7), []
+    for i in range(ticks):
+        world.step(1 / 60, script[i % len(script)])
+        data = snapshot(world); ring.push(data); saved.append(data)
+    while len(ring) > 1:
+        if ring.pop() != saved.pop(): return f"pop() errado com {len(ring)} no anel"
+        if ring.get() != saved[-1]: return f"get() errado com {len(ring)} no anel"
+    return None
+
+def check_recording(game, script, load):
+    """Partida gravada que termina num rewind (ou F9): o replay salvo confere do começo ao fim"""
+    import tempfile
+    from golden import Driver
+    from replay import Replay, state_hash
+    with tempfile.TemporaryDirectory() as tmp:
+        game.RECORD_REPLAYS = True
+        game.QUICKSAVE_PATH = os.path.join(tmp, "quicksave.pvs")
+        driver = Driver(game, "dirty")
+        driver.start(World(1234)); driver.play(30, script)
+        if load: game.quick_save()
+        driver.play(30, script)
+        recorder, path = game.recorder, os.path.join(tmp, "replay.pvr")
+        recorder.save = lambda _, save=recorder.save: save(path) # Fora de replays/
+        game.quick_load() if load else game.rewind_tick()
+        game.RECORD_REPLAYS = False
+        if not os.path.exists(path): return "replay não foi salvo"
+        replay = Replay.load(path)
+        world = replay.run()
+        if state_hash(world) != replay.final_hash: return f"replay de {len(replay)} ticks dessincronizou"
+    return None
+
+def check():
+    import golden
+    try: import numpy # noqa: F401 (backend opcional)
+    except ImportError: CHECK_WORLDS.pop("numpy")
+    results = [(f"ida e volta ({name})", check_round_trip(kwargs, golden.SCRIPT)) for name, kwargs in CHECK_WORLDS.items()]
+    results.append(("anel do rewind", check_ring(golden.SCRIPT)))
+    game = golden.load_game()
+    results.append(("gravação + rewind", check_recording(game, golden.SCRIPT, load=False)))
+    results.append(("gravação + quick-load", check_recording(game, golden.SCRIPT, load=True)))
+    for name, error in results: print(f"{name:<24} {error or 'ok'}")
+    failures = sum(1 for _, error in results if error)
+    print(f"{failures} conferência(s) falharam")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] != ["check"]: sys.exit("uso: python snapshot.py check")
+    sys.exit(check())
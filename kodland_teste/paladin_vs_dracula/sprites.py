@@ -0,0 +1,80 @@
+# sprites.py
+# Cache de frames compartilhado por todas as instâncias (flyweight).
+# Cada folha é fatiada uma única vez por processo; spawnar inimigos não custa nada de imagem.
+# Com o atlas pré-gerado (atlas.py), os frames são recortes de uma única superfície.
+import pygame
+from pygame import Rect
+from pgzero.loaders import images
+from world import HERO_FRAME_COUNTS
+from animation import DIRECTIONS # Ordem das linhas nas folhas de vampiro/drácula
+
+_frame_cache = {} # (pasta, arquivo, colunas, linhas) -> matriz [linha][coluna] de frames
+_atlas = {} # "surface" e "index" depois de use_atlas()
+
+def use_atlas(path=None, convert=True):
+    """Carrega o atlas (atlas.py) para o get_frames recortar dele. False se não houver um válido"""
+    from atlas import load_atlas, ATLAS_PATH
+    loaded = load_atlas(path or ATLAS_PATH, convert)
+    if loaded: _atlas["surface"], _atlas["index"] = loaded; _atlas["raw"] = not convert
+    return loaded is not None
+
+def _from_atlas(key):
+    rects = _atlas["index"].get("/".join(map(str, key))) if _atlas else None
+    if rects is None: return None
+    surface = _atlas["surface"]
+    return [[surface.subsurface(Rect(rect)) for rect in row] for row in rects]
+
+def _slice(surf, cols, rows, convert=True):
+    frame_w, frame_h = surf.get_width() // cols, surf.get_height() // rows
+    # convert_alpha() numa subsurface devolve uma cópia independente já no formato da tela
+    frames = [[surf.subsurface(Rect(c * frame_w, r * frame_h, frame_w, frame_h)) for c in range(cols)] for r in range(rows)]
+    return [[frame.convert_alpha() for frame in row] for row in frames] if convert else frames
+
+def get_frames(folder, filename, cols, rows):
+    """Matriz de frames da folha, fatiada só na primeira chamada (None se a imagem não existir)"""
+    key = (folder, filename, cols, rows)
+    if key not in _frame_cache:
+        _frame_cache[key] = _from_atlas(key)
+        if _frame_cache[key] is None:
+            try: _frame_cache[key] = _slice(getattr(getattr(images, folder), filename), cols, rows)
+            except: _frame_cache[key] = None
+    return _frame_cache[key]
+
+def read_frames():
+    """Lê o atlas (ou os PNGs) para o cache sem converter nada: pode rodar fora da thread
+    principal. convert_frames() termina o trabalho na thread principal."""
+    from atlas import sheet_specs, source_path
+    use_atlas(convert=False)
+    for spec in sheet_specs():
+        key = tuple(spec)
+        if key in _frame_cache: continue
+        _frame_cache[key] = _from_atlas(key)
+        if _frame_cache[key] is None:
+            try: _frame_cache[key] = _slice(pygame.image.load(source_path(spec)), spec[2], spec[3], convert=False)
+            except: _frame_cache[key] = None
+
+def convert_frames():
+    """Passa o atlas e os frames de read_frames() para o formato da tela (thread principal)"""
+    if _atlas.get("raw"): _atlas["surface"] = _atlas["surface"].convert_alpha(); _atlas["raw"] = False
+    for key, frames in _frame_cache.items():
+        if frames is None: continue
+        atlas_frames = _from_atlas(key) # Recortes do atlas já convertido
+        _frame_cache[key] = atlas_frames or [[frame.convert_alpha() for frame in row] for row in frames]
+
+def load_sheets(anims):
+    """{estado: matriz de frames} para uma tabela de animações (VAMPIRE_ANIMS, DRACULA_ANIMS...)"""
+    return {state: get_frames(*spec) for state, spec in anims.items()}
+
+def get_hero_frames(state, direction):
+    """Frames do herói (uma folha por estado/direção, em uma linha só)"""
+    frames = get_frames("hero", f"{state}_{direction}_40x40", HERO_FRAME_COUNTS.get(state, 4), 1)
+    return frames[0] if frames else None
+
+def load_hero_frames():
+    """{(estado, direção): lista de frames} já fatiado para todos os estados do herói"""
+    return {(state, direction): get_hero_frames(state, direction)
+            for state in HERO_FRAME_COUNTS for direction in DIRECTIONS}
+
+def cache_size():
+    """Quantos frames estão no cache (não cresce com o número de inimigos)"""
+    return sum(len(row) for matrix in _frame_cache.values() if matrix for row in matrix)
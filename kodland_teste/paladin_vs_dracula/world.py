@@ -0,0 +1,1283 @@
+# world.py
+# Simulação do jogo sem janela, áudio ou globais do pgzero.
+# O game.py só desenha o World e traduz o teclado em comandos.
+import heapq
+import itertools
+import math
+import random
+from collections import deque
+from pygame import Rect
+from profiler import NULL_PROFILER
+from animation import clip_table, animate, HOLD, TO_IDLE
+
+# ------------------------
+# CONFIGURAÇÕES
+# ------------------------
+WIDTH = 800
+HEIGHT = 750
+
+# Configuração da GRADE (Grid)
+TILE_SIZE = 50 # Tamanho de cada quadrado
+GRID_W = WIDTH // TILE_SIZE
+GRID_H = HEIGHT // TILE_SIZE
+
+# ------------------------
+# LIMITES DO CENÁRIO
+# ------------------------
+OBSTACLES = [
+    Rect(0, 0, WIDTH, 175),
+    Rect(0, 0, 50, HEIGHT),
+    Rect(WIDTH-50, 0, 50, HEIGHT),
+    Rect(0, HEIGHT-50, WIDTH, 50),
+    Rect(100, 650, 80, 50),
+    Rect(620, 650, 80, 50),
+    Rect(350, 650, 100, 50)
+]
+
+# ------------------------
+# BALANCEAMENTO (varridos pelo balance.py)
+# ------------------------
+PLAYER_HP = 10
+PLAYER_SPEED = 240 # Pixels por segundo no deslize (um tile em ~0.2s)
+PLAYER_ATTACK_COOLDOWN = 0.5
+VAMPIRE_HP = 3
+VAMPIRE_SPEED = 90
+VAMPIRE_THINK = 0.5 # Segundos parado antes de decidir (atacar ou andar)
+VAMPIRE_ATTACK_REST = 1.0 # Depois de atacar, espera isso a mais antes de pensar de novo
+VAMPIRE_DAMAGE = 1
+DRACULA_HP = 20
+DRACULA_SPEED = 120
+DRACULA_THINK = 0.3
+DRACULA_ATTACK_REST = 1.5
+DRACULA_DAMAGE = 2
+# Alcances em tiles: começar o ataque (aggro) e o golpe acertar (hit)
+VAMPIRE_AGGRO_RANGE, VAMPIRE_HIT_RANGE = 1.5, 1.8
+DRACULA_AGGRO_RANGE, DRACULA_HIT_RANGE = 1.8, 2.5
+
+def range_sq(tiles):
+    return (TILE_SIZE * tiles) ** 2
+
+# Alcances de ataque já ao quadrado (comparados com dx² + dy², sem sqrt)
+VAMPIRE_AGGRO_SQ = range_sq(VAMPIRE_AGGRO_RANGE)
+VAMPIRE_HIT_SQ = range_sq(VAMPIRE_HIT_RANGE)
+DRACULA_AGGRO_SQ = range_sq(DRACULA_AGGRO_RANGE)
+DRACULA_HIT_SQ = range_sq(DRACULA_HIT_RANGE)
+
+# ------------------------
+# MAPAS GRANDES (masmorra procedural, dungeon.py)
+# ------------------------
+ACTIVE_TILES = 16 # Inimigos a até 16 tiles do jogador (em x e em y) rodam todo tick
+FAR_TICKS = 8 # Os distantes rodam a cada 8 ticks, com dt acumulado
+FLOW_RADIUS = ACTIVE_TILES * 2 # Passos do BFS do campo de fluxo em mapas grandes
+VAMPIRES_PER_ROOM = 3
+
+# ------------------------
+# MODO INFINITO (World(endless=True)): ondas de vampiros cada vez maiores, sem chefe
+# ------------------------
+ENDLESS_FIRST_WAVE = 6 # Vampiros na primeira onda
+ENDLESS_WAVE_GROWTH = 4 # A mais em cada onda seguinte
+ENDLESS_WAVE_TIME = 20.0 # Segundos até a próxima onda (ou antes, se não sobrar ninguém)
+ENDLESS_SPAWN_DIST = 5 # Passos mínimos (campo de fluxo) entre o jogador e quem nasce
+
+# ------------------------
+# CAMPO DE VISÃO E NÉVOA (World(fog=True))
+# ------------------------
+FOV_RADIUS = 8 # Tiles que o herói enxerga em volta dele (sem parede no caminho)
+VISIBLE, SEEN, UNSEEN = 0, 1, 2 # Nível de névoa de cada tile: à vista, já visto, nunca visto
+
+# ------------------------
+# ESCALONADOR DA IA
+# ------------------------
+AI_NEAR = ACTIVE_TILES * TILE_SIZE # Até aqui do jogador (em x e em y) pensa no ritmo normal, fora do orçamento
+AI_FAR_THINK = 2.0 # Longe: pensa 2x mais devagar
+AI_BUDGET = 64 # Decisões por tick (perto primeiro); o resto tenta de novo no próximo
+
+def arena_obstacles(cols, rows):
+    """Sala retangular aberta de cols x rows tiles, com paredes de um tile na borda"""
+    w, h = cols * TILE_SIZE, rows * TILE_SIZE
+    return [Rect(0, 0, w, TILE_SIZE), Rect(0, 0, TILE_SIZE, h),
+            Rect(w - TILE_SIZE, 0, TILE_SIZE, h), Rect(0, h - TILE_SIZE, w, TILE_SIZE)]
+
+# ------------------------
+# COMANDOS DE ENTRADA (bits de um int por tick)
+# ------------------------
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_UP = 4
+INPUT_DOWN = 8
+INPUT_ATTACK = 16
+INPUT_PAUSE = 32 # ESC: só marca a pausa nos replays (replay.py), o World ignora
+ALLY_SHIFT = 8 # Co-op: o comando do segundo herói vai nos bits 8 em diante do mesmo int
+PLAYER_ACTIONS = INPUT_LEFT | INPUT_RIGHT | INPUT_UP | INPUT_DOWN | INPUT_ATTACK
+
+# ------------------------
+# MODO POR TURNOS (World(turns=True))
+# ------------------------
+# O relógio do mundo (segundos de turno) só anda quando o jogador age: um passo custa o
+# tempo do deslize e um ataque custa PLAYER_ATTACK_COOLDOWN. Os inimigos agem quando o
+# relógio passa da vez deles, com os mesmos tempos de "pensar" do tempo real.
+TURN_CORPSE_TIME = 3.0 # Segundos de turno até o corpo de um vampiro sumir
+TURN_ANIMATED = ("run", "attack", "hurt") # Estados que ainda estão animando (o resto fica parado)
+
+# ------------------------
+# ANIMAÇÕES (pasta, arquivo, colunas, linhas)
+# ------------------------
+HERO_FRAME_COUNTS = {"idle": 4, "run": 6, "attack": 7, "death": 9}
+VAMPIRE_ANIMS = {
+    "idle": ("vampire", "idle", 4, 4), "walk": ("vampire", "walk", 6, 4),
+    "run": ("vampire", "run", 8, 4), "attack": ("vampire", "attack", 12, 4),
+    "hurt": ("vampire", "hurt", 4, 4), "death": ("vampire", "death", 11, 4)
+}
+DRACULA_ANIMS = {
+    "idle": ("dracula", "idle", 4, 4), "walk": ("dracula", "walk", 6, 4),
+    "run": ("dracula", "run", 8, 4), "attack": ("dracula", "attack", 12, 4),
+    "hurt": ("dracula", "hurt", 4, 4), "death": ("dracula", "death", 11, 4)
+}
+# Clipes (animation.py): 10 frames por segundo; ataque e dano voltam para "idle", a morte
+# para no último frame e o resto repete
+CLIP_ENDS = {"attack": TO_IDLE, "hurt": TO_IDLE, "death": HOLD}
+HERO_CLIPS = clip_table(HERO_FRAME_COUNTS, CLIP_ENDS)
+VAMPIRE_CLIPS = clip_table({state: spec[2] for state, spec in VAMPIRE_ANIMS.items()}, CLIP_ENDS)
+DRACULA_CLIPS = clip_table({state: spec[2] for state, spec in DRACULA_ANIMS.items()}, CLIP_ENDS)
+
+# ------------------------
+# GRADE DE COLISÃO
+# ------------------------
+class TileGrid:
+    """Mapa de tiles andáveis calculado uma vez + tabela de ocupação ao vivo.
+
+    walkable (opcional) já vem pronto, linha a linha (ex.: Dungeon.walkable()).
+    """
+    def __init__(self, obstacles, cols, rows, tile_size, walkable=None):
+        self.cols, self.rows, self.tile_size = cols, rows, tile_size
+        self.walkable = walkable
+        if walkable is None:
+            # 1 = andável. Mesmo teste do antigo is_tile_free (quadrado 40x40 no centro do tile)
+            self.walkable = bytearray(cols * rows)
+            for row in range(rows):
+                for col in range(cols):
+                    cx = col * tile_size + tile_size // 2
+                    cy = row * tile_size + tile_size // 2
+                    if Rect(cx - 20, cy - 20, 40, 40).collidelist(obstacles) == -1:
+                        self.walkable[row * cols + col] = 1
+        self.occupant = [None] * (cols * rows)
+        self.occupied = bytearray(cols * rows) # Espelho de occupant (1 = ocupado) para leitura em lote
+        self.claims = {} # entidade -> índices que ela ocupa/reservou
+
+    def index(self, x, y):
+        col, row = int(x // self.tile_size), int(y // self.tile_size)
+        if 0 <= col < self.cols and 0 <= row < self.rows: return row * self.cols + col
+        return None
+
+    def is_free(self, x, y, entity=None):
+        i = self.index(x, y)
+        if i is None or not self.walkable[i]: return False
+        return self.occupant[i] is None or self.occupant[i] is entity
+
+    def claim(self, entity, x, y):
+        """Reserva o tile (x, y) para a entidade (ela continua dona dos anteriores)"""
+        i = self.index(x, y)
+        if i is None: return
+        self.occupant[i] = entity; self.occupied[i] = 1
+        self.claims.setdefault(entity, []).append(i)
+
+    def settle(self, entity, x, y):
+        """Entidade chegou em (x, y): libera todos os outros tiles dela"""
+        keep = self.index(x, y)
+        for i in self.claims.get(entity, []):
+            if i != keep and self.occupant[i] is entity: self.occupant[i] = None; self.occupied[i] = 0
+        self.claims[entity] = [keep] if keep is not None else []
+
+    def vacate(self, entity):
+        for i in self.claims.pop(entity, []):
+            if self.occupant[i] is entity: self.occupant[i] = None; self.occupied[i] = 0
+
+    def clear_occupancy(self):
+        self.occupant = [None] * (self.cols * self.rows)
+        self.occupied[:] = bytes(self.cols * self.rows)
+        self.claims = {}
+
+# ------------------------
+# CAMPO DE FLUXO (PATHFINDING)
+# ------------------------
+UNREACHABLE = -1
+
+class FlowField:
+    """Distâncias (BFS) de cada tile até o alvo, compartilhadas por todos os inimigos.
+
+    Só recalcula quando o tile do alvo muda; cada inimigo lê seu próximo passo
+    olhando os 4 vizinhos, então o custo por inimigo é constante. Com max_dist o
+    BFS para nessa distância (tiles mais longe ficam UNREACHABLE). Com mais de um
+    alvo (co-op), a distância de cada tile é até o alvo mais perto.
+    """
+    def __init__(self, grid, max_dist=None):
+        self.grid = grid
+        self.dist = [UNREACHABLE] * (grid.cols * grid.rows)
+        self.goal = None
+        self.rebuilds = 0
+        self.max_dist = max_dist
+
+    def update(self, x, y, *more):
+        """Alvo em (x, y); more = outros alvos (x, y), todos com distância 0"""
+        goal = self.grid.index(x, y)
+        if more: goal = (goal,) + tuple(self.grid.index(mx, my) for mx, my in more)
+        if goal == self.goal: return
+        self.goal = goal
+        self.rebuilds += 1
+        cols, rows, walkable = self.grid.cols, self.grid.rows, self.grid.walkable
+        dist = [UNREACHABLE] * (cols * rows)
+        limit = self.max_dist if self.max_dist is not None else cols * rows
+        frontier = deque()
+        for start in goal if more else (goal,):
+            if start is not None and dist[start] == UNREACHABLE: dist[start] = 0; frontier.append(start)
+        while frontier:
+            i = frontier.popleft()
+            d = dist[i] + 1
+            if d > limit: continue
+            col = i % cols
+            for n in (i - cols if i >= cols else -1, i + cols if i + cols < cols * rows else -1,
+                      i - 1 if col > 0 else -1, i + 1 if col < cols - 1 else -1):
+                if n >= 0 and dist[n] == UNREACHABLE and walkable[n]:
+                    dist[n] = d; frontier.append(n)
+        self.dist = dist
+
+    def distance(self, x, y):
+        i = self.grid.index(x, y)
+        return UNREACHABLE if i is None else self.dist[i]
+
+    def next_step(self, entity, prefer_x=True):
+        """(dx, dy) do vizinho livre mais perto do alvo, ou None se não dá pra melhorar"""
+        here = self.distance(entity.x, entity.y)
+        if here == UNREACHABLE: return None
+        steps = ((1, 0), (-1, 0), (0, 1), (0, -1)) if prefer_x else ((0, 1), (0, -1), (1, 0), (-1, 0))
+        best, best_dist = None, here
+        for dx, dy in steps:
+            nx, ny = entity.x + dx * TILE_SIZE, entity.y + dy * TILE_SIZE
+            d = self.distance(nx, ny)
+            if d != UNREACHABLE and d < best_dist and self.grid.is_free(nx, ny, entity):
+                best, best_dist = (dx, dy), d
+        return best
+
+# ------------------------
+# CAMPO DE VISÃO (SHADOWCASTING)
+# ------------------------
+# (xx, xy, yx, yy) de cada um dos 8 octantes
+OCTANTS = ((1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+           (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1))
+
+class FieldOfView:
+    """Tiles à vista dos heróis: shadowcasting recursivo nos 8 octantes, com os tiles não
+    andáveis bloqueando a visão, até radius tiles.
+
+    Como o FlowField, só recalcula quando algum herói troca de tile. fog tem o nível de
+    névoa de cada tile (VISIBLE, SEEN ou UNSEEN) e version muda a cada recálculo, para o
+    desenho repintar só o que mudou.
+    """
+    def __init__(self, grid, radius=FOV_RADIUS):
+        self.grid, self.radius = grid, radius
+        self.reset()
+
+    def reset(self):
+        """Mapa inteiro nunca visto"""
+        self.fog = bytearray([UNSEEN]) * (self.grid.cols * self.grid.rows)
+        self.lit = [] # Índices dos tiles VISIBLE
+        self.origin = None
+        self.version = 0
+        self.bounds = Rect(0, 0, 0, 0) # Retângulo (em pixels) que contém os tiles à vista
+
+    def restore(self, fog):
+        """Níveis vindos de um snapshot; o próximo update() recalcula a partir deles"""
+        self.fog[:] = fog
+        self.lit = [i for i, level in enumerate(self.fog) if level == VISIBLE]
+        self.origin = None
+
+    def update(self, *points):
+        """Visão a partir dos tiles dos pontos (x, y); devolve True se recalculou"""
+        grid = self.grid
+        origin = tuple(grid.index(x, y) for x, y in points)
+        if origin == self.origin: return False
+        self.origin = origin
+        fog = self.fog
+        for i in self.lit: fog[i] = SEEN
+        self.lit = lit = []
+        cols = grid.cols
+        for i in origin:
+            if i is None: continue
+            if fog[i] != VISIBLE: fog[i] = VISIBLE; lit.append(i)
+            for octant in OCTANTS: self._cast(i % cols, i // cols, 1, 1.0, 0.0, *octant)
+        if lit:
+            columns, rows = [i % cols for i in lit], [i // cols for i in lit]
+            left, top = min(columns), min(rows)
+            self.bounds.update(left * grid.tile_size, top * grid.tile_size,
+                               (max(columns) - left + 1) * grid.tile_size, (max(rows) - top + 1) * grid.tile_size)
+        else: self.bounds.update(0, 0, 0, 0)
+        self.version += 1
+        return True
+
+    def _cast(self, cx, cy, row, start, end, xx, xy, yx, yy):
+        """Uma fatia do octante, linha a linha; cada bloqueio abre uma fatia nova mais estreita"""
+        if start < end: return
+        grid, fog, lit = self.grid, self.fog, self.lit
+        cols, rows, walkable, radius = grid.cols, grid.rows, grid.walkable, self.radius
+        radius_sq = radius * radius
+        new_start = 0.0
+        for j in range(row, radius + 1):
+            dx, dy = -j - 1, -j
+            blocked = False
+            while dx <= 0:
+                dx += 1
+                left, right = (dx - 0.5) / (dy + 0.5), (dx + 0.5) / (dy - 0.5)
+                if start < right: continue
+                if end > left: break
+                x, y = cx + dx * xx + dy * xy, cy + dx * yx + dy * yy
+                inside = 0 <= x < cols and 0 <= y < rows
+                i = y * cols + x
+                if inside and dx * dx + dy * dy < radius_sq and fog[i] != VISIBLE: fog[i] = VISIBLE; lit.append(i)
+                opaque = not inside or not walkable[i]
+                if blocked:
+                    if opaque: new_start = right
+                    else: blocked = False; start = new_start
+                elif opaque and j < radius:
+                    blocked = True
+                    self._cast(cx, cy, j + 1, start, left, xx, xy, yx, yy)
+                    new_start = right
+            if blocked: break
+
+    def sees(self, x, y):
+        i = self.grid.index(x, y)
+        return i is not None and self.fog[i] == VISIBLE
+
+# ------------------------
+# ÍNDICE ESPACIAL (HASH UNIFORME)
+# ------------------------
+SPATIAL_MARGIN = 36 # Maior meia-altura de get_rect() (Drácula); infla consultas por retângulo
+
+class SpatialHash:
+    """Entidades agrupadas por célula da grade; só muda quando a entidade troca de célula."""
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {} # (col, linha) -> lista de entidades
+        self.where = {} # entidade -> (col, linha)
+
+    def update(self, entity):
+        key = (int(entity.x // self.cell_size), int(entity.y // self.cell_size))
+        old = self.where.get(entity)
+        if old == key: return
+        if old is not None: self.cells[old].remove(entity)
+        self.cells.setdefault(key, []).append(entity)
+        self.where[entity] = key
+
+    def remove(self, entity):
+        old = self.where.pop(entity, None)
+        if old is not None: self.cells[old].remove(entity)
+
+    def clear(self):
+        self.cells = {}
+        self.where = {}
+
+    def query_cells(self, left, top, right, bottom):
+        cs = self.cell_size
+        found = []
+        for row in range(int(top // cs), int(bottom // cs) + 1):
+            for col in range(int(left // cs), int(right // cs) + 1):
+                bucket = self.cells.get((col, row))
+                if bucket: found.extend(bucket)
+        return found
+
+    def query_rect(self, rect, margin=SPATIAL_MARGIN):
+        """Candidatas a colidir com rect (teste exato fica com quem chama)"""
+        return self.query_cells(rect.left - margin, rect.top - margin, rect.right + margin, rect.bottom + margin)
+
+# ------------------------
+# ESCALONADOR DA IA
+# ------------------------
+class AIScheduler:
+    """Orçamento de decisões (decide_move) por tick, para a IA não pesar toda no mesmo frame.
+
+    Perto do jogador (AI_NEAR) o inimigo decide na hora, no próprio update, enquanto houver
+    orçamento (grant()). Longe, pensa AI_FAR_THINK vezes mais devagar e pede a vez com
+    request(), assim como quem ficou sem orçamento perto. No fim do tick run() atende os
+    pedidos com o que sobrou, dos mais perto para os mais longe (quem espera há mais tempo
+    sobe na fila); os outros tentam de novo no próximo tick, e quem foi atendido mas está
+    travado espera um intervalo inteiro. O orçamento é em decisões, não em ms: o resultado
+    não depende da máquina e os replays continuam determinísticos.
+    """
+    def __init__(self, budget=AI_BUDGET):
+        self.budget = budget
+        self.queue = [] # (prioridade, y, x, entidade) pedidos deste tick
+        self.overflow = 0 # Pedidos que nem entraram na fila (a horda NumPy já corta no orçamento)
+        self.used = 0 # Decisões já feitas neste tick
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.decisions = self.deferred = 0 # Do último tick
+        self.totals = {"decisions": 0, "deferred": 0, "peak": 0, "ticks": 0}
+
+    def think_time(self, base, dx, dy):
+        return base if -AI_NEAR <= dx <= AI_NEAR and -AI_NEAR <= dy <= AI_NEAR else base * AI_FAR_THINK
+
+    def grant(self):
+        if self.used >= self.budget: return False
+        self.used += 1
+        return True
+
+    def request(self, entity, dist_sq, waited):
+        # waited = move_timer: pedidos adiados ficam mais velhos e ganham prioridade
+        self.queue.append((dist_sq / waited, entity.y, entity.x, entity))
+
+    def run(self):
+        queue, room = self.queue, max(0, self.budget - self.used)
+        if queue:
+            queue.sort(key=lambda r: r[:3])
+            for request in queue[:room]:
+                entity = request[3]
+                entity.decide_move()
+                if not entity.is_moving: entity.move_timer = 0.0 # Travado: só tenta de novo no próximo intervalo
+            self.queue = []
+        self.decisions = self.used + min(len(queue), room)
+        self.deferred = max(0, len(queue) - room) + self.overflow
+        totals = self.totals
+        totals["decisions"] += self.decisions; totals["deferred"] += self.deferred
+        totals["peak"] = max(totals["peak"], self.decisions); totals["ticks"] += 1
+        self.used = self.overflow = 0
+
+    def stats(self):
+        """Médias por tick e pico de decisões num tick"""
+        t = self.totals
+        n = max(1, t["ticks"])
+        return {"decisions_per_tick": t["decisions"] / n, "deferred_per_tick": t["deferred"] / n, "decisions_peak": t["peak"]}
+
+# ------------------------
+# CLASSE PLAYER (ROGUELIKE)
+# ------------------------
+class Player:
+    clips = HERO_CLIPS
+    __slots__ = ("world", "x", "y", "target_x", "target_y", "is_moving", "rect", "attack_rect",
+                 "speed", "state", "direction", "frame", "hp", "attack_cooldown")
+
+    def __init__(self, world, col, row):
+        self.world = world
+        # Define posição baseada na grade
+        self.x = col * TILE_SIZE + TILE_SIZE // 2
+        self.y = row * TILE_SIZE + TILE_SIZE // 2
+
+        self.target_x = self.x
+        self.target_y = self.y
+        self.is_moving = False
+        world.grid.claim(self, self.x, self.y)
+        world.spatial.update(self)
+        self.rect = Rect(0, 0, 0, 0) # Reaproveitado por get_rect()
+        self.attack_rect = Rect(0, 0, 50, 50) # Reaproveitado por get_attack_rect()
+
+        self.speed = PLAYER_SPEED # Velocidade do deslize
+        self.state = "idle"
+        self.direction = "right"
+        self.frame = 0.0
+        self.hp = PLAYER_HP
+        self.attack_cooldown = 0.0
+
+    def get_rect(self): self.rect.update(self.x - 16, self.y - 20, 32, 40); return self.rect
+    # Ataque pega o quadrado da frente
+    def get_attack_rect(self):
+        atk_x, atk_y = self.x, self.y
+        if self.direction == "left": atk_x -= TILE_SIZE
+        elif self.direction == "right": atk_x += TILE_SIZE
+        elif self.direction == "up": atk_y -= TILE_SIZE
+        elif self.direction == "down": atk_y += TILE_SIZE
+        self.attack_rect.update(atk_x - 25, atk_y - 25, 50, 50); return self.attack_rect
+
+    def move_grid(self, dx, dy):
+        """Tenta mover para o próximo quadrado"""
+        if self.is_moving: return # Só aceita comando se parou de deslizar
+
+        next_x = self.x + (dx * TILE_SIZE)
+        next_y = self.y + (dy * TILE_SIZE)
+
+        # Atualiza direção
+        if dx > 0: self.direction = "right"
+        elif dx < 0: self.direction = "left"
+        elif dy > 0: self.direction = "down"
+        elif dy < 0: self.direction = "up"
+
+        grid = self.world.grid
+        if grid.is_free(next_x, next_y, self):
+            self.target_x = next_x
+            self.target_y = next_y
+            grid.claim(self, next_x, next_y)
+            self.is_moving = True
+            self.state = "run"
+
+    def update(self, dt, command):
+        world = self.world
+        if self.attack_cooldown > 0: self.attack_cooldown -= dt
+
+        if self.hp > 0:
+            # 1. Lógica de Movimento Suave (Lerp)
+            if self.is_moving:
+                dx = self.target_x - self.x
+                dy = self.target_y - self.y
+                dist = math.sqrt(dx**2 + dy**2)
+                step = self.speed * dt # speed em pixels por segundo: anda igual em qualquer taxa de ticks
+
+                if dist <= step:
+                    # Chegou no quadrado
+                    self.x = self.target_x
+                    self.y = self.target_y
+                    world.grid.settle(self, self.x, self.y)
+                    self.is_moving = False
+                    self.state = "idle"
+                else:
+                    # Desliza em direção ao quadrado
+                    self.x += (dx / dist) * step
+                    self.y += (dy / dist) * step
+                world.spatial.update(self)
+
+            # 2. Inputs (Só aceita se não estiver movendo)
+            elif self.state != "attack":
+                if command & INPUT_LEFT: self.move_grid(-1, 0)
+                elif command & INPUT_RIGHT: self.move_grid(1, 0)
+                elif command & INPUT_UP: self.move_grid(0, -1)
+                elif command & INPUT_DOWN: self.move_grid(0, 1)
+
+            # 3. Ataque
+            if command & INPUT_ATTACK and self.attack_cooldown <= 0 and not self.is_moving:
+                self.state = "attack"
+                self.frame = 0.0
+                self.attack_cooldown = PLAYER_ATTACK_COOLDOWN
+
+                # Só testa quem está nas células perto do golpe (índice espacial)
+                hitbox = self.get_attack_rect()
+                for enemy in world.spatial.query_rect(hitbox):
+                    if enemy is self or enemy.__class__ is Player or not hitbox.colliderect(enemy.get_rect()): continue
+                    if enemy is world.dracula:
+                        if world.boss_phase_active and enemy.state != "death": enemy.take_damage(1)
+                    elif enemy.state not in ["death", "gone"]:
+                        enemy.take_damage(1)
+
+                world.emit("sound", "slash")
+        else:
+            self.state = "death"
+
+        animate(self, self.clips, dt)
+
+# ------------------------
+# CLASSE VAMPIRE (ROGUELIKE AI)
+# ------------------------
+class Vampire:
+    anims = VAMPIRE_ANIMS
+    clips = VAMPIRE_CLIPS
+    __slots__ = ("world", "x", "y", "target_x", "target_y", "is_moving", "rect", "speed", "state",
+                 "direction", "frame", "hp", "damage_dealt", "death_timer", "move_timer")
+
+    def __init__(self, world, col, row):
+        self.world = world
+        self.rect = Rect(0, 0, 0, 0) # Reaproveitado por get_rect()
+        self.place(col, row)
+
+    def place(self, col, row):
+        """Nasce no tile (col, row) com tudo zerado; o World também usa para reciclar um "gone" do pool"""
+        world = self.world
+        self.x = col * TILE_SIZE + TILE_SIZE // 2
+        self.y = row * TILE_SIZE + TILE_SIZE // 2
+        self.target_x = self.x
+        self.target_y = self.y
+        self.is_moving = False
+        world.grid.claim(self, self.x, self.y)
+        world.spatial.update(self)
+
+        self.speed = VAMPIRE_SPEED # Velocidade de deslize
+        self.state, self.direction = "idle", "down"
+        self.frame, self.hp = 0.0, VAMPIRE_HP
+        self.damage_dealt = False
+        self.death_timer = 0.0
+        self.move_timer = 0.0 # Delay para pensar
+
+    def get_rect(self): self.rect.update(self.x - 20, self.y - 30, 40, 60); return self.rect
+
+    def take_damage(self, amount):
+        if self.state in ["death", "gone"]: return
+        self.hp -= amount
+        self.state = "hurt"; self.frame = 0.0
+        if self.hp <= 0:
+            self.hp = 0; self.state = "death"; self.frame = 0.0
+            self.world.grid.vacate(self); self.world.kills += 1
+        if self.world.turns: self.world._struck(self)
+
+    def decide_move(self):
+        # IA de grade: segue o campo de fluxo até o jogador (contorna paredes)
+        if self.is_moving: return
+        world = self.world
+        player = world.player if world.ally is None else world.target_of(self)
+
+        diff_x = player.target_x - self.x
+        diff_y = player.target_y - self.y
+        if abs(diff_x) <= TILE_SIZE and abs(diff_y) <= TILE_SIZE: return # Já está colado no jogador
+
+        step = self.world.flow.next_step(self, prefer_x=abs(diff_x) > abs(diff_y))
+        if step is None: return
+        dx_grid, dy_grid = step
+
+        next_x = self.x + (dx_grid * TILE_SIZE)
+        next_y = self.y + (dy_grid * TILE_SIZE)
+
+        # Atualiza direção visual
+        if dx_grid > 0: self.direction = "right"
+        elif dx_grid < 0: self.direction = "left"
+        elif dy_grid > 0: self.direction = "down"
+        elif dy_grid < 0: self.direction = "up"
+
+        # Só move se estiver livre
+        grid = self.world.grid
+        if grid.is_free(next_x, next_y, self):
+            self.target_x = next_x
+            self.target_y = next_y
+            grid.claim(self, next_x, next_y)
+            self.is_moving = True
+            self.state = "run"
+
+    def update(self, dt):
+        if self.state == "gone": return
+        world = self.world
+        player = world.player if world.ally is None else world.target_of(self)
+
+        if self.state == "death":
+            self._animate(dt)
+            if self.frame >= 10:
+                self.death_timer += dt
+                if self.death_timer > 2.0: self.state = "gone"; self.world.spatial.remove(self); self.world.departed += 1
+            return
+
+        if player.hp <= 0: self.state = "idle"; self._animate(dt); return
+        if self.state == "hurt": self._animate(dt); return
+
+        # --- MOVIMENTO EM GRADE ---
+        if self.is_moving:
+            dx = self.target_x - self.x
+            dy = self.target_y - self.y
+            dist = math.sqrt(dx**2 + dy**2)
+            step = self.speed * dt
+
+            if dist <= step:
+                self.x = self.target_x
+                self.y = self.target_y
+                self.world.grid.settle(self, self.x, self.y)
+                self.is_moving = False
+                self.state = "idle"
+                self.move_timer = 0.0 # Reseta timer de pensamento
+            else:
+                self.x += (dx / dist) * step
+                self.y += (dy / dist) * step
+            self.world.spatial.update(self)
+        else:
+            # Delay para não andar todo frame (vampiros pensam)
+            self.move_timer += dt
+            ai = self.world.ai
+            think = ai.think_time(VAMPIRE_THINK, player.x - self.x, player.y - self.y)
+            if self.move_timer > think: # Move a cada 0.5s (longe do jogador, mais devagar)
+                # Checa distância para atacar ou andar
+                dist_sq = (player.x - self.x)**2 + (player.y - self.y)**2
+                if dist_sq <= VAMPIRE_AGGRO_SQ: # Ataque se estiver no quadrado vizinho
+                     self.state = "attack"; self.frame = 0.0; self.damage_dealt = False; self.move_timer = -VAMPIRE_ATTACK_REST
+                elif think == VAMPIRE_THINK and ai.grant(): self.decide_move()
+                else: ai.request(self, dist_sq, self.move_timer) # Longe ou sem orçamento: espera a vez
+
+        # Ataque
+        if self.state == "attack":
+            if self.frame >= 6.0 and not self.damage_dealt:
+                if (player.x - self.x)**2 + (player.y - self.y)**2 <= VAMPIRE_HIT_SQ:
+                    player.hp -= VAMPIRE_DAMAGE;
+                    if player.hp < 0: player.hp = 0
+                self.damage_dealt = True
+            self._animate(dt); return
+
+        self._animate(dt)
+
+    def act(self, now):
+        """Modo por turnos: a vez do vampiro no relógio now (ataca, anda um tile ou espera).
+        Devolve quando é a próxima vez, ou None para sair da fila."""
+        world = self.world
+        if self.state == "death": self.state = "gone"; world.spatial.remove(self); world.departed += 1; return None
+        player = world.player
+        if player.hp <= 0: return None
+        if self.is_moving: # O desenho não terminou o passo anterior: chega de uma vez
+            self.x, self.y = self.target_x, self.target_y
+            world.grid.settle(self, self.x, self.y); world.spatial.update(self)
+            self.is_moving = False; self.state = "idle"
+        dx, dy = player.target_x - self.x, player.target_y - self.y
+        if dx * dx + dy * dy <= VAMPIRE_AGGRO_SQ: # O golpe acerta na hora; a animação vem depois
+            self.state = "attack"; self.frame = 0.0; self.damage_dealt = True
+            player.hp = max(0, player.hp - VAMPIRE_DAMAGE)
+            world.animating[self] = world.animating[player] = None
+            return now + VAMPIRE_THINK + VAMPIRE_ATTACK_REST
+        self.decide_move()
+        if self.is_moving: world.animating[self] = None; return now + VAMPIRE_THINK + TILE_SIZE / self.speed
+        return now + world.ai.think_time(VAMPIRE_THINK, dx, dy)
+
+    def glide(self, dt):
+        """Modo por turnos: um frame do deslize e da animação, sem pensar (quem decide é act())"""
+        if self.state == "gone": return
+        if self.is_moving:
+            dx = self.target_x - self.x
+            dy = self.target_y - self.y
+            dist = math.sqrt(dx**2 + dy**2)
+            step = self.speed * dt
+            if dist <= step:
+                self.x, self.y = self.target_x, self.target_y
+                self.world.grid.settle(self, self.x, self.y)
+                self.is_moving = False
+                self.state = "idle"
+            else:
+                self.x += (dx / dist) * step
+                self.y += (dy / dist) * step
+            self.world.spatial.update(self)
+        self._animate(dt)
+        if self.state == "death" and self.frame >= 10: self.death_timer += dt # Virou corpo parado
+
+    def _animate(self, dt):
+        if animate(self, self.clips, dt): self.damage_dealt = False # Fim do ataque (ou do dano)
+
+# ------------------------
+# CLASSE DRACULA (BOSS - GRID)
+# ------------------------
+class Dracula:
+    anims = DRACULA_ANIMS
+    clips = DRACULA_CLIPS
+    __slots__ = ("world", "x", "y", "target_x", "target_y", "is_moving", "rect", "speed", "state",
+                 "direction", "frame", "hp", "damage_dealt", "death_timer", "move_timer")
+
+    def __init__(self, world, col, row):
+        self.world = world
+        self.x = col * TILE_SIZE + TILE_SIZE // 2
+        self.y = row * TILE_SIZE + TILE_SIZE // 2
+        self.target_x = self.x
+        self.target_y = self.y
+        self.is_moving = False
+        world.grid.claim(self, self.x, self.y)
+        world.spatial.update(self)
+        self.rect = Rect(0, 0, 0, 0) # Reaproveitado por get_rect()
+
+        self.speed = DRACULA_SPEED # Mais rápido
+        self.state, self.direction = "idle", "down"
+        self.frame, self.hp = 0.0, DRACULA_HP
+        self.damage_dealt = False
+        self.death_timer = 0.0
+        self.move_timer = 0.0
+
+    def get_rect(self): self.rect.update(self.x - 24, self.y - 36, 48, 72); return self.rect
+
+    def take_damage(self, amount):
+        if not self.world.boss_phase_active: return
+        if self.state in ["death", "gone"]: return
+        self.hp -= amount
+        self.state = "hurt"; self.frame = 0.0
+        if self.hp <= 0:
+            self.hp = 0; self.state = "death"; self.frame = 0.0
+            self.world.grid.vacate(self)
+            self.world.emit("music", "game")
+        if self.world.turns: self.world._struck(self)
+
+    def decide_move(self):
+        if self.is_moving: return
+        world = self.world
+        player = world.player if world.ally is None else world.target_of(self)
+        diff_x = player.target_x - self.x
+        diff_y = player.target_y - self.y
+
+        # Boss persegue pelo mesmo campo de fluxo dos vampiros
+        step = self.world.flow.next_step(self, prefer_x=abs(diff_x) > abs(diff_y))
+        if step is None: return
+        dx_grid, dy_grid = step
+
+        next_x = self.x + (dx_grid * TILE_SIZE)
+        next_y = self.y + (dy_grid * TILE_SIZE)
+
+        if dx_grid > 0: self.direction = "right"
+        elif dx_grid < 0: self.direction = "left"
+        elif dy_grid > 0: self.direction = "down"
+        elif dy_grid < 0: self.direction = "up"
+
+        grid = self.world.grid
+        if grid.is_free(next_x, next_y, self):
+            self.target_x = next_x
+            self.target_y = next_y
+            grid.claim(self, next_x, next_y)
+            self.is_moving = True
+            self.state = "run"
+
+    def update(self, dt):
+        if self.state == "gone": return
+        world = self.world
+        player = world.player if world.ally is None else world.target_of(self)
+
+        if not self.world.boss_phase_active:
+            self.state = "idle"; self.direction = "up"; self._animate(dt); return
+
+        if self.state == "death":
+            self._animate(dt)
+            if self.frame >= 10:
+                self.death_timer += dt
+                if self.death_timer > 3.0: self.state = "gone"; self.world.spatial.remove(self)
+            return
+
+        if player.hp <= 0: self.state = "idle"; self._animate(dt); return
+        if self.state == "hurt": self._animate(dt); return
+
+        # Movimento Grade
+        if self.is_moving:
+            dx = self.target_x - self.x
+            dy = self.target_y - self.y
+            dist = math.sqrt(dx**2 + dy**2)
+            step = self.speed * dt
+            if dist <= step:
+                self.x, self.y = self.target_x, self.target_y
+                self.world.grid.settle(self, self.x, self.y)
+                self.is_moving = False
+                self.state = "idle"
+                self.move_timer = 0.0
+            else:
+                self.x += (dx / dist) * step
+                self.y += (dy / dist) * step
+            self.world.spatial.update(self)
+        else:
+            self.move_timer += dt
+            ai = self.world.ai
+            think = ai.think_time(DRACULA_THINK, player.x - self.x, player.y - self.y)
+            if self.move_timer > think: # Boss pensa rápido (0.3s)
+                dist_sq = (player.x - self.x)**2 + (player.y - self.y)**2
+                if dist_sq <= DRACULA_AGGRO_SQ:
+                     self.state = "attack"; self.frame = 0.0; self.damage_dealt = False; self.move_timer = -DRACULA_ATTACK_REST
+                elif think == DRACULA_THINK and ai.grant(): self.decide_move()
+                else: ai.request(self, dist_sq, self.move_timer)
+
+        if self.state == "attack":
+            if self.frame >= 6.0 and not self.damage_dealt:
+                if (player.x - self.x)**2 + (player.y - self.y)**2 <= DRACULA_HIT_SQ:
+                    player.hp -= DRACULA_DAMAGE;
+                    if player.hp < 0: player.hp = 0
+                self.damage_dealt = True
+            self._animate(dt); return
+
+        self._animate(dt)
+
+    def act(self, now):
+        """Modo por turnos: como Vampire.act, com os tempos e o dano do chefe"""
+        world = self.world
+        player = world.player
+        if self.state in ("death", "gone") or player.hp <= 0: return None
+        if self.is_moving:
+            self.x, self.y = self.target_x, self.target_y
+            world.grid.settle(self, self.x, self.y); world.spatial.update(self)
+            self.is_moving = False; self.state = "idle"
+        dx, dy = player.target_x - self.x, player.target_y - self.y
+        if dx * dx + dy * dy <= DRACULA_AGGRO_SQ:
+            self.state = "attack"; self.frame = 0.0; self.damage_dealt = True
+            player.hp = max(0, player.hp - DRACULA_DAMAGE)
+            world.animating[self] = world.animating[player] = None
+            return now + DRACULA_THINK + DRACULA_ATTACK_REST
+        self.decide_move()
+        if self.is_moving: world.animating[self] = None; return now + DRACULA_THINK + TILE_SIZE / self.speed
+        return now + world.ai.think_time(DRACULA_THINK, dx, dy)
+
+    def glide(self, dt):
+        """Modo por turnos: o corpo do chefe some sozinho (o fim da partida não espera o relógio)"""
+        Vampire.glide(self, dt)
+        if self.state == "death" and self.death_timer > 3.0: self.state = "gone"; self.world.spatial.remove(self)
+
+    _animate = Vampire._animate
+
+# ------------------------
+# MUNDO (SIMULAÇÃO)
+# ------------------------
+def _fallen(player):
+    """Herói morto e com a animação de morte já no fim"""
+    return player.hp <= 0 and player.state == "death" and player.frame >= 8
+
+class World:
+    """Dono das entidades. Avança com step(dt, comando), sem tela nem som.
+
+    Sons e trocas de música viram eventos ("sound"/"music", nome) em
+    self.events; o frontend consome depois de cada step. Com coop=True há um segundo
+    herói (self.ally), comandado pelos bits ALLY_SHIFT em diante do comando do tick. Com
+    fog=True, self.fov guarda o que os heróis enxergam; inimigos fora da vista rodam no
+    ritmo barato dos distantes (um tick em FAR_TICKS) e não são desenhados.
+
+    Com turns=True o mundo só anda quando o jogador age (modo por turnos clássico): cada
+    inimigo tem a próxima vez no relógio em move_timer e fica numa heap (turn_queue), e
+    entre as ações só quem está em self.animating é animado. Sem ação nem animação o step
+    não faz nada e deixa self.quiet = True.
+    """
+    def __init__(self, seed=0, horde_backend="python", arena=None, dungeon=None, endless=False, coop=False, fog=False,
+                 turns=False):
+        if coop and horde_backend == "numpy": raise ValueError("co-op só com o backend python da horda")
+        if turns and (coop or horde_backend == "numpy"): raise ValueError("modo por turnos só com um herói e o backend python")
+        self.turns = turns
+        self.seed = seed
+        self.endless = endless # Ondas infinitas (só termina com a morte do jogador)
+        self.coop = coop # Dois heróis; os inimigos vão atrás do mais perto que está vivo
+        self.rng = random.Random(seed)
+        # dungeon=(cols, rows): masmorra procedural da seed (dungeon.py), com câmera e LOD.
+        # arena=(cols, rows): sala aberta maior que a tela (testes de stress/benchmarks)
+        self.dungeon = None
+        if dungeon:
+            from dungeon import Dungeon
+            self.dungeon = Dungeon(dungeon[0], dungeon[1], seed)
+            self.grid = TileGrid(None, dungeon[0], dungeon[1], TILE_SIZE, self.dungeon.walkable())
+        elif arena: self.grid = TileGrid(arena_obstacles(*arena), arena[0], arena[1], TILE_SIZE)
+        else: self.grid = TileGrid(OBSTACLES, GRID_W, GRID_H, TILE_SIZE)
+        self.width, self.height = self.grid.cols * TILE_SIZE, self.grid.rows * TILE_SIZE
+        # Só os mapas grandes limitam o BFS e simulam barato quem está longe do jogador
+        self.lod = self.width > WIDTH * 2 or self.height > HEIGHT * 2
+        self.flow = FlowField(self.grid, FLOW_RADIUS if self.lod else None)
+        self.fov = FieldOfView(self.grid) if fog else None
+        self.spatial = SpatialHash(TILE_SIZE)
+        self.ai = AIScheduler() # Orçamento de decisões dos inimigos longe do jogador
+        self.events = []
+        self.enemies = [] # Sempre a mesma lista: limpeza e reset mexem nela no lugar
+        self.pool = [] # Vampire "gone" para reciclar em spawn_vampire (só o backend Python)
+        self.departed = 0 # Inimigos que viraram "gone" desde a última limpeza de self.enemies
+        self.roster = 0 # Muda sempre que alguém entra ou sai de self.enemies (lista de desenho)
+        self.profiler = NULL_PROFILER # Troque por um profiler.FrameProfiler para medir as fases do step
+        # "numpy": vampiros em arrays (horde.py), atualizados em lote. Precisa do numpy instalado.
+        self.horde = None
+        if horde_backend == "numpy":
+            from horde import VampireHorde
+            self.horde = VampireHorde(self)
+        self.reset()
+
+    def emit(self, kind, name):
+        self.events.append((kind, name))
+
+    def reset(self):
+        self.rng.seed(self.seed)
+        self.grid.clear_occupancy()
+        self.spatial.clear()
+        if self.horde: self.horde.clear()
+        self.status = "game" # "game", "game_over" ou "win"
+        self.boss_phase_active = False
+        self.tick = 0
+        self.events = []
+        self._near = self._far = None # Listas do LOD (mapas grandes), refeitas no primeiro step
+        self.ai.queue = []; self.ai.overflow = self.ai.used = 0; self.ai.reset_stats()
+        if not self.horde: self.pool.extend(self.enemies)
+        self.enemies.clear()
+        self.departed = 0; self.roster += 1
+        self.wave, self.wave_timer, self.kills = 0, 0.0, 0
+        if self.fov: self.fov.reset()
+        self.clock, self.turn_queue, self._turn_seq = 0.0, [], itertools.count()
+        self.animating = {} # Modo por turnos: quem está animando (dict como conjunto ordenado)
+        self.quiet = False # O último step não mudou nada (modo por turnos)
+        if self.dungeon: self._populate_dungeon(); self._start_endless(); self._update_fov(); self.emit("music", "game"); return
+
+        # Coordenadas em GRID (Coluna, Linha)
+        # (3, 5) -> Aprox 150, 250
+        self.player = Player(self, 3, 5)
+        self._place_ally()
+
+        # Boss no centro-baixo (Coluna 8, Linha 12)
+        self.dracula = Dracula(self, 8, 12)
+        self.dracula.direction = "up"
+        if self.turns: self.dracula.move_timer = math.nan # Só entra na fila quando a fase do chefe começa
+
+        # Posições do Grid para inimigos
+        grid_positions = [
+            (5, 7), (8, 7), (11, 7),
+            (5, 9), (8, 9), (11, 9)
+        ]
+        self.enemies.extend(self.spawn_vampire(col, row) for col, row in grid_positions)
+        self._start_endless()
+        self._update_fov()
+        self.emit("music", "game")
+
+    def _populate_dungeon(self):
+        """Jogador na primeira sala, Drácula na sala mais distante, vampiros espalhados no resto"""
+        rooms = self.dungeon.rooms
+        start = rooms[0]
+        lair = max(rooms, key=lambda r: (r.centerx - start.centerx) ** 2 + (r.centery - start.centery) ** 2)
+        self.player = Player(self, *start.center)
+        self._place_ally()
+        # Mapa pequeno com uma sala só: o centro dela é o do jogador
+        self.dracula = Dracula(self, *(lair.center if lair is not start else self._farthest_free_tile(*start.center)))
+        self.dracula.direction = "up"
+        if self.turns: self.dracula.move_timer = math.nan
+        grid = self.grid
+        for room in rooms[1:]:
+            for _ in range(self.rng.randint(1, VAMPIRES_PER_ROOM)):
+                col, row = self.rng.randrange(room.left, room.right), self.rng.randrange(room.top, room.bottom)
+                if grid.occupant[row * grid.cols + col] is None: self.enemies.append(self.spawn_vampire(col, row))
+
+    def _farthest_free_tile(self, col, row):
+        """(coluna, linha) do tile andável e livre mais longe de (col, row)"""
+        grid = self.grid
+        cols = grid.cols
+        free = [i for i in range(cols * grid.rows) if grid.walkable[i] and grid.occupant[i] is None]
+        best = max(free, key=lambda i: (i % cols - col) ** 2 + (i // cols - row) ** 2)
+        return best % cols, best // cols
+
+    def _place_ally(self):
+        """Co-op: segundo herói no primeiro tile livre em volta do jogador"""
+        self.ally = None
+        self.players = [self.player]
+        if not self.coop: return
+        px, py = self.player.x, self.player.y
+        for dx, dy in ((0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (-1, 1), (1, -1), (-1, -1)):
+            x, y = px + dx * TILE_SIZE, py + dy * TILE_SIZE
+            if self.grid.is_free(x, y):
+                self.ally = Player(self, int(x // TILE_SIZE), int(y // TILE_SIZE))
+                self.ally.direction = "left" if dx > 0 else "right"
+                self.players.append(self.ally)
+                return
+        raise ValueError("sem tile livre para o segundo herói")
+
+    def target_of(self, enemy):
+        """Co-op: herói vivo mais perto do inimigo (empate: o jogador). Sem ninguém vivo, o jogador"""
+        player, ally = self.player, self.ally
+        if ally.hp <= 0: return player
+        if player.hp <= 0: return ally
+        if (ally.x - enemy.x) ** 2 + (ally.y - enemy.y) ** 2 < (player.x - enemy.x) ** 2 + (player.y - enemy.y) ** 2: return ally
+        return player
+
+    def _update_flow(self):
+        """Campo de fluxo até o jogador (e até o aliado vivo, no co-op); só refaz se alguém trocou de tile"""
+        player, ally = self.player, self.ally
+        if ally is None or ally.hp <= 0: self.flow.update(player.target_x, player.target_y)
+        elif player.hp <= 0: self.flow.update(ally.target_x, ally.target_y)
+        else: self.flow.update(player.target_x, player.target_y, (ally.target_x, ally.target_y))
+
+    def _update_fov(self):
+        """Visão dos heróis; se mudou, os inimigos são reclassificados (perto/longe) neste tick"""
+        if self.fov and self.fov.update(*[(p.x, p.y) for p in self.players]): self._near = None
+
+    def _schedule(self, e, due):
+        """Modo por turnos: e age de novo quando o relógio chegar em due. A entrada antiga na
+        heap não é removida; ela só é ignorada porque não bate mais com e.move_timer."""
+        e.move_timer = due
+        # Empate no relógio: decide o tile (único por ator vivo), para o restore refazer a mesma ordem
+        heapq.heappush(self.turn_queue, (due, self.grid.index(e.target_x, e.target_y), next(self._turn_seq), e))
+
+    def _struck(self, e):
+        """Modo por turnos: quem levou o golpe anima; vampiro morto sai do mapa TURN_CORPSE_TIME depois"""
+        self.animating[e] = None
+        if e.state == "death" and e is not self.dracula: self._schedule(e, self.clock + TURN_CORPSE_TIME)
+
+    def _in_flight(self, e):
+        """Modo por turnos: e ainda está deslizando ou no meio de uma animação"""
+        if e.__class__ is Player: return e.is_moving or e.state == "attack" or (e.hp <= 0 and not _fallen(e))
+        if e.state == "death": return e.death_timer == 0 or e is self.dracula
+        return e.is_moving or e.state in TURN_ANIMATED
+
+    def rebuild_turns(self):
+        """Modo por turnos: heap e animações de novo a partir das entidades (depois de um restore)"""
+        self._turn_seq = itertools.count()
+        self.turn_queue = [(e.move_timer, self.grid.index(e.target_x, e.target_y), next(self._turn_seq), e)
+                           for e in [self.dracula] + self.enemies if not math.isnan(e.move_timer)]
+        heapq.heapify(self.turn_queue)
+        self.animating = dict.fromkeys(e for e in self.players + [self.dracula] + self.enemies if self._in_flight(e))
+
+    def _step_turns(self, dt, command):
+        """Modo por turnos: anima quem está em movimento e, se o jogador agiu, avança o relógio
+        e dá a vez (pela heap) a todo inimigo cuja hora chegou. Devolve os segundos de turno gastos."""
+        animating, player = self.animating, self.player
+        self.quiet = not animating and not command & PLAYER_ACTIONS
+        if self.quiet: return 0.0
+        if animating:
+            for e in [*animating]:
+                if e is player: player.update(dt, 0)
+                else: e.glide(dt)
+                if not self._in_flight(e): del animating[e]
+            if self.fov: self._update_fov()
+        if player in animating or player.hp <= 0 or not command & PLAYER_ACTIONS: return 0.0
+
+        player.attack_cooldown = 0.0 # No modo por turnos o ataque custa tempo de turno
+        player.update(0.0, command)
+        if player.is_moving: cost = TILE_SIZE / player.speed
+        elif player.state == "attack": cost = PLAYER_ATTACK_COOLDOWN
+        else: return 0.0 # Parede ou tile ocupado: só virou, não gasta o turno
+        animating[player] = None
+        self.clock += cost
+        self._update_flow()
+        queue, clock, pop = self.turn_queue, self.clock, heapq.heappop
+        while queue and queue[0][0] <= clock:
+            due, _, _, e = pop(queue)
+            if due != e.move_timer: continue # Reagendado depois desta entrada
+            due = e.act(due)
+            if due is None: e.move_timer = math.nan
+            else: self._schedule(e, due)
+        if self.departed: self._compact_enemies()
+        return cost
+
+    def _start_endless(self):
+        """Modo infinito: tira o Drácula e os vampiros do mapa e chama a primeira onda"""
+        if not self.endless: return
+        dracula = self.dracula
+        self.grid.vacate(dracula); self.spatial.remove(dracula)
+        dracula.state = "gone"
+        self.clear_enemies()
+        self._update_flow()
+        self._next_wave()
+
+    def _next_wave(self):
+        """Vampiros da próxima onda em tiles livres sorteados, longe do jogador mas ao alcance dele"""
+        self.wave += 1
+        self.wave_timer = ENDLESS_WAVE_TIME
+        grid, dist = self.grid, self.flow.dist
+        spots = [i for i in range(len(dist)) if dist[i] >= ENDLESS_SPAWN_DIST and grid.occupant[i] is None]
+        count = min(ENDLESS_FIRST_WAVE + ENDLESS_WAVE_GROWTH * (self.wave - 1), len(spots))
+        for i in self.rng.sample(spots, count):
+            self.enemies.append(self.spawn_vampire(i % grid.cols, i // grid.cols))
+        self._near = None
+
+    def _summon_boss(self):
+        """Masmorra: o Drácula acorda e aparece a alguns passos do jogador (ele pode estar a
+        centenas de tiles, fora do alcance do campo de fluxo)"""
+        dracula, player = self.dracula, self.player
+        reach = ACTIVE_TILES * TILE_SIZE
+        if abs(dracula.x - player.x) <= reach and abs(dracula.y - player.y) <= reach: return
+        grid, dist = self.grid, self.flow.dist
+        spots = [i for i in range(len(dist)) if 5 <= dist[i] <= 9 and grid.occupant[i] is None]
+        if not spots: return
+        i = self.rng.choice(spots)
+        grid.vacate(dracula)
+        dracula.x = dracula.target_x = (i % grid.cols) * TILE_SIZE + TILE_SIZE // 2
+        dracula.y = dracula.target_y = (i // grid.cols) * TILE_SIZE + TILE_SIZE // 2
+        dracula.is_moving = False
+        grid.claim(dracula, dracula.x, dracula.y)
+        self.spatial.update(dracula)
+
+    def spawn_vampire(self, col, row):
+        """Vampiro no tile (col, row); quem chama põe em self.enemies"""
+        # Um "gone" ainda na lista não pode voltar como outro (slot da horda ou objeto do pool)
+        if self.departed: self._compact_enemies()
+        self.roster += 1
+        if self.horde: return self.horde.spawn(col, row)
+        if self.pool:
+            self._near = None # O reciclado pode estar nas listas antigas do LOD
+            e = self.pool.pop(); e.place(col, row)
+        else: e = Vampire(self, col, row)
+        if self.turns: self._schedule(e, self.clock + VAMPIRE_THINK)
+        return e
+
+    def clear_enemies(self):
+        """Remove todos os vampiros de uma vez (libera grade e índice espacial)"""
+        for e in self.enemies:
+            self.grid.vacate(e); self.spatial.remove(e)
+            if self.turns: e.move_timer = math.nan # Entradas na heap viram lixo
+        if self.horde: self.horde.clear()
+        else: self.pool.extend(self.enemies)
+        self.enemies.clear()
+        self.departed = 0; self.roster += 1
+        self._near = None
+
+    def _compact_enemies(self):
+        """Tira os "gone" de self.enemies sem criar outra lista; os Vampire vão para o pool"""
+        enemies, pool, n = self.enemies, self.pool, 0
+        for e in enemies:
+            if e.state != "gone": enemies[n] = e; n += 1
+            elif not self.horde: pool.append(e)
+        del enemies[n:]
+        self.departed = 0; self.roster += 1
+
+    def spawn_horde(self, count):
+        """Modo stress: até count vampiros extras em tiles livres sorteados pelo rng do mundo"""
+        grid = self.grid
+        free = [i for i in range(grid.cols * grid.rows) if grid.walkable[i] and grid.occupant[i] is None]
+        self.rng.shuffle(free)
+        for i in free[:count]:
+            self.enemies.append(self.spawn_vampire(i % grid.cols, i // grid.cols))
+        self._near = None
+        return min(count, len(free))
+
+    def step(self, dt, command=0):
+        """Avança um tick. command = bits INPUT_* pressionados neste tick."""
+        self.events = []
+        if self.status != "game": return
+        lap = self.profiler.lap
+        if self.turns:
+            dt = self._step_turns(dt, command); lap("update.turns")
+            if self.quiet: return # Esperando o jogador: nem o tick anda
+            self.tick += 1
+            self._finish_step(dt)
+            return
+        self.tick += 1
+        player, dracula = self.player, self.dracula
+        player.update(dt, command)
+        if self.ally: self.ally.update(dt, command >> ALLY_SHIFT)
+        lap("update.player")
+        self._update_flow(); lap("update.flow")
+        if self.fov: self._update_fov(); lap("update.fov")
+        dracula.update(dt); lap("update.boss")
+        if self.horde: self.horde.update(dt) # Em lote já é barato: a horda NumPy não usa LOD
+        elif self.lod or self.fov: self._update_enemies_lod(dt)
+        else:
+            for e in self.enemies: e.update(dt)
+        lap("update.vampires")
+        self.ai.run(); lap("update.ai")
+        # Mapas grandes: a limpeza da lista acompanha a reclassificação perto/longe
+        if self.departed and (not (self.lod or self.fov) or self.tick % FAR_TICKS == 0): self._compact_enemies()
+        lap("update.cleanup")
+        self._finish_step(dt)
+
+    def _finish_step(self, dt):
+        """Ondas, fase do chefe e fim de partida, depois de dt segundos de jogo"""
+        player, dracula = self.player, self.dracula
+        if self.endless:
+            self.wave_timer -= dt
+            if self.wave_timer <= 0 or not self.enemies: self._next_wave()
+        elif not self.boss_phase_active and len(self.enemies) == 0:
+            self.boss_phase_active = True; self.emit("music", "boss")
+            if self.dungeon: self._summon_boss()
+            if self.turns: self._schedule(dracula, self.clock + DRACULA_THINK)
+        if _fallen(player) and (self.ally is None or _fallen(self.ally)):
+            self.status = "game_over"; self.emit("music", "game_over")
+        if dracula.state == "gone" and not self.endless:
+            self.status = "win"; self.emit("music", "win")
+
+    def _classify_enemies(self):
+        """Separa os inimigos em perto (update todo tick) e longe; refeito a cada FAR_TICKS ticks
+        e quando a visão muda. Com névoa, quem está fora da vista conta como longe."""
+        px, py = self.player.x, self.player.y
+        ally, fov = self.ally, self.fov
+        reach = ACTIVE_TILES * TILE_SIZE
+        near, far = [], []
+        for e in self.enemies:
+            if e.is_moving: near.append(e); continue
+            close = (px - reach <= e.x <= px + reach and py - reach <= e.y <= py + reach) or \
+                (ally is not None and abs(ally.x - e.x) <= reach and abs(ally.y - e.y) <= reach)
+            if close and (fov is None or fov.sees(e.x, e.y)): near.append(e)
+            else: far.append(e)
+        self._near, self._far = near, far
+
+    def _update_enemies_lod(self, dt):
+        """Perto do jogador (ou no meio de um passo): update normal. Longe (ou fora da vista): cada inimigo roda
+        em um de cada FAR_TICKS ticks, com o dt somado (fora do campo de fluxo eles só
+        animam e contam os timers de morte)."""
+        phase = self.tick % FAR_TICKS
+        if phase == 0 or self._near is None: self._classify_enemies()
+        near = self._near
+        for e in near: e.update(dt)
+        far_dt = dt * FAR_TICKS
+        for e in self._far[phase::FAR_TICKS]:
+            e.update(far_dt)
+            if e.is_moving: near.append(e) # Começou um passo: termina no ritmo normal
+
+    def run(self, commands, dt=1/60):
+        """Roda headless uma sequência de comandos (um por tick)"""
+        for command in commands:
+            if self.status != "game": break
+            self.step(dt, command)
+        return self.tick
+
+if __name__ == "__main__":
+    import sys, time
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    backend = sys.argv[2] if len(sys.argv) > 2 else "python"
+    size = int(sys.argv[3]) if len(sys.argv) > 3 else 0 # Lado da masmorra procedural (0 = sala padrão)
+    endless = "endless" in sys.argv[4:] # python world.py 10000 python 0 endless
+    fog = "fog" in sys.argv[4:] # python world.py 10000 python 200 fog
+    turns = "turns" in sys.argv[4:] # python world.py 10000 python 0 turns (cada ataque do bot é um turno)
+    world = World(seed=1, horde_backend=backend, dungeon=(size, size) if size else None, endless=endless, fog=fog,
+                  turns=turns)
+    start = time.perf_counter()
+    world.run(INPUT_ATTACK for _ in range(ticks))
+    elapsed = time.perf_counter() - start
+    print(f"{world.tick} ticks em {elapsed:.3f}s ({world.tick / elapsed:.0f} ticks/s) - status: {world.status}"
+          + (f" - onda {world.wave}, {world.kills} mortos, {len(world.enemies)} vivos" if endless else ""))